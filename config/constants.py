@@ -2,12 +2,15 @@
 Константы: названия колонок, форматы и т.п.
 
 Единое место для магических строк.
+Коллекции неизменяемые: их можно безопасно раздавать без копирования.
 """
 
-from typing import List
+import sys
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Tuple
 
 # Колонки Webbee AI (входной формат)
-WEBBEE_COLUMNS = {
+WEBBEE_COLUMNS: Mapping[str, str] = MappingProxyType({
     "NAME": "Название",
     "CATEGORY": "Category 0",
     "PHONE_1": "phone_1",
@@ -16,10 +19,11 @@ WEBBEE_COLUMNS = {
     "URL": "companyUrl",
     "TELEGRAM": "telegram",
     "VK": "vkontakte",
-}
+})
 
-# Колонки Битрикс24 (выходной формат)
-BITRIX_COLUMNS: List[str] = [
+# Колонки Битрикс24 (выходной формат).
+# Имена интернированы: сравнение с колонками DataFrame сводится к сравнению указателей.
+BITRIX_COLUMNS: Tuple[str, ...] = tuple(sys.intern(name) for name in (
     "Название лида",
     "Рабочий телефон",
     "Мобильный телефон",
@@ -34,11 +38,14 @@ BITRIX_COLUMNS: List[str] = [
     "Тип услуги",
     "Источник телефона",
     "Ответственный",
-]
+))
 
 # Форматы телефонов
 PHONE_LENGTH = 11
-VALID_PHONE_PREFIXES = ("7", "8")
+# Допустимые первые цифры номера: проверка `digits[:1] in ...` — хеш-поиск
+VALID_PHONE_PREFIXES: FrozenSet[str] = frozenset("78")
+# То же для номеров в bytes (элементы — коды символов)
+VALID_PHONE_PREFIX_BYTES: FrozenSet[int] = frozenset(b"78")
 
 # Разделители файлов
 TSV_SEPARATOR = "\t"
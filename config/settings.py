@@ -2,12 +2,14 @@
 Настройки приложения через Pydantic Settings.
 
 Читает из .env и переменных окружения, с fallback на дефолты.
+Singleton создаётся лениво — при первом обращении к любому полю.
 """
 
+import os
 from pathlib import Path
-from typing import List
+from typing import Any, List, cast
 
-from pydantic import Field, field_validator
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,12 +21,21 @@ class Paths(BaseSettings):
     reports_dir: Path = Field(default=Path("data/reports"))
     db_path: Path = Field(default=Path("data/database.db"))
 
-    @field_validator("input_dir", "output_dir", "reports_dir")
-    @classmethod
-    def create_if_not_exists(cls, v: Path) -> Path:
-        """Создать директорию, если её нет."""
-        v.mkdir(parents=True, exist_ok=True)
-        return v
+    def ensure_dirs(self) -> None:
+        """
+        Создать директории данных, если их нет.
+
+        Вызывается явно при старте приложения, а не при валидации,
+        чтобы чтение настроек не делало обращений к файловой системе.
+        Существующие директории пропускаются (один stat вместо mkdir).
+        Переменная окружения LEADGEN_SKIP_MKDIR=1 отключает создание целиком.
+        """
+        if os.environ.get("LEADGEN_SKIP_MKDIR") == "1":
+            return
+
+        for path in (self.input_dir, self.output_dir, self.reports_dir):
+            if not path.is_dir():
+                path.mkdir(parents=True, exist_ok=True)
 
 
 class Settings(BaseSettings):
@@ -48,6 +59,9 @@ class Settings(BaseSettings):
     max_file_size_mb: int = Field(default=100, ge=1, le=1000)
     preview_rows: int = Field(default=10, ge=5, le=100)
     log_level: str = Field(default="INFO")
+    # Быстрое чтение CSV через pyarrow (если установлен); выключено —
+    # стандартный парсер pandas
+    fast_io: bool = Field(default=False)
 
     # Битрикс
     bitrix_stage: str = Field(default="Новая заявка")
@@ -55,5 +69,34 @@ class Settings(BaseSettings):
     bitrix_service_type: str = Field(default="ГЦК")
 
 
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Получить singleton настроек (создаётся при первом вызове)."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    """
+    Прокси к singleton'у Settings.
+
+    Импорт `from config.settings import settings` ничего не читает:
+    .env и переменные окружения разбираются при первом обращении к полю.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
 # Singleton
-settings = Settings()
+settings = cast(Settings, _LazySettings())
@@ -8,27 +8,44 @@
 class LeadGenError(Exception):
     """Базовое исключение для всех ошибок приложения."""
 
+    # Атрибуты в слотах; подклассы объявляют пустые __slots__
+    __slots__ = ("message", "details")
+
     def __init__(self, message: str, details: dict | None = None) -> None:
         super().__init__(message)
         self.message = message
         self.details = details or {}
 
+    def __reduce__(self):
+        # Слоты не попадают в стандартный pickle исключения — передаём явно
+        return type(self), (self.message, self.details)
+
 
 class ValidationError(LeadGenError):
     """Ошибка валидации данных."""
 
+    __slots__ = ()
+
 
 class FileProcessingError(LeadGenError):
     """Ошибка при обработке файла."""
 
+    __slots__ = ()
+
 
 class DatabaseError(LeadGenError):
     """Ошибка работы с БД."""
 
+    __slots__ = ()
+
 
 class ConfigurationError(LeadGenError):
     """Ошибка конфигурации."""
 
+    __slots__ = ()
+
 
 class ExportError(LeadGenError):
     """Ошибка экспорта данных."""
+
+    __slots__ = ()
@@ -6,6 +6,7 @@ Production-вариант: ротация файлов, JSON-формат для
 
 import logging
 import sys
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 from config.settings import settings
@@ -15,9 +16,17 @@ def setup_logging() -> None:
     """
     Настроить корневой логгер.
 
-    - В консоль: цветной вывод для разработки.
-    - В файл: ротация по дням, JSON для продакшна.
+    - В консоль: цветной вывод для разработки (только если stdout — терминал;
+      под pythonw/systemd stdout закрыт или никем не читается).
+    - В файл: ротация по размеру (10 МБ × 5 файлов), файл открывается
+      только при первой записи.
+
+    Повторный вызов ничего не делает — хендлеры не дублируются.
     """
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return
+
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
 
     # Форматтер
@@ -26,24 +35,30 @@ def setup_logging() -> None:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    # Хендлер в консоль
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(log_level)
-
     # Хендлер в файл (опционально, для production)
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_dir / "app.log", encoding="utf-8")
+    file_handler = RotatingFileHandler(
+        log_dir / "app.log",
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5,
+        encoding="utf-8",
+        delay=True,
+    )
     file_handler.setFormatter(formatter)
     file_handler.setLevel(log_level)
 
     # Настраиваем корневой логгер
-    root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(console_handler)
     root_logger.addHandler(file_handler)
 
+    # Хендлер в консоль
+    if sys.stdout is not None and sys.stdout.isatty():
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(log_level)
+        root_logger.addHandler(console_handler)
+
     # Отключаем лишние логи от сторонних библиотек
     logging.getLogger("matplotlib").setLevel(logging.WARNING)
     logging.getLogger("PIL").setLevel(logging.WARNING)
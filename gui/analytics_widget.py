@@ -8,8 +8,9 @@
 """
 
 import logging
+from datetime import date, datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 from PyQt6.QtWidgets import (
@@ -22,11 +23,12 @@ from PyQt6.QtWidgets import (
     QScrollArea,
     QFileDialog,
     QMessageBox,
+    QSizePolicy,
 )
-from PyQt6.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PyQt6.QtCore import QRect, QRectF, QSize, Qt
+from PyQt6.QtGui import QColor, QFont, QLinearGradient, QPainter, QPen
 
+from gui.workers import Worker, run_in_background
 from services.analytics_service import AnalyticsService
 from repositories.processing_history_repo import ProcessingHistoryRepository
 from repositories.managers_repo import ManagersRepository
@@ -35,52 +37,199 @@ from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Период графика динамики, дней
+_DAILY_DAYS = 30
 
-class StatCard(QWidget):
-    """Карточка со статистикой (темная тема)."""
-
-    def __init__(self, title: str, value: str, parent=None):
-        super().__init__(parent)
-        self._setup_ui(title, value)
+# Карточки статистики: ключ в get_overall_stats() -> заголовок
+_STAT_CARDS = (
+    ("total_valid_leads", "Всего лидов"),
+    ("total_unique_phones", "Уникальных телефонов"),
+    ("total_duplicates", "Дубликатов"),
+    ("total_invalid_phones", "Битых номеров"),
+    ("total_files", "Обработано файлов"),
+)
 
-    def _setup_ui(self, title: str, value: str):
-        """Создать UI карточки."""
-        layout = QVBoxLayout()
-        layout.setContentsMargins(15, 15, 15, 15)
+# Тёмная тема для всего виджета аналитики.
+# Фон и рамки адресуются по objectName (#analyticsRoot, #analyticsGroup...),
+# а не правилом QWidget {...} на каждого потомка
+_ANALYTICS_QSS = """
+    QWidget#analyticsRoot,
+    QWidget#analyticsContent {
+        background-color: #1e1e1e;
+        color: #e0e0e0;
+    }
+    QGroupBox#analyticsGroup {
+        background-color: #2d2d2d;
+        border: 1px solid #444;
+        border-radius: 8px;
+        margin-top: 10px;
+        padding-top: 15px;
+        font-weight: bold;
+        color: #ffffff;
+    }
+    QGroupBox#analyticsGroup::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px;
+    }
+    QLabel {
+        color: #e0e0e0;
+        background: transparent;
+    }
+    QPushButton {
+        background-color: #3a3a3a;
+        color: #ffffff;
+        border: 1px solid #555;
+        border-radius: 5px;
+        padding: 8px 15px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #4a4a4a;
+        border: 1px solid #666;
+    }
+    QPushButton:pressed {
+        background-color: #2a2a2a;
+    }
+    QPushButton:disabled {
+        background-color: #2a2a2a;
+        color: #666;
+    }
+    QScrollArea#analyticsScroll {
+        background-color: #1e1e1e;
+        border: none;
+    }
+    QScrollArea#analyticsScroll QScrollBar {
+        background-color: #1e1e1e;
+    }
+"""
 
-        # Заголовок
-        title_label = QLabel(title)
-        title_label.setStyleSheet(
-            "font-size: 12px; color: #999; font-weight: normal;"
+# Флаг: тёмная тема matplotlib уже применена
+_MPL_CONFIGURED = False
+
+
+def _ensure_mpl_configured() -> None:
+    """
+    Импортировать matplotlib и применить тёмную тему (и шрифт
+    с кириллицей).
+
+    Вызывается лениво — только при первом построении графика,
+    чтобы не платить за импорт matplotlib при старте приложения.
+    """
+    global _MPL_CONFIGURED
+    if _MPL_CONFIGURED:
+        return
+
+    import matplotlib
+    matplotlib.rcParams.update({
+        'font.family': 'DejaVu Sans',       # Шрифт с кириллицей
+        'axes.unicode_minus': False,        # Обычный минус в подписях
+        'figure.facecolor': '#1e1e1e',      # Фон графика
+        'axes.facecolor': '#2d2d2d',        # Фон области с данными
+        'axes.edgecolor': '#555',           # Цвет рамки
+        'axes.labelcolor': '#e0e0e0',       # Цвет подписей осей
+        'text.color': '#e0e0e0',            # Цвет текста
+        'xtick.color': '#e0e0e0',           # Цвет меток X
+        'ytick.color': '#e0e0e0',           # Цвет меток Y
+        'grid.color': '#444',               # Цвет сетки
+        'legend.facecolor': '#2d2d2d',      # Фон легенды
+        'legend.edgecolor': '#555',         # Рамка легенды
+    })
+    _MPL_CONFIGURED = True
+
+
+class StatCardsBar(QWidget):
+    """
+    Полоса карточек со статистикой (темная тема).
+
+    Все карточки рисуются одним QPainter в paintEvent вместо отдельных
+    QWidget с layout, двумя QLabel и stylesheet на каждую карточку.
+    """
+
+    _SPACING = 10               # Промежуток между карточками
+    _PADDING = 15               # Внутренний отступ карточки
+    _CARD_MIN_WIDTH = 150
+    _CARD_HEIGHT = 100
+
+    def __init__(self, titles: Sequence[str], parent=None):
+        super().__init__(parent)
+        self._titles: List[str] = list(titles)
+        self._values: List[str] = ["0"] * len(self._titles)
+
+        self._title_font = QFont(self.font())
+        self._title_font.setPixelSize(12)
+        self._value_font = QFont(self.font())
+        self._value_font.setPixelSize(24)
+        self._value_font.setBold(True)
+
+        count = len(self._titles)
+        self.setMinimumSize(
+            count * self._CARD_MIN_WIDTH + (count - 1) * self._SPACING,
+            self._CARD_HEIGHT,
+        )
+        self.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed
         )
-        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        # Значение
-        value_label = QLabel(value)
-        value_label.setStyleSheet(
-            "font-size: 24px; color: #64B5F6; font-weight: bold;"
+    def sizeHint(self) -> QSize:
+        return self.minimumSize()
+
+    def value(self, index: int) -> str:
+        """Текущее значение карточки index."""
+        return self._values[index]
+
+    def set_value(self, index: int, text: str) -> None:
+        """Обновить значение карточки и перерисовать только её."""
+        if self._values[index] == text:
+            return
+        self._values[index] = text
+        self.update(self._rect_for(index))
+
+    def _rect_for(self, index: int) -> QRect:
+        """Прямоугольник карточки index в координатах виджета."""
+        count = len(self._titles)
+        width = (self.width() - (count - 1) * self._SPACING) // count
+        return QRect(
+            index * (width + self._SPACING), 0, width, self.height()
         )
-        value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        layout.addWidget(title_label)
-        layout.addWidget(value_label)
-        layout.addStretch()
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor("#444"), 1))
+
+        dirty = event.rect()
+        for index, (title, value) in enumerate(zip(self._titles, self._values)):
+            rect = self._rect_for(index)
+            if not rect.intersects(dirty):
+                continue
+
+            # Фон карточки: вертикальный градиент со скруглёнными углами
+            frame = QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5)
+            gradient = QLinearGradient(frame.topLeft(), frame.bottomLeft())
+            gradient.setColorAt(0, QColor("#2d2d2d"))
+            gradient.setColorAt(1, QColor("#252525"))
+            painter.setBrush(gradient)
+            painter.drawRoundedRect(frame, 8, 8)
+
+            # Заголовок и значение
+            content = rect.adjusted(
+                self._PADDING, self._PADDING, -self._PADDING, -self._PADDING
+            )
+            painter.save()
+            painter.setFont(self._title_font)
+            painter.setPen(QColor("#999"))
+            painter.drawText(
+                content,
+                Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop,
+                title,
+            )
+            painter.setFont(self._value_font)
+            painter.setPen(QColor("#64B5F6"))
+            painter.drawText(content, Qt.AlignmentFlag.AlignCenter, value)
+            painter.restore()
 
-        self.setLayout(layout)
-        self.setStyleSheet(
-            """
-            QWidget {
-                background: qlineargradient(
-                    x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2d2d2d, stop:1 #252525
-                );
-                border-radius: 8px;
-                border: 1px solid #444;
-            }
-            """
-        )
-        self.setMinimumHeight(100)
-        self.setMinimumWidth(150)
+        painter.end()
 
 
 class AnalyticsWidget(QWidget):
@@ -89,21 +238,6 @@ class AnalyticsWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        # ========== ТЕМНАЯ ТЕМА ДЛЯ MATPLOTLIB ==========
-        import matplotlib
-        matplotlib.rcParams.update({
-            'figure.facecolor': '#1e1e1e',      # Фон графика
-            'axes.facecolor': '#2d2d2d',        # Фон области с данными
-            'axes.edgecolor': '#555',           # Цвет рамки
-            'axes.labelcolor': '#e0e0e0',       # Цвет подписей осей
-            'text.color': '#e0e0e0',            # Цвет текста
-            'xtick.color': '#e0e0e0',           # Цвет меток X
-            'ytick.color': '#e0e0e0',           # Цвет меток Y
-            'grid.color': '#444',               # Цвет сетки
-            'legend.facecolor': '#2d2d2d',      # Фон легенды
-            'legend.edgecolor': '#555',         # Рамка легенды
-        })
-
         # Репозитории
         self.history_repo = ProcessingHistoryRepository()
         self.managers_repo = ManagersRepository()
@@ -117,6 +251,19 @@ class AnalyticsWidget(QWidget):
         self.cleaned_df: Optional[pd.DataFrame] = None
         self.bitrix_df: Optional[pd.DataFrame] = None
 
+        # Кэш результатов: ключ -> (отпечаток входных данных, результат)
+        self._cache: Dict[str, Tuple[Any, Any]] = {}
+
+        # Графики, обновлённые пока виджет был скрыт (перерисуем при показе)
+        self._dirty = {"daily": False, "managers": False, "sources": False}
+
+        # Сохранённый фон графиков без animated-артистов (для блиттинга)
+        self._backgrounds: Dict[str, Any] = {}
+
+        # Фоновый расчёт аналитики (не больше одного одновременно)
+        self._worker: Optional[Worker] = None
+        self._refresh_pending = False
+
         self._setup_ui()
         logger.info("Виджет аналитики инициализирован")
 
@@ -132,8 +279,10 @@ class AnalyticsWidget(QWidget):
 
         # Скролл-область для всего контента
         scroll = QScrollArea()
+        scroll.setObjectName("analyticsScroll")
         scroll.setWidgetResizable(True)
         scroll_content = QWidget()
+        scroll_content.setObjectName("analyticsContent")
         scroll_layout = QVBoxLayout(scroll_content)
 
         # Блок 1: Карточки со статистикой
@@ -152,120 +301,111 @@ class AnalyticsWidget(QWidget):
         scroll.setWidget(scroll_content)
         main_layout.addWidget(scroll)
         # ========== ТЕМНАЯ ТЕМА ДЛЯ ВСЕГО ВИДЖЕТА ==========
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #1e1e1e;
-                color: #e0e0e0;
-            }
-            QGroupBox {
-                background-color: #2d2d2d;
-                border: 1px solid #444;
-                border-radius: 8px;
-                margin-top: 10px;
-                padding-top: 15px;
-                font-weight: bold;
-                color: #ffffff;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px;
-            }
-            QLabel {
-                color: #e0e0e0;
-                background: transparent;
-            }
-            QPushButton {
-                background-color: #3a3a3a;
-                color: #ffffff;
-                border: 1px solid #555;
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #4a4a4a;
-                border: 1px solid #666;
-            }
-            QPushButton:pressed {
-                background-color: #2a2a2a;
-            }
-            QPushButton:disabled {
-                background-color: #2a2a2a;
-                color: #666;
-            }
-            QScrollArea {
-                background-color: #1e1e1e;
-                border: none;
-            }
-        """)
+        self.setObjectName("analyticsRoot")
+        self.setStyleSheet(_ANALYTICS_QSS)
 
         self.setLayout(main_layout)
 
     def _create_stats_cards(self) -> QGroupBox:
         """Создать блок с карточками статистики."""
         group = QGroupBox("Общая статистика")
+        group.setObjectName("analyticsGroup")
         layout = QHBoxLayout()
 
-        # Создаём карточки (пустые, заполним при обновлении)
-        self.card_total_leads = StatCard("Всего лидов", "0")
-        self.card_unique_phones = StatCard("Уникальных телефонов", "0")
-        self.card_duplicates = StatCard("Дубликатов", "0")
-        self.card_invalid = StatCard("Битых номеров", "0")
-        self.card_files = StatCard("Обработано файлов", "0")
-
-        layout.addWidget(self.card_total_leads)
-        layout.addWidget(self.card_unique_phones)
-        layout.addWidget(self.card_duplicates)
-        layout.addWidget(self.card_invalid)
-        layout.addWidget(self.card_files)
+        # Все карточки — один виджет (пустые, заполним при обновлении)
+        self.stat_cards = StatCardsBar([title for _, title in _STAT_CARDS])
+        layout.addWidget(self.stat_cards)
 
         group.setLayout(layout)
         return group
 
     def _create_charts_section(self) -> QGroupBox:
-        """Создать блок с графиками."""
-        from PyQt6.QtWidgets import QSizePolicy
+        """
+        Создать блок с графиками.
 
+        Сами FigureCanvas создаются лениво при первом обновлении аналитики,
+        а пока на их месте стоят пустые заглушки нужной высоты.
+        """
         group = QGroupBox("Визуализация данных")
+        group.setObjectName("analyticsGroup")
         layout = QVBoxLayout()
+        self._charts_layout = layout
 
         # График 1: Динамика по дням
         layout.addWidget(QLabel("График обработки лидов по дням:"))
-        self.chart_daily = FigureCanvas(Figure(figsize=(14, 6)))
-        self.chart_daily.setMinimumHeight(400)
-        self.chart_daily.setSizePolicy(
-            QSizePolicy.Policy.Expanding,
-            QSizePolicy.Policy.Expanding
-        )
-        layout.addWidget(self.chart_daily)
+        self.chart_daily = None
+        self._placeholder_daily = self._create_chart_placeholder(400)
+        layout.addWidget(self._placeholder_daily)
 
         # График 2: Распределение по менеджерам
         layout.addWidget(QLabel("Распределение лидов по менеджерам:"))
-        self.chart_managers = FigureCanvas(Figure(figsize=(10, 10)))
-        self.chart_managers.setMinimumHeight(600)
-        self.chart_managers.setSizePolicy(
-            QSizePolicy.Policy.Expanding,
-            QSizePolicy.Policy.Expanding
-        )
-        layout.addWidget(self.chart_managers)
+        self.chart_managers = None
+        self._placeholder_managers = self._create_chart_placeholder(600)
+        layout.addWidget(self._placeholder_managers)
 
         # График 3: Лиды по источникам
         layout.addWidget(QLabel("Лиды по источникам (файлам):"))
-        self.chart_sources = FigureCanvas(Figure(figsize=(14, 6)))
-        self.chart_sources.setMinimumHeight(400)
-        self.chart_sources.setSizePolicy(
-            QSizePolicy.Policy.Expanding,
-            QSizePolicy.Policy.Expanding
-        )
-        layout.addWidget(self.chart_sources)
+        self.chart_sources = None
+        self._placeholder_sources = self._create_chart_placeholder(400)
+        layout.addWidget(self._placeholder_sources)
 
         group.setLayout(layout)
         return group
 
+    def _create_chart_placeholder(self, min_height: int) -> QWidget:
+        """Создать пустую заглушку на месте будущего графика."""
+        placeholder = QWidget()
+        placeholder.setMinimumHeight(min_height)
+        placeholder.setSizePolicy(
+            QSizePolicy.Policy.Expanding,
+            QSizePolicy.Policy.Expanding
+        )
+        return placeholder
+
+    def _create_canvas(
+        self,
+        placeholder: QWidget,
+        figsize: tuple[float, float],
+        min_height: int,
+    ):
+        """Создать FigureCanvas и поставить его на место заглушки."""
+        _ensure_mpl_configured()
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        canvas = FigureCanvas(Figure(figsize=figsize, layout="constrained"))
+        canvas.setMinimumHeight(min_height)
+        canvas.setSizePolicy(
+            QSizePolicy.Policy.Expanding,
+            QSizePolicy.Policy.Expanding
+        )
+        self._charts_layout.replaceWidget(placeholder, canvas)
+        placeholder.deleteLater()
+        return canvas
+
+    def _build_chart_daily(self):
+        """Создать график динамики по дням."""
+        self.chart_daily = self._create_canvas(
+            self._placeholder_daily, (14, 6), 400)
+        self.chart_daily.mpl_connect(
+            "draw_event", lambda event: self._on_chart_drawn("daily"))
+
+    def _build_chart_managers(self):
+        """Создать график распределения по менеджерам."""
+        self.chart_managers = self._create_canvas(
+            self._placeholder_managers, (10, 10), 600)
+
+    def _build_chart_sources(self):
+        """Создать график по источникам."""
+        self.chart_sources = self._create_canvas(
+            self._placeholder_sources, (14, 6), 400)
+        self.chart_sources.mpl_connect(
+            "draw_event", lambda event: self._on_chart_drawn("sources"))
+
     def _create_export_section(self) -> QGroupBox:
         """Создать блок с кнопками экспорта."""
         group = QGroupBox("Экспорт отчётов")
+        group.setObjectName("analyticsGroup")
         layout = QHBoxLayout()
 
         self.btn_export_excel = QPushButton("📊 Экспорт в Excel")
@@ -282,68 +422,245 @@ class AnalyticsWidget(QWidget):
         return group
 
     def refresh_analytics(self):
-        """Обновить всю аналитику."""
+        """
+        Обновить всю аналитику.
+
+        Каждый блок пересчитывается только если изменились его входные данные
+        (ревизия истории в БД или DataFrame). Запросы к БД и агрегации
+        выполняются в фоне, графики рисуются в GUI-потоке по готовности.
+        """
+        if self._worker is not None:
+            # Расчёт уже идёт — повторим, когда он закончится
+            self._refresh_pending = True
+            return
+
+        revision = self.history_repo.revision()
+
+        # План обновления: блок -> отпечаток его входных данных
+        plan: Dict[str, Any] = {}
+        if not self._is_cached("stats", revision):
+            plan["stats"] = revision
+
+        # Окно графика динамики в днях сдвигается каждый день
+        daily_key = (revision, date.today())
+        if not self._is_cached("daily", daily_key):
+            plan["daily"] = daily_key
+
+        if self.bitrix_df is not None and not self.bitrix_df.empty:
+            managers_key = self._df_fingerprint(self.bitrix_df)
+            if not self._is_cached("managers", managers_key):
+                plan["managers"] = managers_key
+
+        if self.cleaned_df is not None and not self.cleaned_df.empty:
+            sources_key = self._df_fingerprint(self.cleaned_df)
+            if not self._is_cached("sources", sources_key):
+                plan["sources"] = sources_key
+
+        if not plan:
+            return
+
+        self.btn_refresh.setEnabled(False)
+        self._worker = run_in_background(
+            self._collect_analytics,
+            set(plan),
+            self.bitrix_df,
+            self.cleaned_df,
+            on_finished=lambda results: self._on_analytics_ready(plan, results),
+            on_error=self._on_analytics_failed,
+        )
+
+    def _collect_analytics(
+        self,
+        blocks: set,
+        bitrix_df: Optional[pd.DataFrame],
+        cleaned_df: Optional[pd.DataFrame],
+    ) -> Dict[str, Any]:
+        """
+        Собрать данные для блоков аналитики.
+
+        Выполняется в фоновом потоке: только запросы к БД и агрегации,
+        без обращения к Qt-виджетам.
+        """
+        service = self.analytics_service
+        results: Dict[str, Any] = {}
+        if "stats" in blocks:
+            results["stats"] = service.get_overall_stats()
+        if "daily" in blocks:
+            results["daily"] = service.get_daily_stats(days=_DAILY_DAYS)
+        if "managers" in blocks:
+            results["managers"] = service.get_manager_distribution(bitrix_df)
+        if "sources" in blocks:
+            results["sources"] = service.get_sources_distribution(cleaned_df)
+        return results
+
+    def _on_analytics_ready(self, plan: Dict[str, Any], results: Dict[str, Any]):
+        """Отобразить посчитанную аналитику (GUI-поток)."""
+        self._worker = None
+        self.btn_refresh.setEnabled(True)
+
         try:
             # Обновляем карточки статистики
-            stats = self.analytics_service.get_overall_stats()
-            self._update_stats_cards(stats)
+            if "stats" in results:
+                self._update_stats_cards(results["stats"])
 
             # Обновляем график динамики
-            fig_daily = self.analytics_service.create_daily_chart(days=30)
-            self.chart_daily.figure = fig_daily
-            self.chart_daily.draw()
-
-            # Обновляем график по менеджерам (если есть данные)
-            if self.bitrix_df is not None and not self.bitrix_df.empty:
-                fig_managers = self.analytics_service.create_manager_pie_chart(
-                    self.bitrix_df
+            if "daily" in results:
+                self._show_daily_chart(results["daily"])
+
+            # Обновляем график по менеджерам
+            if "managers" in results:
+                if self.chart_managers is None:
+                    self._build_chart_managers()
+                self.analytics_service.create_manager_pie_chart(
+                    self.bitrix_df,
+                    fig=self.chart_managers.figure,
+                    distribution=results["managers"],
                 )
-                self.chart_managers.figure = fig_managers
-                self.chart_managers.draw()
-
-            # Обновляем график по источникам (если есть данные)
-            if self.cleaned_df is not None and not self.cleaned_df.empty:
-                fig_sources = self.analytics_service.create_sources_bar_chart(
-                    self.cleaned_df
-                )
-                self.chart_sources.figure = fig_sources
-                self.chart_sources.draw()
+                self._request_draw("managers")
+
+            # Обновляем график по источникам
+            if "sources" in results:
+                if self.chart_sources is None:
+                    self._build_chart_sources()
+                if not self._update_chart_in_place("sources", results["sources"]):
+                    self._backgrounds.pop("sources", None)
+                    self.analytics_service.create_sources_bar_chart(
+                        self.cleaned_df,
+                        fig=self.chart_sources.figure,
+                        sources=results["sources"],
+                        animated=True,
+                    )
+                    self._request_draw("sources")
+
+            for key, fingerprint in plan.items():
+                self._cache[key] = (fingerprint, results[key])
 
             logger.info("Аналитика обновлена")
 
         except Exception as exc:
-            logger.exception("Ошибка обновления аналитики")
-            QMessageBox.warning(
-                self,
-                "Ошибка",
-                f"Не удалось обновить аналитику:\n{exc}",
-            )
-
-    def _update_stats_cards(self, stats: dict):
-        """Обновить значения в карточках статистики."""
-        # Обновляем карточки (находим QLabel с значением и меняем текст)
-        self._update_card_value(
-            self.card_total_leads, f"{stats['total_valid_leads']:,}"
-        )
-        self._update_card_value(
-            self.card_unique_phones, f"{stats['total_unique_phones']:,}"
-        )
-        self._update_card_value(
-            self.card_duplicates, f"{stats['total_duplicates']:,}"
+            self._show_refresh_error(exc)
+
+        if self._refresh_pending:
+            self._refresh_pending = False
+            self.refresh_analytics()
+
+    def _on_analytics_failed(self, exc: Exception):
+        """Обработать ошибку фонового расчёта аналитики."""
+        self._worker = None
+        self.btn_refresh.setEnabled(True)
+        self._refresh_pending = False
+        self._show_refresh_error(exc)
+
+    def _show_refresh_error(self, exc: Exception):
+        """Показать ошибку обновления аналитики."""
+        logger.error("Ошибка обновления аналитики", exc_info=exc)
+        QMessageBox.warning(
+            self,
+            "Ошибка",
+            f"Не удалось обновить аналитику:\n{exc}",
         )
-        self._update_card_value(
-            self.card_invalid, f"{stats['total_invalid_phones']:,}"
+
+    def _chart_canvas(self, key: str):
+        """Получить холст графика по ключу ("daily", "managers", "sources")."""
+        return {
+            "daily": self.chart_daily,
+            "managers": self.chart_managers,
+            "sources": self.chart_sources,
+        }[key]
+
+    def _request_draw(self, key: str):
+        """
+        Запросить перерисовку графика.
+
+        Видимый график перерисовывается через draw_idle() (Qt объединит
+        запросы в одну отрисовку), скрытый — помечается грязным до showEvent.
+        """
+        canvas = self._chart_canvas(key)
+        if canvas.isVisible():
+            canvas.draw_idle()
+            self._dirty[key] = False
+        else:
+            self._dirty[key] = True
+
+    def _show_daily_chart(self, daily_df: pd.DataFrame):
+        """Обновить график динамики по дням."""
+        if self.chart_daily is None:
+            self._build_chart_daily()
+        elif self._update_chart_in_place("daily", daily_df):
+            return
+
+        self._backgrounds.pop("daily", None)
+        self.analytics_service.create_daily_chart(
+            days=_DAILY_DAYS,
+            fig=self.chart_daily.figure,
+            daily_df=daily_df,
+            animated=True,
         )
-        self._update_card_value(self.card_files, f"{stats['total_files']:,}")
+        self._request_draw("daily")
+
+    def _update_chart_in_place(self, key: str, data: Any) -> bool:
+        """
+        Обновить данные графика блиттингом, без полной перерисовки.
 
-    def _update_card_value(self, card: StatCard, value: str):
-        """Обновить значение в карточке."""
-        # StatCard — это виджет из gui.analytics_widget
-        # Находим QLabel с большим шрифтом (это значение)
-        for child in card.findChildren(QLabel):
-            if "24px" in child.styleSheet() or "color: #64B5F6" in child.styleSheet():
-                child.setText(value)
-                break
+        Оси, подписи и сетка берутся из сохранённого фона, заново рисуются
+        только animated-артисты (линия/столбцы).
+
+        Returns:
+            False, если блиттинг невозможен (нет фона, график скрыт или
+            данные не помещаются в текущие оси) — нужна полная перерисовка.
+        """
+        canvas = self._chart_canvas(key)
+        if key not in self._backgrounds or not canvas.isVisible():
+            return False
+
+        updaters = {
+            "daily": self.analytics_service.update_daily_chart,
+            "sources": self.analytics_service.update_sources_chart,
+        }
+        if not updaters[key](canvas.figure.axes[0], data):
+            return False
+
+        canvas.restore_region(self._backgrounds[key])
+        self._draw_animated(canvas.figure)
+        canvas.blit(canvas.figure.bbox)
+        return True
+
+    def _on_chart_drawn(self, key: str):
+        """После полной отрисовки: сохранить фон и дорисовать animated-артисты."""
+        canvas = self._chart_canvas(key)
+        self._backgrounds[key] = canvas.copy_from_bbox(canvas.figure.bbox)
+        self._draw_animated(canvas.figure)
+
+    @staticmethod
+    def _draw_animated(figure):
+        """Нарисовать animated-артисты фигуры (полная отрисовка их пропускает)."""
+        for ax in figure.axes:
+            for artist in ax.get_children():
+                if artist.get_animated():
+                    ax.draw_artist(artist)
+
+    def showEvent(self, event):
+        """Перерисовать графики, обновлённые пока виджет был скрыт."""
+        super().showEvent(event)
+        for key, dirty in self._dirty.items():
+            if dirty:
+                self._chart_canvas(key).draw_idle()
+                self._dirty[key] = False
+
+    def _is_cached(self, key: str, fingerprint: Any) -> bool:
+        """Проверить, что блок key уже посчитан для тех же входных данных."""
+        cached = self._cache.get(key)
+        return cached is not None and cached[0] == fingerprint
+
+    @staticmethod
+    def _df_fingerprint(df: pd.DataFrame) -> tuple:
+        """Дешёвый отпечаток DataFrame: объект, размер и набор колонок."""
+        return (id(df), len(df), hash(tuple(df.columns)))
+
+    def _update_stats_cards(self, stats: dict):
+        """Обновить значения в карточках статистики."""
+        for index, (key, _) in enumerate(_STAT_CARDS):
+            self.stat_cards.set_value(index, f"{stats[key]:,}")
 
     def set_data(self, cleaned_df: pd.DataFrame, bitrix_df: pd.DataFrame):
         """
@@ -353,41 +670,59 @@ class AnalyticsWidget(QWidget):
         """
         self.cleaned_df = cleaned_df
         self.bitrix_df = bitrix_df
+        self._cache.pop("managers", None)
+        self._cache.pop("sources", None)
         self.refresh_analytics()
 
     def _on_export_excel_clicked(self):
-        """Экспортировать отчёт в Excel."""
-        try:
-            stats = self.analytics_service.get_overall_stats()
+        """Экспортировать отчёт в Excel (запись файла — в фоне)."""
+        default_name = f"analytics_report_{datetime.now():%Y-%m-%d_%H-%M-%S}.xlsx"
+        default_path = str(settings.paths.reports_dir / default_name)
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Сохранить отчёт Excel",
+            default_path,
+            "Excel Files (*.xlsx);;All Files (*)",
+        )
 
-            default_name = f"analytics_report_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
-            default_path = str(settings.paths.reports_dir / default_name)
+        if not file_path:
+            return
 
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Сохранить отчёт Excel",
-                default_path,
-                "Excel Files (*.xlsx);;All Files (*)",
-            )
+        output_path = Path(file_path)
+        self.btn_export_excel.setEnabled(False)
+        run_in_background(
+            self._export_excel_report,
+            output_path,
+            on_finished=self._on_export_excel_finished,
+            on_error=self._on_export_excel_failed,
+        )
 
-            if not file_path:
-                return
+    def _export_excel_report(self, output_path: Path) -> Path:
+        """Собрать статистику и записать Excel-отчёт (фоновый поток)."""
+        stats = self.analytics_service.get_overall_stats()
+        self.analytics_service.export_excel_report(output_path, stats)
+        return output_path
 
-            output_path = Path(file_path)
-            self.analytics_service.export_excel_report(output_path, stats)
+    def _on_export_excel_finished(self, output_path: Path):
+        """Сообщить об успешном экспорте."""
+        self.btn_export_excel.setEnabled(True)
 
-            QMessageBox.information(
-                self,
-                "✅ Экспорт завершён",
-                f"Отчёт сохранён:\n{output_path}",
-            )
+        QMessageBox.information(
+            self,
+            "✅ Экспорт завершён",
+            f"Отчёт сохранён:\n{output_path}",
+        )
 
-            logger.info(f"Excel-отчёт экспортирован: {output_path}")
+        logger.info(f"Excel-отчёт экспортирован: {output_path}")
 
-        except Exception as exc:
-            logger.exception("Ошибка экспорта отчёта")
-            QMessageBox.critical(
-                self,
-                "❌ Ошибка",
-                f"Не удалось экспортировать отчёт:\n{exc}",
-            )
+    def _on_export_excel_failed(self, exc: Exception):
+        """Сообщить об ошибке экспорта."""
+        self.btn_export_excel.setEnabled(True)
+
+        logger.error("Ошибка экспорта отчёта", exc_info=exc)
+        QMessageBox.critical(
+            self,
+            "❌ Ошибка",
+            f"Не удалось экспортировать отчёт:\n{exc}",
+        )
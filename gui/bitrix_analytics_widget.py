@@ -9,33 +9,207 @@
 """
 
 import logging
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
-import pandas as pd
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
+    QGridLayout,
     QLabel,
     QPushButton,
     QGroupBox,
+    QFrame,
     QFileDialog,
     QMessageBox,
     QTextEdit,
     QScrollArea,
 )
 from PyQt6.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 
-from services.bitrix_analytics_service import BitrixAnalyticsService
+from core.exceptions import FileProcessingError
+from gui.workers import Worker, run_in_background
 from config.settings import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Карточки статистики (по колонке сетки на карточку):
+# (ключ метрики, заголовок, формат значения)
+_STAT_CARDS = (
+    ("total_leads", "Всего записей", "{:,}"),
+    ("total_deal_records", "В работе (DEAL)", "{:,}"),
+    ("total_rejections", "Отказы (LEAD)", "{:,}"),
+    ("successful_deals", "Успешные продажи", "{:,}"),
+    ("conversion", "Конверсия", "{}%"),
+)
+
+# Палитры графиков (тёмная тема)
+_REJECTION_PALETTE = ('#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8')
+_STAGE_PALETTE = ('#4ECDC4', '#45B7D1', '#5DADE2', '#64B5F6', '#7EC8E3')    # Бирюзовые
+_MANAGER_PALETTE = ('#FF6B6B', '#FF8787', '#FFA07A', '#FFB399', '#FFC4B3')  # Коралловые
+
+# DPI фигур графиков (высота холстов фиксирована в пикселях)
+_CHART_DPI = 96
+
+# rcParams на время пакетного обновления графиков: без autolayout
+# (раскладка — constrained layout фигур) и с упрощением путей
+_BATCH_RC = {
+    "figure.autolayout": False,
+    "path.simplify": True,
+    "path.simplify_threshold": 1.0,
+}
+
+# Тёмная тема графиков (применяется к rcParams один раз на процесс)
+_DARK_RC = {
+    'figure.facecolor': '#1e1e1e',      # Фон графика
+    'axes.facecolor': '#2d2d2d',        # Фон области с данными
+    'axes.edgecolor': '#555',           # Цвет рамки
+    'axes.labelcolor': '#e0e0e0',       # Цвет подписей осей
+    'text.color': '#e0e0e0',            # Цвет текста
+    'xtick.color': '#e0e0e0',           # Цвет меток X
+    'ytick.color': '#e0e0e0',           # Цвет меток Y
+    'grid.color': '#444',               # Цвет сетки
+    'legend.facecolor': '#2d2d2d',      # Фон легенды
+    'legend.edgecolor': '#555',         # Рамка легенды
+}
+
+# Стили виджета (тёмная тема): отдельные элементы выбираются по objectName,
+# статус загрузки — по динамическому свойству state
+_BITRIX_QSS = """
+    QWidget {
+        background-color: #1e1e1e;
+        color: #e0e0e0;
+    }
+    QGroupBox {
+        background-color: #2d2d2d;
+        border: 1px solid #444;
+        border-radius: 8px;
+        margin-top: 10px;
+        padding-top: 15px;
+        font-weight: bold;
+        color: #ffffff;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px;
+    }
+    QLabel {
+        color: #e0e0e0;
+        background: transparent;
+    }
+    QPushButton {
+        background-color: #3a3a3a;
+        color: #ffffff;
+        border: 1px solid #555;
+        border-radius: 5px;
+        padding: 8px 15px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #4a4a4a;
+        border: 1px solid #666;
+    }
+    QPushButton:pressed {
+        background-color: #2a2a2a;
+    }
+    QPushButton:disabled {
+        background-color: #2a2a2a;
+        color: #666;
+    }
+    QTextEdit {
+        background-color: #2d2d2d;
+        color: #d4d4d4;
+        border: 1px solid #444;
+        border-radius: 5px;
+        padding: 10px;
+    }
+    QScrollArea {
+        background-color: #1e1e1e;
+        border: none;
+    }
+    QLabel#bitrixHeader {
+        font-size: 18px;
+        font-weight: bold;
+        margin: 10px;
+    }
+    QLabel#bitrixInstruction {
+        color: #666;
+        padding: 10px;
+        background: #f8f9fa;
+        border-radius: 5px;
+    }
+    QLabel#loadStatus {
+        color: #999;
+        font-style: italic;
+    }
+    QLabel#loadStatus[state="pending"] {
+        color: orange;
+        font-style: normal;
+    }
+    QLabel#loadStatus[state="ok"] {
+        color: green;
+        font-style: normal;
+    }
+    QLabel#loadStatus[state="done"] {
+        color: green;
+        font-style: normal;
+        font-weight: bold;
+    }
+    QPushButton#primaryBtn {
+        background-color: #4CAF50;
+        color: white;
+        font-weight: bold;
+        padding: 10px;
+    }
+    QTextEdit#reportText {
+        font-family: 'Courier New', monospace;
+        background: #1e1e1e;
+    }
+    QFrame#statCard {
+        background: qlineargradient(
+            x1:0, y1:0, x2:0, y2:1,
+            stop:0 #2d2d2d, stop:1 #252525
+        );
+        border-radius: 8px;
+        border: 1px solid #444;
+    }
+    QLabel#statTitle {
+        font-size: 12px;
+        color: #999;
+        font-weight: normal;
+    }
+    QLabel#statValue {
+        font-size: 24px;
+        color: #64B5F6;
+        font-weight: bold;
+    }
+"""
+
+# Флаг: тёмная тема matplotlib уже применена
+_MPL_CONFIGURED = False
+
+
+def _configure_mpl_dark_theme() -> None:
+    """
+    Применить тёмную тему matplotlib один раз на процесс.
+
+    rcParams.update валидирует каждый ключ, поэтому повторные вызовы
+    (второй экземпляр виджета) пропускаются.
+    """
+    global _MPL_CONFIGURED
+    if _MPL_CONFIGURED:
+        return
+
+    import matplotlib
+
+    matplotlib.rcParams.update(_DARK_RC)
+    _MPL_CONFIGURED = True
+
 
 class BitrixAnalyticsWidget(QWidget):
     """Виджет аналитики по экспортам Битрикс24."""
@@ -43,28 +217,20 @@ class BitrixAnalyticsWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        # ========== ТЕМНАЯ ТЕМА ДЛЯ MATPLOTLIB ==========
-        import matplotlib
-        matplotlib.rcParams.update({
-            'figure.facecolor': '#1e1e1e',      # Фон графика
-            'axes.facecolor': '#2d2d2d',        # Фон области с данными
-            'axes.edgecolor': '#555',           # Цвет рамки
-            'axes.labelcolor': '#e0e0e0',       # Цвет подписей осей
-            'text.color': '#e0e0e0',            # Цвет текста
-            'xtick.color': '#e0e0e0',           # Цвет меток X
-            'ytick.color': '#e0e0e0',           # Цвет меток Y
-            'grid.color': '#444',               # Цвет сетки
-            'legend.facecolor': '#2d2d2d',      # Фон легенды
-            'legend.edgecolor': '#555',         # Рамка легенды
-        })
-
-        # Сервис
-        self.analytics_service = BitrixAnalyticsService()
+        # Сервис (вместе с pandas) и графики (matplotlib) создаются
+        # при первом анализе, а не при открытии приложения
+        self.analytics_service = None
 
         # Пути к загруженным файлам
         self.lead_path: Optional[Path] = None
         self.deal_path: Optional[Path] = None
 
+        # Фоновый анализ (не больше одного одновременно)
+        self._worker: Optional[Worker] = None
+
+        # Текст последнего отчёта (для экспорта в TXT без пересборки)
+        self._last_report_text = ""
+
         self._setup_ui()
         logger.info("Виджет Битрикс-аналитики инициализирован")
 
@@ -74,8 +240,7 @@ class BitrixAnalyticsWidget(QWidget):
 
         # Заголовок
         header = QLabel("📊 Битрикс24 — Аналитика результатов")
-        header.setStyleSheet(
-            "font-size: 18px; font-weight: bold; margin: 10px;")
+        header.setObjectName("bitrixHeader")
         main_layout.addWidget(header)
 
         # Скролл-область
@@ -108,61 +273,7 @@ class BitrixAnalyticsWidget(QWidget):
         scroll.setWidget(scroll_content)
         main_layout.addWidget(scroll)
 
-        # ========== ТЕМНАЯ ТЕМА ДЛЯ ВСЕГО ВИДЖЕТА ==========
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #1e1e1e;
-                color: #e0e0e0;
-            }
-            QGroupBox {
-                background-color: #2d2d2d;
-                border: 1px solid #444;
-                border-radius: 8px;
-                margin-top: 10px;
-                padding-top: 15px;
-                font-weight: bold;
-                color: #ffffff;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px;
-            }
-            QLabel {
-                color: #e0e0e0;
-                background: transparent;
-            }
-            QPushButton {
-                background-color: #3a3a3a;
-                color: #ffffff;
-                border: 1px solid #555;
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #4a4a4a;
-                border: 1px solid #666;
-            }
-            QPushButton:pressed {
-                background-color: #2a2a2a;
-            }
-            QPushButton:disabled {
-                background-color: #2a2a2a;
-                color: #666;
-            }
-            QTextEdit {
-                background-color: #2d2d2d;
-                color: #d4d4d4;
-                border: 1px solid #444;
-                border-radius: 5px;
-                padding: 10px;
-            }
-            QScrollArea {
-                background-color: #1e1e1e;
-                border: none;
-            }
-        """)
+        self.setStyleSheet(_BITRIX_QSS)
 
         self.setLayout(main_layout)
 
@@ -179,8 +290,7 @@ class BitrixAnalyticsWidget(QWidget):
             "   • DEAL.csv — все сделки (В работе)\n"
             "2. Загрузите их ниже для анализа"
         )
-        instruction.setStyleSheet(
-            "color: #666; padding: 10px; background: #f8f9fa; border-radius: 5px;")
+        instruction.setObjectName("bitrixInstruction")
         layout.addWidget(instruction)
 
         # Кнопки загрузки
@@ -195,9 +305,7 @@ class BitrixAnalyticsWidget(QWidget):
         self.btn_analyze = QPushButton("🔍 Анализировать")
         self.btn_analyze.clicked.connect(self._on_analyze_clicked)
         self.btn_analyze.setEnabled(False)
-        self.btn_analyze.setStyleSheet(
-            "background-color: #4CAF50; color: white; font-weight: bold; padding: 10px;"
-        )
+        self.btn_analyze.setObjectName("primaryBtn")
 
         buttons_layout.addWidget(self.btn_load_lead)
         buttons_layout.addWidget(self.btn_load_deal)
@@ -207,8 +315,7 @@ class BitrixAnalyticsWidget(QWidget):
 
         # Статус загрузки
         self.label_load_status = QLabel("⏳ Загрузите оба файла")
-        self.label_load_status.setStyleSheet(
-            "color: #999; font-style: italic;")
+        self.label_load_status.setObjectName("loadStatus")
         layout.addWidget(self.label_load_status)
 
         group.setLayout(layout)
@@ -219,8 +326,15 @@ class BitrixAnalyticsWidget(QWidget):
         group = QGroupBox("2. Общая статистика")
         layout = QVBoxLayout()
 
-        # Карточки создаются при анализе
-        self.stats_layout = QHBoxLayout()
+        # Карточки создаются один раз (одна строка сетки, колонки
+        # растягиваются поровну), при анализе меняется только текст значений
+        self.stats_layout = QGridLayout()
+        self._stat_value_labels: List[QLabel] = []
+        for column, (_, title, _) in enumerate(_STAT_CARDS):
+            self.stats_layout.setColumnStretch(column, 1)
+            card, value_label = self._create_stat_card(title, "0")
+            self.stats_layout.addWidget(card, 0, column)
+            self._stat_value_labels.append(value_label)
         layout.addLayout(self.stats_layout)
 
         group.setLayout(layout)
@@ -228,34 +342,58 @@ class BitrixAnalyticsWidget(QWidget):
         return group
 
     def _create_charts_section(self) -> QGroupBox:
-        """Блок графиков."""
+        """Блок графиков (холсты создаются при первом показе результатов)."""
         group = QGroupBox("3. Визуализация")
-        layout = QVBoxLayout()
+        group.setLayout(QVBoxLayout())
+        group.setVisible(False)
+
+        self.chart_rejections = None
+        self.chart_stages = None
+        self.chart_managers = None
+        return group
+
+    def _create_chart_canvases(self):
+        """Создать холсты и оси графиков (один раз, при первом анализе)."""
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        _configure_mpl_dark_theme()
+        layout = self.charts_group.layout()
+
+        def make_canvas(width: float, height_px: int) -> FigureCanvas:
+            # Фиксированные DPI и высота: фигура сразу создаётся под
+            # итоговый размер холста и растеризуется один раз при показе
+            figure = Figure(
+                figsize=(width, height_px / _CHART_DPI),
+                dpi=_CHART_DPI,
+                layout="constrained",
+            )
+            canvas = FigureCanvas(figure)
+            canvas.setFixedHeight(height_px)
+            layout.addWidget(canvas)
+            return canvas
 
         # График 1: Причины отказа (круговая диаграмма)
         layout.addWidget(QLabel("Причины отказа (ТОП-5):"))
-        self.chart_rejections = FigureCanvas(
-            Figure(figsize=(12, 8)))  # ← было (8, 6)
-        self.chart_rejections.setMinimumHeight(500)  # ← ДОБАВЬ ЭТУ СТРОКУ
-        layout.addWidget(self.chart_rejections)
+        self.chart_rejections = make_canvas(12, 500)
 
         # График 2: Стадии сделок (столбчатая диаграмма)
         layout.addWidget(QLabel("Стадии сделок:"))
-        self.chart_stages = FigureCanvas(
-            Figure(figsize=(14, 6)))  # ← было (10, 5)
-        self.chart_stages.setMinimumHeight(400)  # ← ДОБАВЬ ЭТУ СТРОКУ
-        layout.addWidget(self.chart_stages)
+        self.chart_stages = make_canvas(14, 400)
 
         # График 3: Топ-менеджеры (столбчатая диаграмма)
         layout.addWidget(QLabel("Топ-менеджеры по количеству сделок:"))
-        self.chart_managers = FigureCanvas(
-            Figure(figsize=(14, 6)))  # ← было (10, 5)
-        self.chart_managers.setMinimumHeight(400)  # ← ДОБАВЬ ЭТУ СТРОКУ
-        layout.addWidget(self.chart_managers)
+        self.chart_managers = make_canvas(14, 400)
 
-        group.setLayout(layout)
-        group.setVisible(False)
-        return group
+        # Оси создаются один раз и переиспользуются при каждом анализе;
+        # раскладку считает constrained layout (без tight_layout на обновлении)
+        self.ax_rejections = self.chart_rejections.figure.add_subplot(111)
+        self.ax_stages = self.chart_stages.figure.add_subplot(111)
+        self.ax_managers = self.chart_managers.figure.add_subplot(111)
+
+        # Столбцы последних графиков (для обновления высот на месте)
+        self._stage_bars = None
+        self._manager_bars = None
 
     def _create_report_section(self) -> QGroupBox:
         """Блок текстового отчёта."""
@@ -264,18 +402,7 @@ class BitrixAnalyticsWidget(QWidget):
 
         self.report_text = QTextEdit()
         self.report_text.setReadOnly(True)
-        self.report_text.setStyleSheet(
-            """
-            QTextEdit {
-                font-family: 'Courier New', monospace; 
-                background: #1e1e1e;
-                color: #d4d4d4;
-                padding: 10px;
-                border: 1px solid #444;
-                border-radius: 5px;
-            }
-            """
-        )
+        self.report_text.setObjectName("reportText")
         self.report_text.setMinimumHeight(300)
         layout.addWidget(self.report_text)
 
@@ -338,44 +465,65 @@ class BitrixAnalyticsWidget(QWidget):
                 f"✅ LEAD: {self.lead_path.name}\n"
                 f"✅ DEAL: {self.deal_path.name}"
             )
-            self.label_load_status.setStyleSheet("color: green;")
+            self._set_status_state("ok")
             self.btn_analyze.setEnabled(True)
         elif self.lead_path:
             self.label_load_status.setText(
                 f"✅ LEAD: {self.lead_path.name}\n⏳ Загрузите DEAL.csv")
-            self.label_load_status.setStyleSheet("color: orange;")
+            self._set_status_state("pending")
         elif self.deal_path:
             self.label_load_status.setText(
                 f"⏳ Загрузите LEAD.csv\n✅ DEAL: {self.deal_path.name}")
-            self.label_load_status.setStyleSheet("color: orange;")
+            self._set_status_state("pending")
+
+    def _set_status_state(self, state: str):
+        """
+        Сменить цвет статуса загрузки (свойство state в _BITRIX_QSS).
+
+        Стиль пересчитывается через unpolish/polish без разбора
+        новой таблицы стилей.
+        """
+        self.label_load_status.setProperty("state", state)
+        style = self.label_load_status.style()
+        style.unpolish(self.label_load_status)
+        style.polish(self.label_load_status)
 
     def _on_analyze_clicked(self):
-        """Запустить анализ."""
+        """Запустить анализ (в фоновом потоке)."""
         if not self.lead_path or not self.deal_path:
             QMessageBox.warning(self, "Ошибка", "Загрузите оба файла!")
             return
 
-        try:
-            # Шаг 1: Загрузка файлов
-            self.label_load_status.setText("⏳ Загрузка файлов...")
-            success, message = self.analytics_service.load_bitrix_exports(
-                self.lead_path, self.deal_path
-            )
-
-            if not success:
-                QMessageBox.critical(self, "Ошибка загрузки", message)
-                return
-
-            # Шаг 2: Фильтрация "наших" лидов
-            self.label_load_status.setText("⏳ Фильтрация 'наших' лидов...")
-            total_before, total_after = self.analytics_service.filter_my_leads()
+        # Загрузка, фильтрация "наших" лидов и расчёт метрик идут в фоне;
+        # повторный запуск и экспорт недоступны до завершения
+        self.btn_analyze.setEnabled(False)
+        self.btn_export_txt.setEnabled(False)
+        self.btn_export_excel.setEnabled(False)
+        self._last_report_text = ""
+        self.label_load_status.setText("⏳ Загрузка файлов...")
+
+        if self.analytics_service is None:
+            from services.bitrix_analytics_service import BitrixAnalyticsService
+            self.analytics_service = BitrixAnalyticsService()
+
+        self._worker = run_in_background(
+            self.analytics_service.analyze_exports,
+            self.lead_path,
+            self.deal_path,
+            on_finished=self._on_analyze_finished,
+            on_error=self._on_analyze_failed,
+            on_progress=self.label_load_status.setText,
+        )
 
-            logger.info(f"Фильтрация: {total_before} → {total_after}")
+    def _on_analyze_finished(self, result: Tuple[int, int, dict]):
+        """Показать результаты анализа (GUI-поток)."""
+        self._worker = None
+        self.btn_analyze.setEnabled(True)
+        total_before, total_after, metrics = result
 
-            # Шаг 3: Расчёт метрик
-            self.label_load_status.setText("⏳ Расчёт метрик...")
-            metrics = self.analytics_service.calculate_metrics()
+        logger.info(f"Фильтрация: {total_before} → {total_after}")
 
+        try:
             # Шаг 4: Отображение результатов
             self._display_results(metrics)
 
@@ -383,8 +531,7 @@ class BitrixAnalyticsWidget(QWidget):
                 f"✅ Анализ завершён!\n"
                 f"Всего записей: {total_before} → Наших лидов: {total_after}"
             )
-            self.label_load_status.setStyleSheet(
-                "color: green; font-weight: bold;")
+            self._set_status_state("done")
 
             # Включаем кнопки экспорта
             self.btn_export_txt.setEnabled(True)
@@ -393,12 +540,24 @@ class BitrixAnalyticsWidget(QWidget):
             logger.info("Анализ завершён успешно")
 
         except Exception as exc:
-            logger.exception("Ошибка при анализе")
-            QMessageBox.critical(
-                self,
-                "Ошибка анализа",
-                f"Не удалось выполнить анализ:\n{exc}",
-            )
+            self._on_analyze_failed(exc)
+
+    def _on_analyze_failed(self, exc: Exception):
+        """Обработать ошибку анализа (GUI-поток)."""
+        self._worker = None
+        self.btn_analyze.setEnabled(True)
+        self._update_load_status()
+
+        if isinstance(exc, FileProcessingError):
+            QMessageBox.critical(self, "Ошибка загрузки", exc.message)
+            return
+
+        logger.error("Ошибка при анализе", exc_info=exc)
+        QMessageBox.critical(
+            self,
+            "Ошибка анализа",
+            f"Не удалось выполнить анализ:\n{exc}",
+        )
 
     def _display_results(self, metrics: dict):
         """Отобразить результаты анализа."""
@@ -408,236 +567,241 @@ class BitrixAnalyticsWidget(QWidget):
         self.report_group.setVisible(True)
 
         # Карточки статистики
-        self._create_stat_cards(metrics)
-
-        # Графики
-        self._create_rejection_chart(metrics)
-        self._create_stages_chart(metrics)
-        self._create_managers_chart(metrics)
-
-        # Текстовый отчёт ← ПРОВЕРЬ ЭТУ ЧАСТЬ
-        report_text = self.analytics_service.get_report_summary()
-        self.report_text.setPlainText(report_text)  # ← ЭТА СТРОКА ДОЛЖНА БЫТЬ!
-
-        # ← ДОБАВЬ ОТЛАДКУ:
-        logger.info(f"Длина текста отчёта: {len(report_text)} символов")
-
-    def _create_stat_cards(self, metrics: dict):
-        """Создать карточки статистики."""
-        # Очищаем старые карточки
-        while self.stats_layout.count():
-            child = self.stats_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
-        # Создаём новые
-        cards_data = [
-            ("Всего записей", f"{metrics.get('total_leads', 0):,}"),
-            ("В работе (DEAL)", f"{metrics.get('total_deal_records', 0):,}"),
-            ("Отказы (LEAD)", f"{metrics.get('total_rejections', 0):,}"),
-            ("Успешные продажи", f"{metrics.get('successful_deals', 0):,}"),
-            ("Конверсия", f"{metrics.get('conversion', 0)}%"),
-        ]
+        self._update_stat_cards(metrics)
+
+        if self.chart_rejections is None:
+            self._create_chart_canvases()
+
+        import matplotlib
+
+        # Графики: артисты обновляются пачкой, а отрисовку через draw_idle()
+        # Qt выполнит одним проходом после возврата в цикл событий
+        with matplotlib.rc_context(_BATCH_RC):
+            self._create_rejection_chart(metrics)
+            self._create_stages_chart(metrics)
+            self._create_managers_chart(metrics)
 
-        for title, value in cards_data:
-            card = self._create_stat_card(title, value)
-            self.stats_layout.addWidget(card)
+        # Текстовый отчёт (сохраняем — его же пишет экспорт в TXT)
+        self._last_report_text = self.analytics_service.get_report_summary()
+        self.report_text.setPlainText(self._last_report_text)
 
-    def _create_stat_card(self, title: str, value: str) -> QWidget:
-        """Создать одну карточку статистики (темная тема)."""
-        card = QWidget()
+        logger.info(f"Длина текста отчёта: {len(self._last_report_text)} символов")
+
+    def _update_stat_cards(self, metrics: dict):
+        """Обновить значения карточек статистики."""
+        for value_label, (key, _, fmt) in zip(self._stat_value_labels, _STAT_CARDS):
+            value_label.setText(fmt.format(metrics.get(key, 0)))
+
+    def _create_stat_card(self, title: str, value: str) -> Tuple[QFrame, QLabel]:
+        """
+        Создать одну карточку статистики (темная тема).
+
+        Returns:
+            Карточка и её метка значения (для обновления текста).
+        """
+        card = QFrame()
+        card.setObjectName("statCard")
         layout = QVBoxLayout()
         layout.setContentsMargins(15, 15, 15, 15)
 
         # Заголовок
         title_label = QLabel(title)
-        title_label.setStyleSheet(
-            "font-size: 12px; color: #999; font-weight: normal;"
-        )
+        title_label.setObjectName("statTitle")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         # Значение
         value_label = QLabel(value)
-        value_label.setStyleSheet(
-            "font-size: 24px; color: #64B5F6; font-weight: bold;"  # Голубой цвет
-        )
+        value_label.setObjectName("statValue")
         value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         layout.addWidget(title_label)
         layout.addWidget(value_label)
 
         card.setLayout(layout)
-        card.setStyleSheet(
-            """
-            QWidget {
-                background: qlineargradient(
-                    x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2d2d2d, stop:1 #252525
-                );
-                border-radius: 8px;
-                border: 1px solid #444;
-            }
-            """
-        )
         card.setMinimumHeight(100)
         card.setMinimumWidth(150)
 
-        return card
+        return card, value_label
 
     def _create_rejection_chart(self, metrics: dict):
         """Создать график причин отказа (темная тема)."""
-        rejection_reasons = metrics.get("rejection_reasons", {})
+        rejection_reasons = metrics.get("rejection_reasons", Counter())
 
-        fig = self.chart_rejections.figure
-        fig.clear()
-        ax = fig.add_subplot(111)
+        ax = self.ax_rejections
+        ax.clear()
 
         if not rejection_reasons:
-            ax.text(
-                0.5, 0.5, "Нет данных о причинах отказа",
-                ha="center", va="center", fontsize=14, color="#999"
-            )
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-        else:
-            # ТОП-5 причин
-            top_reasons = dict(sorted(
-                rejection_reasons.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5])
-
-            labels = list(top_reasons.keys())
-            sizes = list(top_reasons.values())
-
-            # Темная цветовая палитра
-            colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
-
-            wedges, texts, autotexts = ax.pie(
-                sizes,
-                labels=labels,
-                autopct="%1.1f%%",
-                startangle=90,
-                colors=colors,
-                textprops={'color': '#e0e0e0'}
-            )
+            self._show_no_data(ax, "Нет данных о причинах отказа")
+            self.chart_rejections.draw_idle()
+            return
 
-            # Белый цвет для процентов
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_weight('bold')
-
-            ax.set_title(
-                "Причины отказа (ТОП-5)",
-                fontsize=14,
-                fontweight="bold",
-                color='#ffffff',
-                pad=20
-            )
+        # ТОП-5 причин
+        labels, sizes = zip(*rejection_reasons.most_common(5))
+
+        wedges, texts, autotexts = ax.pie(
+            sizes,
+            labels=labels,
+            autopct="%1.1f%%",
+            startangle=90,
+            colors=_REJECTION_PALETTE,
+            textprops={'color': '#e0e0e0'}
+        )
+
+        # Белый цвет для процентов
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_weight('bold')
+
+        ax.set_title(
+            "Причины отказа (ТОП-5)",
+            fontsize=14,
+            fontweight="bold",
+            color='#ffffff',
+            pad=20
+        )
 
-        fig.tight_layout()
-        self.chart_rejections.draw()
+        self.chart_rejections.draw_idle()
 
     def _create_stages_chart(self, metrics: dict):
         """Создать график стадий сделок (темная тема)."""
-        deal_stages = metrics.get("deal_stages", {})
+        deal_stages = metrics.get("deal_stages", Counter())
+        ranked = deal_stages.most_common()
+        stages = [stage for stage, _ in ranked]
+        counts = [count for _, count in ranked]
+
+        if self._update_bars_in_place(self.ax_stages, self._stage_bars, stages, counts):
+            self.chart_stages.draw_idle()
+            return
 
-        fig = self.chart_stages.figure
-        fig.clear()
-        ax = fig.add_subplot(111)
+        ax = self.ax_stages
+        ax.clear()
+        self._stage_bars = None
 
         if not deal_stages:
-            ax.text(
-                0.5, 0.5, "Нет данных о стадиях сделок",
-                ha="center", va="center", fontsize=14, color="#999"
-            )
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-        else:
-            stages = list(deal_stages.keys())
-            counts = list(deal_stages.values())
-
-            bars = ax.bar(
-                range(len(stages)),
-                counts,
-                color='#4ECDC4',  # Бирюзовый
-                edgecolor='#2d9cdb',
-                linewidth=1.5
-            )
+            self._show_no_data(ax, "Нет данных о стадиях сделок")
+            self.chart_stages.draw_idle()
+            return
 
-            # Градиент для баров
-            for i, bar in enumerate(bars):
-                bar.set_color(['#4ECDC4', '#45B7D1', '#5DADE2',
-                              '#64B5F6', '#7EC8E3'][i % 5])
-
-            ax.set_xticks(range(len(stages)))
-            ax.set_xticklabels(stages, rotation=45, ha="right")
-            ax.set_xlabel("Стадия", fontsize=12, color='#e0e0e0')
-            ax.set_ylabel("Количество сделок", fontsize=12, color='#e0e0e0')
-            ax.set_title(
-                "Стадии сделок",
-                fontsize=14,
-                fontweight="bold",
-                color='#ffffff',
-                pad=20
-            )
-            ax.grid(axis="y", alpha=0.2, color='#555')
+        # Градиент для баров: цвета задаются одним вызовом ax.bar
+        colors = [
+            _STAGE_PALETTE[i % len(_STAGE_PALETTE)] for i in range(len(stages))
+        ]
+        bars = ax.bar(
+            range(len(stages)),
+            counts,
+            color=colors,
+            edgecolor=colors,
+            linewidth=1.5
+        )
+
+        ax.set_xticks(range(len(stages)))
+        ax.set_xticklabels(stages, rotation=45, ha="right")
+        ax.set_xlabel("Стадия", fontsize=12, color='#e0e0e0')
+        ax.set_ylabel("Количество сделок", fontsize=12, color='#e0e0e0')
+        ax.set_title(
+            "Стадии сделок",
+            fontsize=14,
+            fontweight="bold",
+            color='#ffffff',
+            pad=20
+        )
+        ax.grid(axis="y", alpha=0.2, color='#555')
+        self._stage_bars = bars
 
-        fig.tight_layout()
-        self.chart_stages.draw()
+        self.chart_stages.draw_idle()
 
     def _create_managers_chart(self, metrics: dict):
         """Создать график топ-менеджеров (темная тема)."""
-        top_managers = metrics.get("top_managers", {})
+        top_managers = metrics.get("top_managers", Counter())
+        ranked = top_managers.most_common()
+        managers = [manager for manager, _ in ranked]
+        counts = [count for _, count in ranked]
+
+        if self._update_bars_in_place(
+            self.ax_managers, self._manager_bars, managers, counts
+        ):
+            self.chart_managers.draw_idle()
+            return
 
-        fig = self.chart_managers.figure
-        fig.clear()
-        ax = fig.add_subplot(111)
+        ax = self.ax_managers
+        ax.clear()
+        self._manager_bars = None
 
         if not top_managers:
-            ax.text(
-                0.5, 0.5, "Нет данных о менеджерах",
-                ha="center", va="center", fontsize=14, color="#999"
-            )
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-        else:
-            managers = list(top_managers.keys())
-            counts = list(top_managers.values())
-
-            bars = ax.bar(
-                range(len(managers)),
-                counts,
-                color='#FF6B6B',  # Коралловый
-                edgecolor='#e55353',
-                linewidth=1.5
-            )
+            self._show_no_data(ax, "Нет данных о менеджерах")
+            self.chart_managers.draw_idle()
+            return
 
-            # Градиент
-            for i, bar in enumerate(bars):
-                bar.set_color(['#FF6B6B', '#FF8787', '#FFA07A',
-                              '#FFB399', '#FFC4B3'][i % 5])
-
-            ax.set_xticks(range(len(managers)))
-            ax.set_xticklabels(managers, rotation=45, ha="right")
-            ax.set_xlabel("Менеджер", fontsize=12, color='#e0e0e0')
-            ax.set_ylabel("Количество сделок", fontsize=12, color='#e0e0e0')
-            ax.set_title(
-                "Топ-менеджеры",
-                fontsize=14,
-                fontweight="bold",
-                color='#ffffff',
-                pad=20
-            )
-            ax.grid(axis="y", alpha=0.2, color='#555')
+        # Градиент: цвета задаются одним вызовом ax.bar
+        colors = [
+            _MANAGER_PALETTE[i % len(_MANAGER_PALETTE)]
+            for i in range(len(managers))
+        ]
+        bars = ax.bar(
+            range(len(managers)),
+            counts,
+            color=colors,
+            edgecolor=colors,
+            linewidth=1.5
+        )
+
+        ax.set_xticks(range(len(managers)))
+        ax.set_xticklabels(managers, rotation=45, ha="right")
+        ax.set_xlabel("Менеджер", fontsize=12, color='#e0e0e0')
+        ax.set_ylabel("Количество сделок", fontsize=12, color='#e0e0e0')
+        ax.set_title(
+            "Топ-менеджеры",
+            fontsize=14,
+            fontweight="bold",
+            color='#ffffff',
+            pad=20
+        )
+        ax.grid(axis="y", alpha=0.2, color='#555')
+        self._manager_bars = bars
 
-        fig.tight_layout()
-        self.chart_managers.draw()
+        self.chart_managers.draw_idle()
+
+    @staticmethod
+    def _show_no_data(ax, message: str):
+        """
+        Показать на осях надпись об отсутствии данных.
+
+        Оси скрываются: без тиков и подписей constrained layout
+        почти нечего раскладывать.
+        """
+        ax.set_axis_off()
+        ax.text(
+            0.5, 0.5, message,
+            ha="center", va="center", fontsize=14, color="#999",
+            transform=ax.transAxes,
+        )
+
+    @staticmethod
+    def _update_bars_in_place(ax, bars, labels: list, counts: list) -> bool:
+        """
+        Обновить столбчатый график без пересоздания артистов.
+
+        Возможно, если число категорий не изменилось: меняются высоты
+        столбцов и подписи, пределы оси Y пересчитываются.
+
+        Returns:
+            False, если график нужно построить заново.
+        """
+        if bars is None or not counts or len(bars) != len(counts):
+            return False
+
+        for bar, count in zip(bars, counts):
+            bar.set_height(count)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha="right")
+        ax.relim()
+        ax.autoscale_view()
+        return True
 
     def _on_export_txt_clicked(self):
         """Экспортировать отчёт в TXT."""
         try:
-            default_name = f"bitrix_report_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+            default_name = f"bitrix_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
             default_path = str(settings.paths.reports_dir / default_name)
 
             file_path, _ = QFileDialog.getSaveFileName(
@@ -652,11 +816,9 @@ class BitrixAnalyticsWidget(QWidget):
 
             output_path = Path(file_path)
 
-            # Получаем текстовую сводку
-            report_text = self.analytics_service.get_report_summary()
-
-            # Сохраняем в файл
-            output_path.write_text(report_text, encoding="utf-8")
+            # Сохраняем текстовую сводку, показанную после анализа
+            # (байты пишутся напрямую, без текстовой обёртки файла)
+            output_path.write_bytes(self._last_report_text.encode("utf-8"))
 
             QMessageBox.information(
                 self,
@@ -677,7 +839,7 @@ class BitrixAnalyticsWidget(QWidget):
     def _on_export_excel_clicked(self):
         """Экспортировать отчёт в Excel."""
         try:
-            default_name = f"bitrix_report_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+            default_name = f"bitrix_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
             default_path = str(settings.paths.reports_dir / default_name)
 
             file_path, _ = QFileDialog.getSaveFileName(
@@ -720,30 +882,62 @@ class BitrixAnalyticsWidget(QWidget):
         - Причины отказа
         - Стадии сделок
         - Топ-менеджеры
+
+        Книга открывается в режиме write_only: строки сразу уходят в файл,
+        а стили назначаются ячейкам WriteOnlyCell при добавлении строки.
         """
         from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from openpyxl.chart import PieChart, BarChart, Reference
-
-        wb = Workbook()
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
 
-        # Лист 1: СВОДКА
-        ws_summary = wb.active
-        ws_summary.title = "Сводка"
+        # Стили создаются один раз и назначаются ячейкам по ссылке
+        bold = Font(bold=True)
+        header_font_white = Font(color="FFFFFF", bold=True)
+        header_font_black = Font(color="000000", bold=True)
 
-        # Заголовок
-        ws_summary["A1"] = "ОТЧЁТ ПО БИТРИКС24"
-        ws_summary["A1"].font = Font(size=16, bold=True)
-        ws_summary.merge_cells("A1:B1")
+        def solid_fill(color: str) -> PatternFill:
+            return PatternFill(start_color=color, end_color=color, fill_type="solid")
 
-        # Дата
-        ws_summary["A2"] = "Дата генерации:"
-        ws_summary["B2"] = pd.Timestamp.now().strftime("%d.%m.%Y %H:%M")
+        header_fill_blue = solid_fill("4472C4")
+        header_fill_green = solid_fill("70AD47")
+        header_fill_yellow = solid_fill("FFC000")
 
-        # Метрики
+        def new_sheet(title: str, columns: str = "AB"):
+            """
+            Лист с шириной 30 у используемых колонок (задаётся до первой
+            строки; у неиспользуемых колонок записи ширины не создаются).
+            """
+            ws = wb.create_sheet(title)
+            for col in columns:
+                ws.column_dimensions[col].width = 30
+            return ws
+
+        def header_row(ws, titles: List[str], font: Font, fill: PatternFill):
+            """Строка заголовка с заданными шрифтом и заливкой."""
+            row = []
+            for title in titles:
+                cell = WriteOnlyCell(ws, value=title)
+                cell.font = font
+                cell.fill = fill
+                row.append(cell)
+            return row
+
+        wb = Workbook(write_only=True)
         metrics = self.analytics_service.metrics
-        row = 4
 
+        # Лист 1: СВОДКА
+        ws_summary = new_sheet("Сводка")
+
+        # Заголовок и дата
+        title = WriteOnlyCell(ws_summary, value="ОТЧЁТ ПО БИТРИКС24")
+        title.font = Font(size=16, bold=True)
+        ws_summary.append([title])
+        ws_summary.append(
+            ["Дата генерации:", datetime.now().strftime("%d.%m.%Y %H:%M")]
+        )
+        ws_summary.append([])
+
+        # Метрики
         summary_data = [
             ("Всего записей", metrics.get("total_leads", 0)),
             ("Лиды (LEAD)", metrics.get("total_lead_records", 0)),
@@ -752,83 +946,50 @@ class BitrixAnalyticsWidget(QWidget):
             ("Успешные продажи", metrics.get("successful_deals", 0)),
             ("Конверсия", f"{metrics.get('conversion', 0)}%"),
         ]
-
         for label, value in summary_data:
-            ws_summary[f"A{row}"] = label
-            ws_summary[f"B{row}"] = value
-            ws_summary[f"A{row}"].font = Font(bold=True)
-            row += 1
+            label_cell = WriteOnlyCell(ws_summary, value=label)
+            label_cell.font = bold
+            ws_summary.append([label_cell, value])
 
         # Лист 2: ПРИЧИНЫ ОТКАЗА
-        ws_rejections = wb.create_sheet("Причины отказа")
-        ws_rejections["A1"] = "Причина"
-        ws_rejections["B1"] = "Количество"
-        ws_rejections["C1"] = "Процент"
-
-        # Стили заголовка
-        for cell in ["A1", "B1", "C1"]:
-            ws_rejections[cell].font = Font(bold=True)
-            ws_rejections[cell].fill = PatternFill(
-                start_color="4472C4", end_color="4472C4", fill_type="solid"
-            )
-            ws_rejections[cell].font = Font(color="FFFFFF", bold=True)
-
-        rejection_reasons = metrics.get("rejection_reasons", {})
+        ws_rejections = new_sheet("Причины отказа", "ABC")
+        ws_rejections.append(header_row(
+            ws_rejections,
+            ["Причина", "Количество", "Процент"],
+            header_font_white,
+            header_fill_blue,
+        ))
+
+        rejection_reasons = metrics.get("rejection_reasons", Counter())
         total_rej = metrics.get("total_rejections", 1)
 
-        row = 2
-        for reason, count in sorted(
-            rejection_reasons.items(), key=lambda x: x[1], reverse=True
-        ):
-            ws_rejections[f"A{row}"] = reason
-            ws_rejections[f"B{row}"] = count
-            ws_rejections[f"C{row}"] = f"{(count / total_rej * 100):.1f}%"
-            row += 1
+        for reason, count in rejection_reasons.most_common():
+            percent = WriteOnlyCell(ws_rejections, value=count / total_rej)
+            percent.number_format = "0.0%"
+            ws_rejections.append((reason, count, percent))
 
         # Лист 3: СТАДИИ СДЕЛОК
-        ws_stages = wb.create_sheet("Стадии сделок")
-        ws_stages["A1"] = "Стадия"
-        ws_stages["B1"] = "Количество"
-
-        # Стили
-        for cell in ["A1", "B1"]:
-            ws_stages[cell].font = Font(bold=True)
-            ws_stages[cell].fill = PatternFill(
-                start_color="70AD47", end_color="70AD47", fill_type="solid"
-            )
-            ws_stages[cell].font = Font(color="FFFFFF", bold=True)
+        ws_stages = new_sheet("Стадии сделок")
+        ws_stages.append(header_row(
+            ws_stages, ["Стадия", "Количество"], header_font_white, header_fill_green
+        ))
 
-        deal_stages = metrics.get("deal_stages", {})
-        row = 2
-        for stage, count in sorted(deal_stages.items(), key=lambda x: x[1], reverse=True):
-            ws_stages[f"A{row}"] = stage
-            ws_stages[f"B{row}"] = count
-            row += 1
+        deal_stages = metrics.get("deal_stages", Counter())
+        for row in deal_stages.most_common():
+            ws_stages.append(row)
 
         # Лист 4: ТОП-МЕНЕДЖЕРЫ
-        ws_managers = wb.create_sheet("Топ-менеджеры")
-        ws_managers["A1"] = "Менеджер"
-        ws_managers["B1"] = "Количество сделок"
-
-        # Стили
-        for cell in ["A1", "B1"]:
-            ws_managers[cell].font = Font(bold=True)
-            ws_managers[cell].fill = PatternFill(
-                start_color="FFC000", end_color="FFC000", fill_type="solid"
-            )
-            ws_managers[cell].font = Font(color="000000", bold=True)
-
-        top_managers = metrics.get("top_managers", {})
-        row = 2
-        for manager, count in top_managers.items():
-            ws_managers[f"A{row}"] = manager
-            ws_managers[f"B{row}"] = count
-            row += 1
-
-        # Автоширина колонок для всех листов
-        for ws in wb.worksheets:
-            for col in ["A", "B", "C"]:
-                ws.column_dimensions[col].width = 30
+        ws_managers = new_sheet("Топ-менеджеры")
+        ws_managers.append(header_row(
+            ws_managers,
+            ["Менеджер", "Количество сделок"],
+            header_font_black,
+            header_fill_yellow,
+        ))
+
+        top_managers = metrics.get("top_managers", Counter())
+        for row in top_managers.most_common():
+            ws_managers.append(row)
 
         # Сохраняем
         wb.save(output_path)
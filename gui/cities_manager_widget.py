@@ -1,22 +1,30 @@
+import io
 import logging
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Callable, Optional
 
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
-    QListWidget,
+    QListView,
     QLineEdit,
     QPushButton,
     QLabel,
     QMessageBox,
     QGroupBox,
-    QTextEdit,
+    QPlainTextEdit,
     QAbstractItemView,
     QInputDialog,
+    QDialog,
+    QDialogButtonBox,
+    QCompleter,
 )
 
+from gui.list_model import ItemListModel
+from gui.workers import Worker, run_in_background
+from gui.styles import setup_batched_list
 from services.yandex_maps_url_generator import YandexMapsURLGenerator
 
 logger = logging.getLogger(__name__)
@@ -29,18 +37,51 @@ class CitiesManagerWidget(QWidget):
 
     # Сигнал для оповещения об изменениях
     cities_updated = pyqtSignal()
+    # Сообщение об успешном действии (для строки состояния окна)
+    status_message = pyqtSignal(str)
 
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
 
-        self.generator = YandexMapsURLGenerator()
+        # Генератор (чтение конфигурации городов с диска) создаётся
+        # при первом показе виджета — см. showEvent
+        self.generator: Optional[YandexMapsURLGenerator] = None
+
+        # Кэш для проверок "уже есть в списке": города — из _load_cities,
+        # районы выбранного города — из _on_city_selected
+        self._cities_set: set[str] = set()
+        self._current_districts_set: set[str] = set()
+
+        # Изменение конфигурации (с записью на диск) выполняется в фоне;
+        # пока оно идёт, кнопки изменений недоступны
+        self._worker: Optional[Worker] = None
+
+        # Обработка выбора города отложена до следующего прохода цикла
+        # событий: серия изменений выделения даёт одно обновление
+        self._city_sel_pending = False
+
+        # Диалог редактирования районов создаётся один раз и переиспользуется
+        self._districts_dialog: Optional[DistrictsEditorDialog] = None
 
         self._setup_ui()
         self._connect_signals()
-        self._load_cities()
 
         logger.info("CitiesManagerWidget инициализирован")
 
+    def showEvent(self, event) -> None:
+        """При первом показе — загрузить конфигурацию и список городов."""
+        if self.generator is None:
+            self.generator = YandexMapsURLGenerator()
+
+            # Районы и признак мегаполиса по городу запоминаются до первого
+            # изменения конфигурации (кэш сбрасывает _run_generator_task).
+            # Списки районов из кэша общие — не изменять
+            self._get_districts = lru_cache(maxsize=256)(self.generator.get_districts)
+            self._is_megapolis = lru_cache(maxsize=256)(self.generator.is_megapolis)
+
+            self._load_cities()
+        super().showEvent(event)
+
     def _setup_ui(self) -> None:
         """Построить UI виджета."""
         main_layout = QVBoxLayout(self)
@@ -52,10 +93,13 @@ class CitiesManagerWidget(QWidget):
         layout_cities = QVBoxLayout()
 
         # Список городов
-        self.cities_list = QListWidget()
+        self._cities_model = ItemListModel(parent=self)
+        self.cities_list = QListView()
+        self.cities_list.setModel(self._cities_model)
         self.cities_list.setSelectionMode(
             QAbstractItemView.SelectionMode.SingleSelection
         )
+        setup_batched_list(self.cities_list)
         layout_cities.addWidget(QLabel("Список городов:"))
         layout_cities.addWidget(self.cities_list)
 
@@ -92,8 +136,11 @@ class CitiesManagerWidget(QWidget):
         layout_districts.addWidget(self.districts_label)
 
         # Список районов
-        self.districts_list = QListWidget()
+        self._districts_model = ItemListModel(parent=self)
+        self.districts_list = QListView()
+        self.districts_list.setModel(self._districts_model)
         self.districts_list.setMaximumHeight(200)
+        setup_batched_list(self.districts_list)
         layout_districts.addWidget(self.districts_list)
 
         # Кнопки управления районами
@@ -154,34 +201,129 @@ class CitiesManagerWidget(QWidget):
         self.btn_reset_defaults.clicked.connect(self._on_reset_defaults)
         self.btn_save_close.clicked.connect(self._on_save_close)
 
-        self.cities_list.itemSelectionChanged.connect(self._on_city_selected)
+        self.cities_list.selectionModel().selectionChanged.connect(
+            lambda *_: self._schedule_city_selected())
+
+    def _schedule_city_selected(self) -> None:
+        """Запланировать _on_city_selected (один раз на проход цикла событий)."""
+        if self._city_sel_pending:
+            return
+        self._city_sel_pending = True
+        QTimer.singleShot(0, self._do_city_selected)
+
+    def _do_city_selected(self) -> None:
+        self._city_sel_pending = False
+        self._on_city_selected()
+
+    @staticmethod
+    def _selected_text(view: QListView) -> Optional[str]:
+        """Текст выбранной строки списка (None — ничего не выбрано)."""
+        indexes = view.selectionModel().selectedIndexes()
+        if not indexes:
+            return None
+        return view.model().item(indexes[0].row())
+
+    def _set_busy(self, busy: bool) -> None:
+        """Заблокировать/разблокировать кнопки изменения конфигурации."""
+        for button in (
+            self.btn_add_city,
+            self.btn_remove_city,
+            self.btn_edit_districts,
+            self.btn_reset_defaults,
+        ):
+            button.setEnabled(not busy)
+
+        city_selected = self._selected_text(self.cities_list) is not None
+        self.btn_add_district.setEnabled(not busy and city_selected)
+        self.btn_remove_district.setEnabled(not busy and city_selected)
+
+    def _invalidate_city_cache(self) -> None:
+        """Сбросить кэш районов и мегаполисов после изменения конфигурации."""
+        self._get_districts.cache_clear()
+        self._is_megapolis.cache_clear()
+
+    def _run_generator_task(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        refresh: Callable[[], None],
+        success_message: str,
+        error_message: str,
+        log_message: str,
+    ) -> None:
+        """
+        Выполнить изменение генератора (с сохранением в файл) в фоне.
+
+        По завершении в GUI-потоке: обновить списки (refresh), отправить
+        success_message в status_message (без модального окна) и оповестить
+        cities_updated; при ошибке — показать error_message с текстом
+        исключения в QMessageBox.
+        """
+        def on_finished(_: Any) -> None:
+            self._worker = None
+            self._set_busy(False)
+            self._invalidate_city_cache()
+            refresh()
+
+            self.status_message.emit(f"✅ {success_message}")
+
+            self.cities_updated.emit()
+            logger.info(log_message)
+
+        def on_error(exc: Exception) -> None:
+            self._worker = None
+            self._set_busy(False)
+            self._invalidate_city_cache()
+            # Список в памяти мог измениться до ошибки записи
+            refresh()
+
+            logger.error(error_message, exc_info=exc)
+            QMessageBox.critical(
+                self,
+                "❌ Ошибка",
+                f"{error_message}:\n{exc}"
+            )
+
+        self._set_busy(True)
+        self._worker = run_in_background(
+            fn, *args, on_finished=on_finished, on_error=on_error
+        )
 
     def _load_cities(self) -> None:
         """Загрузить список городов."""
-        self.cities_list.clear()
         cities = self.generator.get_popular_cities()
-        self.cities_list.addItems(cities)
+        self._cities_set = set(cities)
+        # Модель применяет одиночную вставку/удаление точечно; сигналы
+        # выделения на время замены списка заглушены, вместо них —
+        # одно отложенное обновление панели районов
+        selection_model = self.cities_list.selectionModel()
+        selection_model.blockSignals(True)
+        try:
+            self._cities_model.set_items(cities)
+        finally:
+            selection_model.blockSignals(False)
+        self._schedule_city_selected()
 
         logger.info(f"Загружено {len(cities)} городов")
 
     def _on_city_selected(self) -> None:
         """Обработать выбор города."""
-        selected_items = self.cities_list.selectedItems()
-        if not selected_items:
+        city = self._selected_text(self.cities_list)
+        if city is None:
             self.city_info_label.setText(
                 "ℹ️ Выберите город для просмотра информации")
             self.districts_label.setText(
                 "Выберите город для управления районами")
-            self.districts_list.clear()
+            self._districts_model.clear()
+            self._current_districts_set = set()
             self.btn_add_district.setEnabled(False)
             self.btn_remove_district.setEnabled(False)
             return
 
-        city = selected_items[0].text()
-
         # Обновляем информацию о городе
-        is_megapolis = self.generator.is_megapolis(city)
-        districts = self.generator.get_districts(city)
+        is_megapolis = self._is_megapolis(city)
+        districts = self._get_districts(city)
+        self._current_districts_set = set(districts)
 
         if is_megapolis:
             self.city_info_label.setText(
@@ -195,29 +337,22 @@ class CitiesManagerWidget(QWidget):
 
         # Обновляем список районов
         self.districts_label.setText(f"Районы города {city}:")
-        self.districts_list.clear()
-        if districts:
-            self.districts_list.addItems(districts)
+        self._districts_model.set_items(districts)
 
-        # Включаем кнопки управления районами
-        self.btn_add_district.setEnabled(True)
-        self.btn_remove_district.setEnabled(True)
+        # Включаем кнопки управления районами (если не идёт сохранение)
+        idle = self._worker is None
+        self.btn_add_district.setEnabled(idle)
+        self.btn_remove_district.setEnabled(idle)
 
     def _on_add_city(self) -> None:
         """Добавить новый город."""
-        city, ok = QInputDialog.getText(
-            self,
-            "Добавить город",
-            "Введите название города:",
-            QLineEdit.EchoMode.Normal,
-            ""
-        )
+        city = self._ask_city_name()
 
-        if ok and city:
+        if city:
             city = city.strip()
 
             # Проверяем, не существует ли уже такой город
-            if city in self.generator.get_popular_cities():
+            if city in self._cities_set:
                 QMessageBox.warning(
                     self,
                     "❌ Ошибка",
@@ -225,31 +360,53 @@ class CitiesManagerWidget(QWidget):
                 )
                 return
 
-            try:
-                self.generator.add_city(city)
-                self._load_cities()
+            self._run_generator_task(
+                self.generator.add_city,
+                city,
+                refresh=self._load_cities,
+                success_message=f"Город '{city}' успешно добавлен!",
+                error_message="Не удалось добавить город",
+                log_message=f"Добавлен город: {city}",
+            )
 
-                QMessageBox.information(
-                    self,
-                    "✅ Успех",
-                    f"Город '{city}' успешно добавлен!"
-                )
+    def _ask_city_name(self) -> Optional[str]:
+        """
+        Запросить название нового города.
 
-                self.cities_updated.emit()
-                logger.info(f"Добавлен город: {city}")
+        Поле ввода подсказывает уже добавленные города (QCompleter по модели
+        списка городов), чтобы дубликат был виден до проверки.
 
-            except Exception as exc:
-                logger.exception("Ошибка при добавлении города")
-                QMessageBox.critical(
-                    self,
-                    "❌ Ошибка",
-                    f"Не удалось добавить город:\n{exc}"
-                )
+        Returns:
+            Введённый текст или None, если диалог отменён.
+        """
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Добавить город")
+
+        line_edit = QLineEdit()
+        completer = QCompleter(self._cities_model, line_edit)
+        completer.setCompletionRole(Qt.ItemDataRole.DisplayRole)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        line_edit.setCompleter(completer)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel("Введите название города:"))
+        layout.addWidget(line_edit)
+        layout.addWidget(buttons)
+
+        if not dialog.exec():
+            return None
+        return line_edit.text()
 
     def _on_remove_city(self) -> None:
         """Удалить выбранный город."""
-        selected_items = self.cities_list.selectedItems()
-        if not selected_items:
+        city = self._selected_text(self.cities_list)
+        if city is None:
             QMessageBox.warning(
                 self,
                 "❌ Ошибка",
@@ -257,8 +414,6 @@ class CitiesManagerWidget(QWidget):
             )
             return
 
-        city = selected_items[0].text()
-
         # Подтверждение удаления
         reply = QMessageBox.question(
             self,
@@ -270,31 +425,19 @@ class CitiesManagerWidget(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.generator.remove_city(city)
-                self._load_cities()
-
-                QMessageBox.information(
-                    self,
-                    "✅ Успех",
-                    f"Город '{city}' успешно удалён!"
-                )
-
-                self.cities_updated.emit()
-                logger.info(f"Удалён город: {city}")
-
-            except Exception as exc:
-                logger.exception("Ошибка при удалении города")
-                QMessageBox.critical(
-                    self,
-                    "❌ Ошибка",
-                    f"Не удалось удалить город:\n{exc}"
-                )
+            self._run_generator_task(
+                self.generator.remove_city,
+                city,
+                refresh=self._load_cities,
+                success_message=f"Город '{city}' успешно удалён!",
+                error_message="Не удалось удалить город",
+                log_message=f"Удалён город: {city}",
+            )
 
     def _on_edit_districts(self) -> None:
         """Открыть диалог редактирования районов."""
-        selected_items = self.cities_list.selectedItems()
-        if not selected_items:
+        city = self._selected_text(self.cities_list)
+        if city is None:
             QMessageBox.warning(
                 self,
                 "❌ Ошибка",
@@ -302,23 +445,39 @@ class CitiesManagerWidget(QWidget):
             )
             return
 
-        city = selected_items[0].text()
+        # Открываем диалог редактирования; сохранение — в фоне
+        dialog = self._districts_dialog
+        if dialog is None:
+            dialog = self._districts_dialog = DistrictsEditorDialog(
+                self.generator, city, self)
+        else:
+            dialog.set_city(city)
 
-        # Открываем диалог редактирования
-        dialog = DistrictsEditorDialog(self.generator, city, self)
         if dialog.exec():
-            # Обновляем отображение
-            self._on_city_selected()
-            self.cities_updated.emit()
+            districts = dialog.districts()
+            if not dialog.is_changed(districts):
+                # Список не изменился — запись файла не нужна
+                self.status_message.emit(f"✅ Районы города '{city}' сохранены!")
+                return
+
+            self._run_generator_task(
+                self.generator.set_city_districts,
+                city,
+                districts,
+                refresh=self._on_city_selected,
+                success_message=f"Районы города '{city}' сохранены!",
+                error_message="Не удалось сохранить районы",
+                log_message=(
+                    f"Обновлены районы для города {city}: {len(districts)} районов"
+                ),
+            )
 
     def _on_add_district(self) -> None:
         """Добавить район к выбранному городу."""
-        selected_items = self.cities_list.selectedItems()
-        if not selected_items:
+        city = self._selected_text(self.cities_list)
+        if city is None:
             return
 
-        city = selected_items[0].text()
-
         district, ok = QInputDialog.getText(
             self,
             "Добавить район",
@@ -331,7 +490,7 @@ class CitiesManagerWidget(QWidget):
             district = district.strip()
 
             # Проверяем, не существует ли уже такой район
-            if district in self.generator.get_districts(city):
+            if district in self._current_districts_set:
                 QMessageBox.warning(
                     self,
                     "❌ Ошибка",
@@ -339,33 +498,22 @@ class CitiesManagerWidget(QWidget):
                 )
                 return
 
-            try:
-                self.generator.add_district(city, district)
-                self._on_city_selected()  # Обновляем отображение
-
-                QMessageBox.information(
-                    self,
-                    "✅ Успех",
-                    f"Район '{district}' добавлен к городу '{city}'!"
-                )
-
-                self.cities_updated.emit()
-                logger.info(f"Добавлен район {district} к городу {city}")
-
-            except Exception as exc:
-                logger.exception("Ошибка при добавлении района")
-                QMessageBox.critical(
-                    self,
-                    "❌ Ошибка",
-                    f"Не удалось добавить район:\n{exc}"
-                )
+            self._run_generator_task(
+                self.generator.add_district,
+                city,
+                district,
+                refresh=self._on_city_selected,
+                success_message=f"Район '{district}' добавлен к городу '{city}'!",
+                error_message="Не удалось добавить район",
+                log_message=f"Добавлен район {district} к городу {city}",
+            )
 
     def _on_remove_district(self) -> None:
         """Удалить выбранный район."""
-        selected_city_items = self.cities_list.selectedItems()
-        selected_district_items = self.districts_list.selectedItems()
+        city = self._selected_text(self.cities_list)
+        district = self._selected_text(self.districts_list)
 
-        if not selected_city_items or not selected_district_items:
+        if city is None or district is None:
             QMessageBox.warning(
                 self,
                 "❌ Ошибка",
@@ -373,9 +521,6 @@ class CitiesManagerWidget(QWidget):
             )
             return
 
-        city = selected_city_items[0].text()
-        district = selected_district_items[0].text()
-
         # Подтверждение удаления
         reply = QMessageBox.question(
             self,
@@ -386,26 +531,15 @@ class CitiesManagerWidget(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.generator.remove_district(city, district)
-                self._on_city_selected()  # Обновляем отображение
-
-                QMessageBox.information(
-                    self,
-                    "✅ Успех",
-                    f"Район '{district}' удалён!"
-                )
-
-                self.cities_updated.emit()
-                logger.info(f"Удалён район {district} из города {city}")
-
-            except Exception as exc:
-                logger.exception("Ошибка при удалении района")
-                QMessageBox.critical(
-                    self,
-                    "❌ Ошибка",
-                    f"Не удалось удалить район:\n{exc}"
-                )
+            self._run_generator_task(
+                self.generator.remove_district,
+                city,
+                district,
+                refresh=self._on_city_selected,
+                success_message=f"Район '{district}' удалён!",
+                error_message="Не удалось удалить район",
+                log_message=f"Удалён район {district} из города {city}",
+            )
 
     def _on_reset_defaults(self) -> None:
         """Сбросить настройки к значениям по умолчанию."""
@@ -419,71 +553,39 @@ class CitiesManagerWidget(QWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.generator.reset_to_defaults()
-                self._load_cities()
-                self._on_city_selected()
-
-                QMessageBox.information(
-                    self,
-                    "✅ Успех",
-                    "Настройки городов сброшены к значениям по умолчанию!"
-                )
-
-                self.cities_updated.emit()
-                logger.info("Настройки городов сброшены к умолчаниям")
-
-            except Exception as exc:
-                logger.exception("Ошибка при сбросе настроек")
-                QMessageBox.critical(
-                    self,
-                    "❌ Ошибка",
-                    f"Не удалось сбросить настройки:\n{exc}"
-                )
+            self._run_generator_task(
+                self.generator.reset_to_defaults,
+                refresh=self._load_cities,
+                success_message="Настройки городов сброшены к значениям по умолчанию!",
+                error_message="Не удалось сбросить настройки",
+                log_message="Настройки городов сброшены к умолчаниям",
+            )
 
     def _on_save_close(self) -> None:
         """Сохранить и закрыть."""
-        QMessageBox.information(
-            self,
-            "✅ Сохранено",
-            "Все изменения автоматически сохранены!"
-        )
+        self.status_message.emit("✅ Все изменения автоматически сохранены!")
         self.close()
 
 
-class DistrictsEditorDialog(QMessageBox):
+class DistrictsEditorDialog(QDialog):
     """Диалог для массового редактирования районов."""
 
     def __init__(self, generator: YandexMapsURLGenerator, city: str, parent=None):
         super().__init__(parent)
 
         self.generator = generator
-        self.city = city
-
-        self.setWindowTitle(f"Редактирование районов: {city}")
-        self.setText(f"Редактирование районов для города <b>{city}</b>")
-        self.setInformativeText(
-            "Введите районы (один на строку).\n"
-            "Оставьте пустым, если у города нет районов."
-        )
-
-        # Текстовое поле для районов
-        from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QPushButton
-
-        # Преобразуем в кастомный диалог
-        self.dialog = QDialog(parent)
-        self.dialog.setWindowTitle(f"Редактирование районов: {city}")
-        self.dialog.setMinimumSize(500, 400)
+        self.setMinimumSize(500, 400)
 
         layout = QVBoxLayout()
 
-        layout.addWidget(
-            QLabel(f"<b>Редактирование районов для города: {city}</b>"))
-        layout.addWidget(QLabel("Введите районы (один на строку):"))
+        self.title_label = QLabel()
+        layout.addWidget(self.title_label)
+        layout.addWidget(QLabel(
+            "Введите районы (один на строку).\n"
+            "Оставьте пустым, если у города нет районов."
+        ))
 
-        self.districts_edit = QTextEdit()
-        current_districts = self.generator.get_districts(city)
-        self.districts_edit.setText("\n".join(current_districts))
+        self.districts_edit = QPlainTextEdit()
         layout.addWidget(self.districts_edit)
 
         # Кнопки
@@ -491,36 +593,49 @@ class DistrictsEditorDialog(QMessageBox):
         btn_save = QPushButton("✅ Сохранить")
         btn_cancel = QPushButton("❌ Отмена")
 
-        btn_save.clicked.connect(self.dialog.accept)
-        btn_cancel.clicked.connect(self.dialog.reject)
+        btn_save.clicked.connect(self.accept)
+        btn_cancel.clicked.connect(self.reject)
 
         buttons_layout.addWidget(btn_save)
         buttons_layout.addWidget(btn_cancel)
 
         layout.addLayout(buttons_layout)
-        self.dialog.setLayout(layout)
-
-    def exec(self):
-        """Показать диалог и сохранить результат."""
-        result = self.dialog.exec()
-
-        if result:
-            # Сохраняем районы
-            text = self.districts_edit.toPlainText()
-            districts = [d.strip() for d in text.split('\n') if d.strip()]
-
-            try:
-                self.generator.set_city_districts(self.city, districts)
-                logger.info(
-                    f"Обновлены районы для города {self.city}: {len(districts)} районов")
-                return True
-            except Exception as exc:
-                logger.exception("Ошибка при сохранении районов")
-                QMessageBox.critical(
-                    self.dialog,
-                    "❌ Ошибка",
-                    f"Не удалось сохранить районы:\n{exc}"
-                )
-                return False
+        self.setLayout(layout)
+
+        self.set_city(city)
+
+    def set_city(self, city: str) -> None:
+        """
+        Заполнить диалог районами города city.
 
-        return False
+        Диалог переиспользуется для разных городов: меняются только
+        заголовки и текст (setPlainText — без разбора HTML).
+        """
+        self.city = city
+
+        self.setWindowTitle(f"Редактирование районов: {city}")
+        self.title_label.setText(
+            f"<b>Редактирование районов для города: {city}</b>")
+
+        self._original_districts = self.generator.get_districts(city)
+        self.districts_edit.setPlainText("\n".join(self._original_districts))
+
+    def districts(self) -> list[str]:
+        """
+        Введённые районы (по одному на строку, без пустых строк и повторов).
+
+        Текст читается построчно через StringIO — без промежуточного
+        списка всех строк при вставке большого списка.
+        """
+        districts: list[str] = []
+        seen: set[str] = set()
+        for line in io.StringIO(self.districts_edit.toPlainText()):
+            name = line.strip()
+            if name and name not in seen:
+                seen.add(name)
+                districts.append(name)
+        return districts
+
+    def is_changed(self, districts: list[str]) -> bool:
+        """Отличается ли список districts от районов на момент открытия."""
+        return districts != self._original_districts
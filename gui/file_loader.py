@@ -8,6 +8,7 @@
 - Удаление файлов из списка
 """
 
+import os
 from pathlib import Path
 from typing import List
 
@@ -16,7 +17,8 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QPushButton,
-    QListWidget,
+    QListView,
+    QAbstractItemView,
     QLabel,
     QFileDialog
 )
@@ -24,9 +26,40 @@ from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent
 import logging
 
+from gui.list_model import ItemListModel
+from gui.styles import setup_batched_list
+
 
 logger = logging.getLogger(__name__)
 
+# Допустимые расширения входных файлов (пути хранятся строками, без Path)
+_EXT_TUPLE = (".csv", ".tsv")
+
+# Стиль drop-зоны: вид переключается динамическим свойством state
+# (idle — ожидание, hover — файл над зоной, success — файлы добавлены)
+_DROP_ZONE_QSS = """
+    QLabel#dropZone {
+        border: 2px dashed #555;
+        border-radius: 10px;
+        background-color: #2d2d2d;
+        color: #999;
+        font-size: 14px;
+        padding: 20px;
+    }
+    QLabel#dropZone[state="hover"] {
+        border: 2px dashed #4CAF50;
+        background-color: #2d4a2d;
+        color: #4CAF50;
+        font-weight: bold;
+    }
+    QLabel#dropZone[state="success"] {
+        border: 2px solid #4CAF50;
+        background-color: #1e3a1e;
+        color: #4CAF50;
+        font-weight: bold;
+    }
+"""
+
 
 class FileLoaderWidget(QWidget):
     """
@@ -44,7 +77,13 @@ class FileLoaderWidget(QWidget):
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
 
-        self.selected_files: List[Path] = []
+        # Выбранные файлы (пути строками) хранит модель списка
+        # В списке — имя файла, полный путь — в подсказке и UserRole
+        self._files_model = ItemListModel(
+            parent=self, display=os.path.basename, tooltip=str
+        )
+        # Те же пути во множестве — для проверки дубликатов за O(1)
+        self._selected_set: set[str] = set()
 
         # Включаем Drag & Drop
         self.setAcceptDrops(True)
@@ -53,10 +92,12 @@ class FileLoaderWidget(QWidget):
         self.button_remove = QPushButton("🗑️ Удалить выбранные")
         self.button_clear = QPushButton("🧹 Очистить всё")
 
-        self.list_widget = QListWidget()
+        self.list_widget = QListView()
+        self.list_widget.setModel(self._files_model)
         self.list_widget.setSelectionMode(
-            QListWidget.SelectionMode.ExtendedSelection
+            QAbstractItemView.SelectionMode.ExtendedSelection
         )
+        setup_batched_list(self.list_widget)
 
         self.label_count = QLabel("Загружено: 0 файлов")
 
@@ -67,16 +108,9 @@ class FileLoaderWidget(QWidget):
         )
         self.drop_zone_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.drop_zone_label.setMinimumHeight(100)
-        self.drop_zone_label.setStyleSheet("""
-            QLabel {
-                border: 2px dashed #555;
-                border-radius: 10px;
-                background-color: #2d2d2d;
-                color: #999;
-                font-size: 14px;
-                padding: 20px;
-            }
-        """)
+        self.drop_zone_label.setObjectName("dropZone")
+        self.drop_zone_label.setProperty("state", "idle")
+        self.drop_zone_label.setStyleSheet(_DROP_ZONE_QSS)
 
         layout = QVBoxLayout()
         layout.addWidget(self.drop_zone_label)
@@ -96,37 +130,34 @@ class FileLoaderWidget(QWidget):
         self.button_select.clicked.connect(self._on_select_files_clicked)
         self.button_remove.clicked.connect(self._on_remove_selected_clicked)
         self.button_clear.clicked.connect(self._on_clear_all_clicked)
-        self.list_widget.itemSelectionChanged.connect(
-            self._update_buttons_state)
+        self.list_widget.selectionModel().selectionChanged.connect(
+            lambda *_: self._update_buttons_state())
 
         # Изначально кнопки удаления неактивны
         self._update_buttons_state()
 
+    @property
+    def selected_files(self) -> List[str]:
+        """Выбранные файлы — пути строками (список модели, не изменять)."""
+        return self._files_model.items()
+
+    def paths(self) -> List[Path]:
+        """Выбранные файлы как Path (создаются при вызове)."""
+        return [Path(p) for p in self.selected_files]
+
     def dragEnterEvent(self, event: QDragEnterEvent) -> None:
         """Обработка наведения файла."""
         if event.mimeData().hasUrls():
             # Проверяем, что хотя бы один файл — CSV/TSV
-            valid = False
-            for url in event.mimeData().urls():
-                path = Path(url.toLocalFile())
-                if path.suffix.lower() in [".csv", ".tsv"]:
-                    valid = True
-                    break
+            valid = any(
+                url.toLocalFile().lower().endswith(_EXT_TUPLE)
+                for url in event.mimeData().urls()
+            )
 
             if valid:
                 event.acceptProposedAction()
                 # Подсветка при наведении
-                self.drop_zone_label.setStyleSheet("""
-                    QLabel {
-                        border: 2px dashed #4CAF50;
-                        border-radius: 10px;
-                        background-color: #2d4a2d;
-                        color: #4CAF50;
-                        font-size: 14px;
-                        padding: 20px;
-                        font-weight: bold;
-                    }
-                """)
+                self._set_drop_state("hover")
             else:
                 event.ignore()
         else:
@@ -142,34 +173,27 @@ class FileLoaderWidget(QWidget):
         new_files = []
 
         for url in urls:
-            path = Path(url.toLocalFile())
+            path = url.toLocalFile()
 
             # Валидация расширения
-            if path.suffix.lower() in [".csv", ".tsv"]:
-                if path not in self.selected_files:
+            if os.path.splitext(path)[1].lower() in _EXT_TUPLE:
+                if path not in self._selected_set:
+                    self._selected_set.add(path)
                     new_files.append(path)
                     logger.info(
-                        f"Добавлен файл через Drag & Drop: {path.name}")
+                        "Добавлен файл через Drag & Drop: "
+                        f"{os.path.basename(path)}")
             else:
                 logger.warning(
-                    f"Пропущен файл (неверное расширение): {path.name}")
+                    "Пропущен файл (неверное расширение): "
+                    f"{os.path.basename(path)}")
 
         if new_files:
-            self.selected_files.extend(new_files)
+            self._files_model.extend(new_files)
             self._refresh_list()
 
             # Анимация успеха
-            self.drop_zone_label.setStyleSheet("""
-                QLabel {
-                    border: 2px solid #4CAF50;
-                    border-radius: 10px;
-                    background-color: #1e3a1e;
-                    color: #4CAF50;
-                    font-size: 14px;
-                    padding: 20px;
-                    font-weight: bold;
-                }
-            """)
+            self._set_drop_state("success")
             self.drop_zone_label.setText(
                 f"✅ Добавлено файлов: {len(new_files)}\n"
                 f"Перетащите ещё или нажмите кнопку"
@@ -185,21 +209,26 @@ class FileLoaderWidget(QWidget):
 
     def _reset_drop_zone_style(self):
         """Вернуть обычный стиль drop-зоны."""
-        self.drop_zone_label.setStyleSheet("""
-            QLabel {
-                border: 2px dashed #555;
-                border-radius: 10px;
-                background-color: #2d2d2d;
-                color: #999;
-                font-size: 14px;
-                padding: 20px;
-            }
-        """)
+        self._set_drop_state("idle")
         self.drop_zone_label.setText(
             "🎯 Перетащите файлы сюда\n"
             "или нажмите кнопку ниже"
         )
 
+    def _set_drop_state(self, state: str) -> None:
+        """
+        Переключить вид drop-зоны (свойство state в _DROP_ZONE_QSS).
+
+        Таблица стилей не разбирается заново — стиль только пересчитывается
+        через unpolish/polish, и только если состояние изменилось.
+        """
+        if self.drop_zone_label.property("state") == state:
+            return
+        self.drop_zone_label.setProperty("state", state)
+        style = self.drop_zone_label.style()
+        style.unpolish(self.drop_zone_label)
+        style.polish(self.drop_zone_label)
+
     def _on_select_files_clicked(self) -> None:
         """Обработчик клика по кнопке выбора файлов."""
         file_paths, _ = QFileDialog.getOpenFileNames(
@@ -213,34 +242,29 @@ class FileLoaderWidget(QWidget):
 
         # Добавляем новые файлы (избегаем дубликатов)
         new_files = []
-        for p in file_paths:
-            path = Path(p)
-            if path not in self.selected_files:
+        for path in file_paths:
+            if path not in self._selected_set:
+                self._selected_set.add(path)
                 new_files.append(path)
 
         if new_files:
-            self.selected_files.extend(new_files)
+            self._files_model.extend(new_files)
             self._refresh_list()
             logger.info(f"Добавлено файлов через диалог: {len(new_files)}")
 
     def _on_remove_selected_clicked(self) -> None:
         """Удалить выбранные файлы из списка."""
-        selected_items = self.list_widget.selectedItems()
+        rows = {index.row() for index in self.list_widget.selectedIndexes()}
 
-        if not selected_items:
+        if not rows:
             return
 
-        # Получаем пути выбранных файлов
-        paths_to_remove = []
-        for item in selected_items:
-            path = Path(item.text())
-            paths_to_remove.append(path)
-
-        # Удаляем из списка
-        for path in paths_to_remove:
-            if path in self.selected_files:
-                self.selected_files.remove(path)
-                logger.info(f"Удалён файл: {path.name}")
+        # Удаляем строки с конца, чтобы номера оставшихся не сдвигались
+        for row in sorted(rows, reverse=True):
+            path = self._files_model.item(row)
+            self._files_model.remove_item(row)
+            self._selected_set.discard(path)
+            logger.info(f"Удалён файл: {os.path.basename(path)}")
 
         self._refresh_list()
 
@@ -250,7 +274,8 @@ class FileLoaderWidget(QWidget):
             return
 
         count = len(self.selected_files)
-        self.selected_files.clear()
+        self._files_model.clear()
+        self._selected_set.clear()
         self._refresh_list()
 
         logger.info(f"Очищен список файлов: удалено {count} файлов")
@@ -258,17 +283,17 @@ class FileLoaderWidget(QWidget):
     def _update_buttons_state(self) -> None:
         """Обновить состояние кнопок удаления."""
         has_files = len(self.selected_files) > 0
-        has_selection = len(self.list_widget.selectedItems()) > 0
+        has_selection = self.list_widget.selectionModel().hasSelection()
 
         self.button_remove.setEnabled(has_selection)
         self.button_clear.setEnabled(has_files)
 
     def _refresh_list(self) -> None:
-        """Перерисовать список файлов и счётчик."""
-        self.list_widget.clear()
-        for path in self.selected_files:
-            self.list_widget.addItem(str(path))
+        """
+        Обновить счётчик и кнопки после изменения списка.
 
+        Строки вида модель уже обновила точечно (вставка/удаление).
+        """
         self.label_count.setText(
             f"Загружено: {len(self.selected_files)} файлов")
 
@@ -280,5 +305,6 @@ class FileLoaderWidget(QWidget):
 
     def clear_files(self) -> None:
         """Очистить список файлов (вызывается извне)."""
-        self.selected_files.clear()
+        self._files_model.clear()
+        self._selected_set.clear()
         self._refresh_list()
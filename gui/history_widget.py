@@ -8,16 +8,17 @@
 """
 
 import logging
-from typing import List, Optional
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
 from pathlib import Path
 
-import pandas as pd
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QPushButton,
     QLabel,
     QMessageBox,
@@ -25,14 +26,306 @@ from PyQt6.QtWidgets import (
     QGroupBox,
     QFileDialog,
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import (
+    QAbstractTableModel,
+    QModelIndex,
+    QSortFilterProxyModel,
+    Qt,
+)
+from PyQt6.QtGui import QBrush, QColor
 
+from gui.workers import Worker, run_in_background
 from repositories.processing_history_repo import ProcessingHistoryRepository
 from config.settings import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Фиксированная высота строк и ширины колонок таблицы (кроме последней,
+# растянутой): вид не перебирает все строки, чтобы вычислить размеры
+_ROW_HEIGHT = 28
+_COLUMN_WIDTHS = (60, 170, 170, 70, 100, 90, 100)
+
+# Стили виджета (тёмная тема): одна строка на модуль, не собирается
+# заново для каждого экземпляра
+_HISTORY_QSS = """
+    QWidget {
+        background-color: #1e1e1e;
+        color: #e0e0e0;
+    }
+    QTableView {
+        background-color: #2d2d2d;
+        alternate-background-color: #252525;
+        color: #e0e0e0;
+        gridline-color: #444;
+        border: 1px solid #444;
+        border-radius: 5px;
+    }
+    QTableView::item {
+        padding: 5px;
+    }
+    QTableView::item:selected {
+        background-color: #4a4a4a;
+    }
+    QHeaderView::section {
+        background-color: #3a3a3a;
+        color: #ffffff;
+        padding: 8px;
+        border: 1px solid #555;
+        font-weight: bold;
+    }
+    QLabel {
+        color: #e0e0e0;
+    }
+    QPushButton {
+        background-color: #3a3a3a;
+        color: #ffffff;
+        border: 1px solid #555;
+        border-radius: 5px;
+        padding: 8px 15px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #4a4a4a;
+    }
+    QPushButton:pressed {
+        background-color: #2a2a2a;
+    }
+    QPushButton:disabled {
+        background-color: #2a2a2a;
+        color: #666;
+    }
+"""
+
+# SQL-запросы виджета: строки собираются один раз при импорте модуля
+#
+# Колонки страницы истории: 8 колонок таблицы и исходный started_at —
+# ключ для выборки следующей страницы (started_at, id).
+#
+# Псевдоним started_at занят обрезанной строкой, а в ORDER BY SQLite
+# сначала ищет псевдонимы — поэтому сортировка и ключ страницы ссылаются
+# на колонку таблицы явно (processing_history.started_at), иначе индекс
+# ix_ph_started_desc не используется и вся таблица сортируется заново
+_HISTORY_PAGE_COLUMNS = """
+    id,
+    substr(started_at, 1, 19) AS started_at,
+    substr(finished_at, 1, 19) AS finished_at,
+    file_count,
+    total_rows,
+    final_rows,
+    removed_duplicates,
+    status,
+    started_at AS started_key
+"""
+
+_SQL_COUNT = "SELECT COUNT(*) FROM processing_history"
+
+_SQL_FIRST_PAGE = f"""
+SELECT {_HISTORY_PAGE_COLUMNS}
+FROM processing_history
+ORDER BY processing_history.started_at DESC, id DESC
+LIMIT ?
+"""
+
+_SQL_NEXT_PAGE = f"""
+SELECT {_HISTORY_PAGE_COLUMNS}
+FROM processing_history
+WHERE (processing_history.started_at, id) < (?, ?)
+ORDER BY processing_history.started_at DESC, id DESC
+LIMIT ?
+"""
+
+_SQL_DELETE = "DELETE FROM processing_history WHERE id = ?"
+
+# Колонки выгрузки в Excel (порядок — как в таблице БД) и их ширина
+_EXPORT_COLUMNS = (
+    "id",
+    "started_at",
+    "finished_at",
+    "file_count",
+    "total_rows",
+    "removed_duplicates",
+    "removed_empty_phones",
+    "final_rows",
+    "unique_phones",
+    "status",
+)
+_EXPORT_COLUMN_WIDTH = 20
+
+_SQL_EXPORT = f"""
+SELECT {", ".join(_EXPORT_COLUMNS)}
+FROM processing_history
+ORDER BY started_at DESC, id DESC
+"""
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """
+    Модель таблицы истории поверх списка строк из БД.
+
+    Текст, выравнивание и цвет ячеек вычисляются в data() по запросу
+    вида — только для видимых строк, без объекта на каждую ячейку.
+    По UserRole отдаётся исходное значение (числа сортируются как числа).
+    """
+
+    # Колонки запроса истории и заголовки таблицы
+    COLUMNS = (
+        "id",
+        "started_at",
+        "finished_at",
+        "file_count",
+        "total_rows",
+        "final_rows",
+        "removed_duplicates",
+        "status",
+    )
+    HEADERS = (
+        "ID",
+        "Дата начала",
+        "Дата окончания",
+        "Файлов",
+        "Всего строк",
+        "Валидных",
+        "Дубликатов",
+        "Статус",
+    )
+    # Даты (без долей секунды — обрезаются в SQL); пустая дата — "-"
+    DATE_COLUMNS = frozenset({1, 2})
+    STATUS_COLUMN = 7
+    # Выравнивание по номеру колонки: числа — по центру
+    # (значения готовы заранее, data() только берёт элемент кортежа)
+    _CENTER = Qt.AlignmentFlag.AlignCenter
+    ALIGNMENTS = (_CENTER, None, None, _CENTER, _CENTER, _CENTER, _CENTER, None)
+    # Цвет статуса: кисти созданы один раз и отдаются всем ячейкам
+    BRUSH_OK = QBrush(QColor("#4caf50"))
+    BRUSH_ERR = QBrush(QColor("#e53935"))
+
+    # Размер страницы, догружаемой при прокрутке к концу таблицы
+    PAGE_SIZE = 200
+    # Сортировка, совпадающая с порядком страниц из БД (started_at DESC):
+    # при ней догруженные строки просто продолжают таблицу
+    DEFAULT_SORT_COLUMN = 1
+    DEFAULT_SORT_ORDER = Qt.SortOrder.DescendingOrder
+
+    def __init__(
+        self,
+        fetch_page: Optional[
+            Callable[[Tuple[str, int], int], List[sqlite3.Row]]
+        ] = None,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            fetch_page: функция (ключ последней строки, limit) -> строки
+                следующей страницы; None — без догрузки.
+        """
+        super().__init__(parent)
+        self._rows: List[sqlite3.Row] = []
+        self._fetch_page = fetch_page
+        self._has_more = False
+
+    def set_rows(self, rows: List[sqlite3.Row]) -> None:
+        """
+        Задать строки истории (первую страницу) и уведомить вид.
+
+        Если страница полная, следующие догружаются через fetchMore.
+        """
+        self.beginResetModel()
+        self._rows = rows
+        self._has_more = len(rows) >= self.PAGE_SIZE
+        self.endResetModel()
+
+    def remove_row(self, row: int) -> None:
+        """Убрать строку row (запись уже удалена из БД)."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    def row_data(self, row: int) -> dict:
+        """Запись строки row: {колонка из COLUMNS: значение из БД}."""
+        return dict(zip(self.COLUMNS, self._rows[row]))
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid() or self._fetch_page is None:
+            return False
+        return self._has_more
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        """Догрузить следующую страницу после последней строки (keyset)."""
+        if self.canFetchMore(parent):
+            self._fetch_after_last(self.PAGE_SIZE)
+
+    def fetch_all(self) -> None:
+        """
+        Догрузить все оставшиеся строки одним запросом.
+
+        Нужно перед сортировкой по другой колонке: сортировать только
+        загруженные страницы — значит показать неверный порядок.
+        """
+        if self.canFetchMore():
+            self._fetch_after_last(-1)  # LIMIT -1 в SQLite — без ограничения
+
+    def _fetch_after_last(self, limit: int) -> None:
+        """Добавить до limit строк после последней (limit < 0 — все)."""
+        last = self._rows[-1]
+        try:
+            rows = self._fetch_page((last["started_key"], last["id"]), limit)
+        except Exception:
+            logger.exception("Ошибка догрузки истории")
+            rows = []
+
+        self._has_more = 0 < limit <= len(rows)
+        if not rows:
+            return
+
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self._rows[index.row()][column]
+            if column in self.DATE_COLUMNS:
+                return value or "-"
+            return "" if value is None else str(value)
+
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return self.ALIGNMENTS[column]
+
+        if role == Qt.ItemDataRole.UserRole:
+            # Значение из БД как есть (int/str) — для сортировки
+            return self._rows[index.row()][column]
+
+        if role == Qt.ItemDataRole.ForegroundRole and column == self.STATUS_COLUMN:
+            if self._rows[index.row()][column] == "success":
+                return self.BRUSH_OK
+            return self.BRUSH_ERR
+
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
 
 class HistoryWidget(QWidget):
     """Виджет истории обработок."""
@@ -43,10 +336,26 @@ class HistoryWidget(QWidget):
         # Репозиторий
         self.history_repo = ProcessingHistoryRepository()
 
+        # Фоновая загрузка истории (одна за раз) и флаг повторной загрузки
+        self._load_worker: Optional[Worker] = None
+        self._reload_pending = False
+        # Ревизия истории, по которой построена таблица (None — не загружена)
+        self._loaded_revision: Optional[int] = None
+        # Всего записей в истории (в модели может быть только часть страниц)
+        self._total = 0
+
+        # История загружается при показе вкладки (showEvent)
         self._setup_ui()
-        self._load_history()
         logger.info("Виджет истории инициализирован")
 
+    def showEvent(self, event) -> None:
+        """
+        При показе — загрузить историю, если она ещё не загружена или
+        изменилась, пока вкладка была скрыта.
+        """
+        self._load_history()
+        super().showEvent(event)
+
     def _setup_ui(self):
         """Создать UI."""
         main_layout = QVBoxLayout()
@@ -62,36 +371,46 @@ class HistoryWidget(QWidget):
         self.info_label.setStyleSheet("color: #999; font-style: italic;")
         main_layout.addWidget(self.info_label)
 
-        # Таблица
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "ID",
-            "Дата начала",
-            "Дата окончания",
-            "Файлов",
-            "Всего строк",
-            "Валидных",
-            "Дубликатов",
-            "Статус",
-        ])
+        # Таблица: модель истории и прокси для сортировки по исходным
+        # значениям (UserRole), а не по тексту ячеек
+        self.model = HistoryTableModel(self._fetch_history_page, self)
+        self._proxy_model = QSortFilterProxyModel(self)
+        self._proxy_model.setSourceModel(self.model)
+        self._proxy_model.setSortRole(Qt.ItemDataRole.UserRole)
+
+        self.table = QTableView()
+        self.table.setModel(self._proxy_model)
 
         # Настройки таблицы
         self.table.setAlternatingRowColors(True)
         self.table.setSelectionBehavior(
-            QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+            QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(
+            QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(
+            HistoryTableModel.DEFAULT_SORT_COLUMN,
+            HistoryTableModel.DEFAULT_SORT_ORDER,
+        )
+        # Другая сортировка — только по всей истории, не по первым страницам
+        self.table.horizontalHeader().sortIndicatorChanged.connect(
+            self._ensure_rows_for_sort)
+
+        # Размеры строк и колонок заданы заранее — при отрисовке data()
+        # запрашивается только для видимых строк
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(_ROW_HEIGHT)
+        self.table.setVerticalScrollMode(
+            QAbstractItemView.ScrollMode.ScrollPerPixel)
 
-        # Автоширина колонок
         header = self.table.horizontalHeader()
         header.setStretchLastSection(True)
-        for i in range(7):
-            header.setSectionResizeMode(
-                i, QHeaderView.ResizeMode.ResizeToContents)
+        for column, width in enumerate(_COLUMN_WIDTHS):
+            header.resizeSection(column, width)
 
         # Двойной клик для просмотра деталей
-        self.table.itemDoubleClicked.connect(self._on_row_double_clicked)
+        self.table.doubleClicked.connect(self._on_row_double_clicked)
 
         main_layout.addWidget(self.table)
 
@@ -99,7 +418,8 @@ class HistoryWidget(QWidget):
         buttons_layout = QHBoxLayout()
 
         self.btn_refresh = QPushButton("🔄 Обновить")
-        self.btn_refresh.clicked.connect(self._load_history)
+        self.btn_refresh.clicked.connect(
+            lambda: self._load_history(force=True))
 
         self.btn_delete = QPushButton("🗑️ Удалить запись")
         self.btn_delete.clicked.connect(self._on_delete_clicked)
@@ -120,154 +440,134 @@ class HistoryWidget(QWidget):
         main_layout.addLayout(buttons_layout)
 
         # Обновление состояния кнопок при выборе строки
-        self.table.itemSelectionChanged.connect(self._update_buttons_state)
+        self.table.selectionModel().selectionChanged.connect(
+            lambda *_: self._update_buttons_state())
 
         # Темная тема
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #1e1e1e;
-                color: #e0e0e0;
-            }
-            QTableWidget {
-                background-color: #2d2d2d;
-                alternate-background-color: #252525;
-                color: #e0e0e0;
-                gridline-color: #444;
-                border: 1px solid #444;
-                border-radius: 5px;
-            }
-            QTableWidget::item {
-                padding: 5px;
-            }
-            QTableWidget::item:selected {
-                background-color: #4a4a4a;
-            }
-            QHeaderView::section {
-                background-color: #3a3a3a;
-                color: #ffffff;
-                padding: 8px;
-                border: 1px solid #555;
-                font-weight: bold;
-            }
-            QLabel {
-                color: #e0e0e0;
-            }
-            QPushButton {
-                background-color: #3a3a3a;
-                color: #ffffff;
-                border: 1px solid #555;
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #4a4a4a;
-            }
-            QPushButton:pressed {
-                background-color: #2a2a2a;
-            }
-            QPushButton:disabled {
-                background-color: #2a2a2a;
-                color: #666;
-            }
-        """)
+        self.setStyleSheet(_HISTORY_QSS)
 
         self.setLayout(main_layout)
 
-    def _load_history(self):
-        """Загрузить историю из БД."""
+    def _load_history(self, force: bool = False):
+        """
+        Загрузить историю из БД (запрос выполняется в фоне).
+
+        Если с прошлой загрузки ревизия истории не менялась, запрос
+        не выполняется; force=True — загрузить в любом случае.
+        """
+        revision = self.history_repo.revision()
+        if not force and revision == self._loaded_revision:
+            return
+
+        if self._load_worker is not None:
+            # Загрузка уже идёт — повторим, когда она закончится
+            self._reload_pending = True
+            return
+
+        self.btn_refresh.setEnabled(False)
+        self._load_worker = run_in_background(
+            self._fetch_history_head,
+            on_finished=lambda result: self._on_history_loaded(
+                *result, revision),
+            on_error=self._on_history_load_failed,
+        )
+
+    def _fetch_history_head(self) -> Tuple[int, List[sqlite3.Row]]:
+        """
+        Число записей и первая страница истории (фоновый поток).
+
+        Остальные страницы модель догружает при прокрутке.
+        """
+        total = self.history_repo.fetch_one(_SQL_COUNT)[0]
+        rows = self.history_repo.fetch_all(
+            _SQL_FIRST_PAGE, (HistoryTableModel.PAGE_SIZE,))
+        return total, rows
+
+    def _fetch_history_page(
+        self, after: Tuple[str, int], limit: int
+    ) -> List[sqlite3.Row]:
+        """Страница истории после записи с ключом after (started_at, id)."""
+        return self.history_repo.fetch_all(_SQL_NEXT_PAGE, (*after, limit))
+
+    def _on_history_loaded(
+        self, total: int, rows: List[sqlite3.Row], revision: int
+    ):
+        """Показать загруженную историю (GUI-поток)."""
+        self._load_worker = None
+        self.btn_refresh.setEnabled(True)
+
+        # Сброс модели и пересортировка прокси — за одну перерисовку
+        self.table.setUpdatesEnabled(False)
         try:
-            # Запрос всей истории
-            query = """
-            SELECT 
-                id,
-                started_at,
-                finished_at,
-                file_count,
-                total_rows,
-                final_rows,
-                removed_duplicates,
-                status
-            FROM processing_history
-            ORDER BY started_at DESC
-            """
-
-            rows = self.history_repo.fetch_all(query)
-
-            # Очищаем таблицу
-            self.table.setRowCount(0)
-
-            if not rows:
-                self.info_label.setText("📭 История пуста")
-                self.info_label.setStyleSheet("color: #999;")
-                return
-
-            # Заполняем таблицу
-            self.table.setRowCount(len(rows))
-
-            for row_idx, row in enumerate(rows):
-                # ID
-                self.table.setItem(
-                    row_idx, 0, QTableWidgetItem(str(row["id"])))
-
-                # Дата начала
-                started = row["started_at"][:19] if row["started_at"] else "-"
-                self.table.setItem(row_idx, 1, QTableWidgetItem(started))
-
-                # Дата окончания
-                finished = row["finished_at"][:19] if row["finished_at"] else "-"
-                self.table.setItem(row_idx, 2, QTableWidgetItem(finished))
-
-                # Файлов
-                self.table.setItem(
-                    row_idx, 3, QTableWidgetItem(str(row["file_count"])))
-
-                # Всего строк
-                self.table.setItem(
-                    row_idx, 4, QTableWidgetItem(str(row["total_rows"])))
-
-                # Валидных
-                self.table.setItem(
-                    row_idx, 5, QTableWidgetItem(str(row["final_rows"])))
-
-                # Дубликатов
-                self.table.setItem(row_idx, 6, QTableWidgetItem(
-                    str(row["removed_duplicates"])))
-
-                # Статус
-                status_item = QTableWidgetItem(row["status"])
-                if row["status"] == "success":
-                    status_item.setForeground(Qt.GlobalColor.green)
-                else:
-                    status_item.setForeground(Qt.GlobalColor.red)
-                self.table.setItem(row_idx, 7, status_item)
-
-                # Выравнивание чисел по центру
-                for col in [0, 3, 4, 5, 6]:
-                    item = self.table.item(row_idx, col)
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-            self.info_label.setText(f"📊 Всего записей: {len(rows)}")
+            self.model.set_rows(rows)
+        finally:
+            self.table.setUpdatesEnabled(True)
+        self._loaded_revision = revision
+        self._ensure_rows_for_sort()
+        self._show_total(total)
+        logger.info(f"История загружена: {total} записей")
+
+        if self._reload_pending:
+            self._reload_pending = False
+            self._load_history()
+
+    def _ensure_rows_for_sort(self, *_):
+        """
+        Загрузить всю историю, если таблица отсортирована не так, как
+        приходят страницы из БД (догрузка по прокрутке тогда не годится).
+        """
+        header = self.table.horizontalHeader()
+        is_default = (
+            header.sortIndicatorSection() == HistoryTableModel.DEFAULT_SORT_COLUMN
+            and header.sortIndicatorOrder() == HistoryTableModel.DEFAULT_SORT_ORDER
+        )
+        if not is_default:
+            self.model.fetch_all()
+
+    def _show_total(self, total: int):
+        """Запомнить и показать число записей в истории."""
+        self._total = total
+        if not total:
+            self.info_label.setText("📭 История пуста")
+            self.info_label.setStyleSheet("color: #999;")
+        else:
+            self.info_label.setText(f"📊 Всего записей: {total}")
             self.info_label.setStyleSheet("color: #64B5F6; font-weight: bold;")
 
-            logger.info(f"История загружена: {len(rows)} записей")
-
-        except Exception as exc:
-            logger.exception("Ошибка загрузки истории")
-            self.info_label.setText(f"❌ Ошибка загрузки: {exc}")
-            self.info_label.setStyleSheet("color: red;")
+    def _mark_table_current(self):
+        """
+        Таблица уже обновлена на месте после записи в БД — повторная
+        загрузка не нужна. Если загрузка идёт, она могла прочитать данные
+        до изменения: тогда по её окончании история загрузится заново.
+        """
+        if self._load_worker is None:
+            self._loaded_revision = self.history_repo.revision()
+        else:
+            self._reload_pending = True
+
+    def _on_history_load_failed(self, exc: Exception):
+        """Показать ошибку загрузки истории."""
+        self._load_worker = None
+        self.btn_refresh.setEnabled(True)
+        self._reload_pending = False
+
+        logger.error("Ошибка загрузки истории", exc_info=exc)
+        self.info_label.setText(f"❌ Ошибка загрузки: {exc}")
+        self.info_label.setStyleSheet("color: red;")
 
     def _update_buttons_state(self):
         """Обновить состояние кнопок."""
-        has_selection = len(self.table.selectedItems()) > 0
+        has_selection = self.table.selectionModel().hasSelection()
         self.btn_delete.setEnabled(has_selection)
 
-    def _on_row_double_clicked(self, item: QTableWidgetItem):
-        """Показать детали обработки при двойном клике."""
-        row = item.row()
+    def _record_at(self, index: QModelIndex) -> dict:
+        """Запись истории для индекса вида (с учётом сортировки прокси)."""
+        return self.model.row_data(self._proxy_model.mapToSource(index).row())
 
-        # Получаем ID записи
-        record_id = int(self.table.item(row, 0).text())
+    def _on_row_double_clicked(self, index: QModelIndex):
+        """Показать детали обработки при двойном клике."""
+        record = self._record_at(index)
+        record_id = record["id"]
 
         # Формируем детальное сообщение
         details = f"""
@@ -275,15 +575,15 @@ class HistoryWidget(QWidget):
 ║  ДЕТАЛИ ОБРАБОТКИ #{record_id}
 ╚════════════════════════════════════╝
 
-📅 Начало:          {self.table.item(row, 1).text()}
-📅 Окончание:       {self.table.item(row, 2).text()}
+📅 Начало:          {record["started_at"] or "-"}
+📅 Окончание:       {record["finished_at"] or "-"}
 
-📁 Файлов:          {self.table.item(row, 3).text()}
-📊 Всего строк:     {self.table.item(row, 4).text()}
-✅ Валидных:        {self.table.item(row, 5).text()}
-🔄 Дубликатов:      {self.table.item(row, 6).text()}
+📁 Файлов:          {record["file_count"]}
+📊 Всего строк:     {record["total_rows"]}
+✅ Валидных:        {record["final_rows"]}
+🔄 Дубликатов:      {record["removed_duplicates"]}
 
-🏷️ Статус:          {self.table.item(row, 7).text().upper()}
+🏷️ Статус:          {record["status"].upper()}
 """
 
         QMessageBox.information(
@@ -294,12 +594,12 @@ class HistoryWidget(QWidget):
 
     def _on_delete_clicked(self):
         """Удалить выбранную запись."""
-        selected = self.table.selectedItems()
+        selected = self.table.selectionModel().selectedRows()
         if not selected:
             return
 
-        row = selected[0].row()
-        record_id = int(self.table.item(row, 0).text())
+        source_row = self._proxy_model.mapToSource(selected[0]).row()
+        record_id = self.model.row_data(source_row)["id"]
 
         reply = QMessageBox.question(
             self,
@@ -311,11 +611,14 @@ class HistoryWidget(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                query = "DELETE FROM processing_history WHERE id = ?"
-                self.history_repo.execute_write(query, (record_id,))
+                self.history_repo.execute_write(_SQL_DELETE, (record_id,))
 
                 logger.info(f"Удалена запись #{record_id}")
-                self._load_history()
+
+                # Убираем строку из модели без повторной загрузки истории
+                self.model.remove_row(source_row)
+                self._show_total(self._total - 1)
+                self._mark_table_current()
 
                 QMessageBox.information(
                     self,
@@ -344,11 +647,12 @@ class HistoryWidget(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                query = "DELETE FROM processing_history"
-                self.history_repo.execute_write(query)
+                self.history_repo.clear_history()
 
                 logger.warning("История полностью очищена")
-                self._load_history()
+                self.model.set_rows([])
+                self._show_total(0)
+                self._mark_table_current()
 
                 QMessageBox.information(
                     self,
@@ -365,70 +669,102 @@ class HistoryWidget(QWidget):
                 )
 
     def _on_export_clicked(self):
-        """Экспортировать историю в Excel."""
-        try:
-            # Получаем все данные
-            query = """
-            SELECT *
-            FROM processing_history
-            ORDER BY started_at DESC
-            """
+        """Экспортировать историю в Excel (запись файла — в фоне)."""
+        if self.model.rowCount() == 0:
+            QMessageBox.warning(
+                self,
+                "⚠️ Нет данных",
+                "История пуста, нечего экспортировать.",
+            )
+            return
 
-            rows = self.history_repo.fetch_all(query)
+        # Выбираем путь сохранения
+        default_name = f"history_{datetime.now():%Y-%m-%d_%H-%M-%S}.xlsx"
+        default_path = str(settings.paths.reports_dir / default_name)
 
-            if not rows:
-                QMessageBox.warning(
-                    self,
-                    "⚠️ Нет данных",
-                    "История пуста, нечего экспортировать.",
-                )
-                return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Сохранить историю в Excel",
+            default_path,
+            "Excel Files (*.xlsx);;All Files (*)",
+        )
 
-            # Конвертируем в DataFrame
-            data = [dict(row) for row in rows]
-            df = pd.DataFrame(data)
+        if not file_path:
+            return
 
-            # Выбираем путь сохранения
-            default_name = f"history_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
-            default_path = str(settings.paths.reports_dir / default_name)
+        output_path = Path(file_path)
+        self.btn_export.setEnabled(False)
+        run_in_background(
+            self._export_history,
+            output_path,
+            on_finished=lambda count: self._on_export_finished(
+                output_path, count),
+            on_error=self._on_export_failed,
+        )
 
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Сохранить историю в Excel",
-                default_path,
-                "Excel Files (*.xlsx);;All Files (*)",
-            )
+    def _export_history(self, output_path: Path) -> int:
+        """
+        Выгрузить историю из БД и записать Excel (фоновый поток).
 
-            if not file_path:
-                return
+        Строки читаются из БД порциями и пишутся в книгу write_only
+        напрямую, без DataFrame: openpyxl сразу сбрасывает их в файл,
+        так что память не растёт с размером истории.
 
-            output_path = Path(file_path)
+        Returns:
+            Количество записей в файле.
+        """
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
 
-            # Экспортируем в Excel
-            df.to_excel(output_path, index=False, sheet_name="История")
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("История")
 
-            QMessageBox.information(
-                self,
-                "✅ Экспорт завершён",
-                f"История экспортирована:\n{output_path}\n\n"
-                f"Записей: {len(df)}",
-            )
+        # Ширина задаётся колонкам один раз (до первой строки), ячейки
+        # пишутся без стилей — целыми строками-кортежами
+        for column in range(1, len(_EXPORT_COLUMNS) + 1):
+            ws.column_dimensions[get_column_letter(column)].width = (
+                _EXPORT_COLUMN_WIDTH)
+        ws.append(_EXPORT_COLUMNS)
 
-            logger.info(
-                f"История экспортирована: {output_path}, {len(df)} записей")
+        count = 0
+        append = ws.append
+        for chunk in self.history_repo.iter_all(_SQL_EXPORT):
+            for row in chunk:
+                append(tuple(row))
+            count += len(chunk)
 
-        except Exception as exc:
-            logger.exception("Ошибка экспорта истории")
-            QMessageBox.critical(
-                self,
-                "❌ Ошибка",
-                f"Не удалось экспортировать историю:\n{exc}",
-            )
+        wb.save(output_path)
+        return count
 
-    def refresh(self):
-        """Обновить историю (вызывается извне)."""
-        self._load_history()
+    def _on_export_finished(self, output_path: Path, count: int):
+        """Сообщить об успешном экспорте."""
+        self.btn_export.setEnabled(True)
+
+        QMessageBox.information(
+            self,
+            "✅ Экспорт завершён",
+            f"История экспортирована:\n{output_path}\n\n"
+            f"Записей: {count}",
+        )
+
+        logger.info(f"История экспортирована: {output_path}, {count} записей")
+
+    def _on_export_failed(self, exc: Exception):
+        """Сообщить об ошибке экспорта."""
+        self.btn_export.setEnabled(True)
+
+        logger.error("Ошибка экспорта истории", exc_info=exc)
+        QMessageBox.critical(
+            self,
+            "❌ Ошибка",
+            f"Не удалось экспортировать историю:\n{exc}",
+        )
 
     def refresh(self):
-        """Обновить историю (вызывается извне)."""
-        self._load_history()
+        """
+        Обновить историю (вызывается извне).
+
+        Скрытый виджет не загружает историю сразу — это сделает showEvent.
+        """
+        if self.isVisible():
+            self._load_history()
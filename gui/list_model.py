@@ -0,0 +1,115 @@
+"""
+Модель списка для QListView.
+
+Хранит элементы в обычном list и сообщает виду точечные изменения
+(beginInsertRows/beginRemoveRows) вместо пересоздания всех строк.
+"""
+
+from typing import Any, Callable, Iterable, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class ItemListModel(QAbstractListModel):
+    """
+    Список элементов (строки, пути и т.п.).
+
+    В виде показывается display(элемента) (по умолчанию str), подсказка —
+    tooltip(элемента), если задан; сам элемент доступен по UserRole.
+    Подходит для чтения; редактирование через вид не требуется.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Any] = (),
+        parent=None,
+        display: Callable[[Any], str] = str,
+        tooltip: Optional[Callable[[Any], str]] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._items: List[Any] = list(items)
+        self._display = display
+        self._tooltip = tooltip
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display(item)
+        if role == Qt.ItemDataRole.ToolTipRole and self._tooltip is not None:
+            return self._tooltip(item)
+        if role == Qt.ItemDataRole.UserRole:
+            return item
+        return None
+
+    def items(self) -> List[Any]:
+        """Текущие элементы (список модели — не изменять снаружи)."""
+        return self._items
+
+    def item(self, row: int) -> Any:
+        """Элемент строки row."""
+        return self._items[row]
+
+    def add_item(self, item: Any, row: int | None = None) -> None:
+        """Вставить элемент в позицию row (по умолчанию — в конец)."""
+        if row is None:
+            row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.insert(row, item)
+        self.endInsertRows()
+
+    def extend(self, items: Iterable[Any]) -> None:
+        """Добавить элементы в конец одной вставкой."""
+        items = list(items)
+        if not items:
+            return
+        first = len(self._items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+    def remove_item(self, row: int) -> None:
+        """Удалить элемент строки row."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._items[row]
+        self.endRemoveRows()
+
+    def set_items(self, items: Iterable[Any]) -> None:
+        """
+        Заменить элементы.
+
+        Если новый список отличается от текущего одной вставкой или одним
+        удалением, вид получает точечное изменение (выделение остальных
+        строк сохраняется); иначе модель сбрасывается целиком.
+        """
+        items = list(items)
+        old = self._items
+        if items == old:
+            return
+
+        if abs(len(items) - len(old)) == 1:
+            longer, shorter = (items, old) if len(items) > len(old) else (old, items)
+            row = next(
+                (i for i, (a, b) in enumerate(zip(longer, shorter)) if a != b),
+                len(shorter),
+            )
+            if longer[:row] == shorter[:row] and longer[row + 1:] == shorter[row:]:
+                if longer is items:
+                    self.add_item(items[row], row)
+                else:
+                    self.remove_item(row)
+                return
+
+        self.beginResetModel()
+        self._items = items
+        self.endResetModel()
+
+    def clear(self) -> None:
+        """Удалить все элементы."""
+        self.set_items([])
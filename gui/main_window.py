@@ -2,13 +2,17 @@
 Главное окно приложения (production-версия) - ПОЛНАЯ ВЕРСИЯ.
 """
 
+import codecs
+import csv
+import io
 import logging
+import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from services.yandex_maps_url_generator import YandexMapsURLGenerator
 
 import pandas as pd
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QWidget,
     QDialog,
@@ -38,10 +42,19 @@ from services.bitrix_service import BitrixService
 from gui.file_loader import FileLoaderWidget
 from gui.preview_table import PreviewTable
 from gui.progress_bar import ProgressBarWidget
+from gui.workers import Worker, run_in_background
 
 
 logger = logging.getLogger(__name__)
 
+# Пауза после ввода в поле менеджеров до обновления кнопок, мс
+_MANAGERS_DEBOUNCE_MS = 100
+
+# Строк в одной порции записи CSV (между порциями — сообщение о прогрессе)
+_EXPORT_CHUNK_ROWS = 50_000
+# Буфер файла CSV: запись на диск крупными блоками
+_EXPORT_BUFFER_SIZE = 1 << 20
+
 
 class MainWindow(QMainWindow):
     """
@@ -83,6 +96,27 @@ class MainWindow(QMainWindow):
         self.cleaned_df: Optional[pd.DataFrame] = None
         self.bitrix_df: Optional[pd.DataFrame] = None
         self.current_processing_id: Optional[int] = None
+        # Фоновая запись CSV (пока идёт — кнопка экспорта неактивна)
+        self._export_worker: Optional[Worker] = None
+
+        # Второстепенные вкладки создаются при первом открытии
+        self.analytics_widget = None
+        self.bitrix_analytics_widget = None
+        self.history_widget = None
+        self.url_generator_widget = None
+        self.settings_widget = None
+        self._tab_factories: Dict[int, Callable[[], QWidget]] = {}
+
+        # Разобранный список менеджеров (None — текст изменился) и таймер,
+        # собирающий серию нажатий клавиш в одно обновление кнопок
+        self._managers_cache: Optional[List[str]] = None
+        self._buttons_timer = QTimer(self)
+        self._buttons_timer.setSingleShot(True)
+        self._buttons_timer.setInterval(_MANAGERS_DEBOUNCE_MS)
+        self._buttons_timer.timeout.connect(self._update_buttons_state)
+        # Последнее применённое (process, export) — кнопки в _setup_ui
+        # создаются неактивными
+        self._prev_state = (False, False)
 
         self._setup_ui()
         self._connect_signals()
@@ -93,14 +127,13 @@ class MainWindow(QMainWindow):
     def _setup_ui(self) -> None:
         """Построить компоновку главного окна с вкладками."""
         from PyQt6.QtWidgets import QTabWidget
-        from gui.analytics_widget import AnalyticsWidget
-        from gui.url_generator_widget import URLGeneratorWidget
 
         central = QWidget()
         main_layout = QVBoxLayout()
 
         # Создаём вкладки
         tabs = QTabWidget()
+        self._tabs = tabs
 
         # ============================================================
         # ВКЛАДКА 1: ОБРАБОТКА ДАННЫХ (основной функционал)
@@ -157,50 +190,98 @@ class MainWindow(QMainWindow):
 
         tab_processing.setLayout(processing_layout)
 
+        tabs.addTab(tab_processing, "📝 Обработка данных")
+
         # ============================================================
-        # ВКЛАДКА 2: АНАЛИТИКА
+        # ОСТАЛЬНЫЕ ВКЛАДКИ: заглушки, виджет создаётся при первом
+        # открытии (импорт matplotlib и запросы к БД не тормозят запуск)
         # ============================================================
-        self.analytics_widget = AnalyticsWidget()
+        self._add_lazy_tab("📊 Статистика обработки", self._create_analytics_widget)
+        self._add_lazy_tab("📈 Битрикс Аналитика", self._create_bitrix_analytics_widget)
+        self._add_lazy_tab("📜 История", self._create_history_widget)
+        self._add_lazy_tab("🗺️ Генератор ссылок", self._create_url_generator_widget)
+        self._add_lazy_tab("⚙️ Настройки", self._create_settings_widget)
 
-        # Добавляем вкладки
-        tabs.addTab(tab_processing, "📝 Обработка данных")
-        tabs.addTab(self.analytics_widget, "📊 Статистика обработки")
+        tabs.currentChanged.connect(self._ensure_tab_loaded)
+
+        # Добавляем вкладки в главный layout
+        main_layout.addWidget(tabs)
 
-        # Вкладка: Битрикс-аналитика
+        central.setLayout(main_layout)
+        self.setCentralWidget(central)
+
+    def _add_lazy_tab(self, title: str, factory: Callable[[], QWidget]) -> None:
+        """Добавить вкладку-заглушку, содержимое которой создаст factory."""
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(0, 0, 0, 0)
+        index = self._tabs.addTab(page, title)
+        self._tab_factories[index] = factory
+
+    def _ensure_tab_loaded(self, index: int) -> None:
+        """Создать виджет вкладки index, если она открыта впервые."""
+        factory = self._tab_factories.pop(index, None)
+        if factory is None:
+            return
+        self._tabs.widget(index).layout().addWidget(factory())
+
+    def _create_analytics_widget(self) -> QWidget:
+        """Создать вкладку статистики обработки."""
+        from gui.analytics_widget import AnalyticsWidget
+
+        self.analytics_widget = AnalyticsWidget()
+        # Обработка могла пройти до первого открытия вкладки
+        if self.cleaned_df is not None and self.bitrix_df is not None:
+            self.analytics_widget.set_data(self.cleaned_df, self.bitrix_df)
+        return self.analytics_widget
+
+    def _create_bitrix_analytics_widget(self) -> QWidget:
+        """Создать вкладку Битрикс-аналитики."""
         from gui.bitrix_analytics_widget import BitrixAnalyticsWidget
+
         self.bitrix_analytics_widget = BitrixAnalyticsWidget()
-        tabs.addTab(self.bitrix_analytics_widget, "📈 Битрикс Аналитика")
+        return self.bitrix_analytics_widget
 
-        # Вкладка: История (НОВАЯ!)
+    def _create_history_widget(self) -> QWidget:
+        """Создать вкладку истории обработок."""
         from gui.history_widget import HistoryWidget
+
         self.history_widget = HistoryWidget()
-        tabs.addTab(self.history_widget, "📜 История")
+        return self.history_widget
+
+    def _create_url_generator_widget(self) -> QWidget:
+        """Создать вкладку генератора ссылок."""
+        from gui.url_generator_widget import URLGeneratorWidget
 
-        # ============================================================
-        # ВКЛАДКА: ГЕНЕРАТОР ССЫЛОК ЯНДЕКС.КАРТ (НОВАЯ!)
-        # ============================================================
         self.url_generator_widget = URLGeneratorWidget()
-        tabs.addTab(self.url_generator_widget, "🗺️ Генератор ссылок")
+        self._connect_cities_updates()
+        return self.url_generator_widget
 
-        # Вкладка: Настройки
+    def _create_settings_widget(self) -> QWidget:
+        """Создать вкладку настроек."""
         from gui.settings_widget import SettingsWidget
+
         self.settings_widget = SettingsWidget()
-        tabs.addTab(self.settings_widget, "⚙️ Настройки")
+        # Сообщения об успешных изменениях — в строку состояния (3 с)
+        self.settings_widget.cities_manager.status_message.connect(
+            lambda message: self.statusBar().showMessage(message, 3000)
+        )
+        self._connect_cities_updates()
+        return self.settings_widget
 
-        # ============================================================
-        # СВЯЗЬ ВИДЖЕТОВ: обновление городов при изменении настроек
-        # ============================================================
-        # Когда города изменяются в настройках, обновляем генератор
+    def _connect_cities_updates(self) -> None:
+        """
+        Когда города изменяются в настройках, обновлять генератор ссылок.
+
+        Связь нужна, только когда созданы обе вкладки: генератор, открытый
+        позже, сам читает актуальный список городов.
+        """
+        if self.settings_widget is None or self.url_generator_widget is None:
+            return
         self.settings_widget.cities_manager.cities_updated.connect(
             self.url_generator_widget.refresh_cities
         )
 
-        # Добавляем вкладки в главный layout
-        main_layout.addWidget(tabs)
-
-        central.setLayout(main_layout)
-        self.setCentralWidget(central)
-
     def _connect_signals(self) -> None:
         """Подключить сигналы."""
         self.button_save_managers.clicked.connect(
@@ -210,32 +291,58 @@ class MainWindow(QMainWindow):
 
         self.file_loader.button_select.clicked.connect(
             self._update_buttons_state)
-        self.managers_edit.textChanged.connect(self._update_buttons_state)
+        self.managers_edit.textChanged.connect(self._on_managers_text_changed)
 
     def _load_managers_from_db(self) -> None:
-        """Загрузить менеджеров из БД."""
-        try:
-            managers = self.managers_repo.get_all_active()
-            if managers:
-                self.managers_edit.setText("\n".join(managers))
-                logger.info(f"Загружено {len(managers)} менеджеров из БД")
-            else:
-                # Если в БД пусто, берём из settings
-                self.managers_edit.setText(
-                    "\n".join(settings.default_managers))
-        except Exception as exc:
-            logger.exception("Ошибка загрузки менеджеров из БД")
-            QMessageBox.warning(
-                self,
-                "Предупреждение",
-                f"Не удалось загрузить менеджеров из БД:\n{exc}",
-            )
+        """
+        Загрузить менеджеров из БД (в фоне).
+
+        Пока идёт запрос, в поле стоят менеджеры из settings — они же
+        остаются, если в БД пусто.
+        """
+        self.managers_edit.setText("\n".join(settings.default_managers))
+        run_in_background(
+            self.managers_repo.get_all_active,
+            on_finished=self._on_managers_loaded,
+            on_error=self._on_managers_load_failed,
+        )
+
+    def _on_managers_loaded(self, managers: List[str]) -> None:
+        """Показать менеджеров из БД."""
+        if not managers:
+            return
+        # Пользователь уже начал править список — не затираем его
+        if self.managers_edit.document().isModified():
+            return
+        self.managers_edit.setText("\n".join(managers))
+        logger.info(f"Загружено {len(managers)} менеджеров из БД")
+
+    def _on_managers_load_failed(self, exc: Exception) -> None:
+        """Сообщить об ошибке загрузки менеджеров."""
+        logger.error("Ошибка загрузки менеджеров из БД", exc_info=exc)
+        QMessageBox.warning(
+            self,
+            "Предупреждение",
+            f"Не удалось загрузить менеджеров из БД:\n{exc}",
+        )
+
+    def _on_managers_text_changed(self) -> None:
+        """Сбросить разобранный список и отложить обновление кнопок."""
+        self._managers_cache = None
+        self._buttons_timer.start()
 
     def _get_managers_from_edit(self) -> List[str]:
-        """Считать менеджеров из текстового поля."""
-        lines = [line.strip()
-                 for line in self.managers_edit.toPlainText().splitlines()]
-        return [line for line in lines if line]
+        """
+        Считать менеджеров из текстового поля.
+
+        Текст разбирается один раз после изменения; возвращается общий
+        список — не изменять.
+        """
+        if self._managers_cache is None:
+            lines = [line.strip()
+                     for line in self.managers_edit.toPlainText().splitlines()]
+            self._managers_cache = [line for line in lines if line]
+        return self._managers_cache
 
     def _on_save_managers_clicked(self) -> None:
         """Сохранить менеджеров в БД."""
@@ -271,12 +378,22 @@ class MainWindow(QMainWindow):
         has_managers = len(self._get_managers_from_edit()) > 0
         has_results = self.bitrix_df is not None and not self.bitrix_df.empty
 
-        self.button_process.setEnabled(has_files and has_managers)
-        self.button_export.setEnabled(has_results)
+        state = (
+            has_files and has_managers,
+            has_results and self._export_worker is None,
+        )
+        # Кнопки трогаем только при смене состояния
+        if state == self._prev_state:
+            return
+        self._prev_state = state
+
+        can_process, can_export = state
+        self.button_process.setEnabled(can_process)
+        self.button_export.setEnabled(can_export)
 
     def _on_process_clicked(self) -> None:
         """Обработать файлы."""
-        file_paths = self.file_loader.selected_files
+        file_paths = self.file_loader.paths()
         if not file_paths:
             QMessageBox.warning(self, "❌ Ошибка", "Не выбраны файлы.")
             return
@@ -321,9 +438,11 @@ class MainWindow(QMainWindow):
                 "Адрес",
                 "Ответственный",
             ]
-            preview_df = self.bitrix_df[preview_cols].copy()
             self.preview_table.show_dataframe(
-                preview_df, limit=settings.preview_rows)  # ← используем настройку
+                self.bitrix_df,
+                limit=settings.preview_rows,  # ← используем настройку
+                columns=preview_cols,
+            )
 
             self.progress_bar.set_progress(100, "✅ Готово")
             self.status_label.setText(
@@ -341,19 +460,23 @@ class MainWindow(QMainWindow):
             logger.info(f"Обработка завершена успешно: {stats.model_dump()}")
             self._update_buttons_state()
 
-            # Передаём данные в виджет аналитики
-            try:
-                self.analytics_widget.set_data(self.cleaned_df, self.bitrix_df)
-                logger.debug("Данные переданы в виджет аналитики")
-            except Exception as exc:
-                logger.warning(f"Не удалось обновить аналитику: {exc}")
+            # Передаём данные в виджет аналитики (если вкладка ещё
+            # не открывалась, данные подхватятся при её создании)
+            if self.analytics_widget is not None:
+                try:
+                    self.analytics_widget.set_data(
+                        self.cleaned_df, self.bitrix_df)
+                    logger.debug("Данные переданы в виджет аналитики")
+                except Exception as exc:
+                    logger.warning(f"Не удалось обновить аналитику: {exc}")
 
             # Обновляем историю обработок
-            try:
-                self.history_widget.refresh()
-                logger.debug("История обработок обновлена")
-            except Exception as exc:
-                logger.warning(f"Не удалось обновить историю: {exc}")
+            if self.history_widget is not None:
+                try:
+                    self.history_widget.refresh()
+                    logger.debug("История обработок обновлена")
+                except Exception as exc:
+                    logger.warning(f"Не удалось обновить историю: {exc}")
 
         except FileProcessingError as exc:
             logger.error(f"Ошибка обработки файлов: {exc.message}")
@@ -439,47 +562,97 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
-        try:
-            output_path = Path(file_path)
-
-            # КРИТИЧНО для Битрикс24: точка с запятой, UTF-8 с BOM, кавычки
-            self.bitrix_df.to_csv(
-                output_path,
-                index=False,
-                encoding="utf-8-sig",  # BOM для корректного отображения в Excel/Битрикс
-                sep=";",               # ← КЛЮЧЕВОЕ: точка с запятой!
-                quoting=1,             # csv.QUOTE_ALL — все значения в кавычках
-            )
+        output_path = Path(file_path)
+        df = self.bitrix_df
+        self.status_label.setText("⏳ Идёт экспорт...")
+        self._export_worker = run_in_background(
+            self._write_bitrix_csv,
+            df,
+            output_path,
+            on_finished=lambda rows: self._on_export_finished(
+                output_path, rows, len(df.columns)),
+            on_error=self._on_export_failed,
+            on_progress=self.status_label.setText,
+        )
+        self._update_buttons_state()
 
-            # Показываем детальную информацию об экспорте
-            success_msg = (
-                f"✅ Файл успешно сохранён:\n{output_path}\n\n"
-                f"📊 Параметры экспорта:\n"
-                f"   • Разделитель: точка с запятой (;)\n"
-                f"   • Кодировка: UTF-8 с BOM\n"
-                f"   • Строк экспортировано: {len(self.bitrix_df)}\n"
-                f"   • Колонок: {len(self.bitrix_df.columns)}\n\n"
-                f"💡 Готово к импорту в Битрикс24!"
-            )
+    @staticmethod
+    def _write_bitrix_csv(df: pd.DataFrame, output_path: Path, progress) -> int:
+        """
+        Записать CSV для Битрикс24 порциями (фоновый поток).
 
-            QMessageBox.information(
-                self,
-                "✅ Экспорт завершён",
-                success_msg,
-            )
+        Строки идут из itertuples прямо в csv.writer, без построчной
+        обработки pandas; пропуски (NaN/None) пишутся пустыми значениями,
+        как в to_csv.
 
-            logger.info(
-                f"Экспорт выполнен: {output_path}, {len(self.bitrix_df)} строк, "
-                f"разделитель=';', кодировка=utf-8-sig"
-            )
+        Returns:
+            Количество записанных строк.
+        """
+        total = len(df)
+        # КРИТИЧНО для Битрикс24: точка с запятой, UTF-8 с BOM, кавычки.
+        # BOM пишется один раз в начало файла, дальше — UTF-8 без BOM
+        with open(output_path, "wb", buffering=_EXPORT_BUFFER_SIZE) as raw:
+            raw.write(codecs.BOM_UTF8)
+            with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                writer = csv.writer(
+                    f,
+                    delimiter=";",              # ← КЛЮЧЕВОЕ: точка с запятой!
+                    quoting=csv.QUOTE_ALL,      # все значения в кавычках
+                    lineterminator=os.linesep,  # как у pandas.to_csv
+                )
+                writer.writerow(df.columns.tolist())
+                for start in range(0, total, _EXPORT_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + _EXPORT_CHUNK_ROWS]
+                    if chunk.isna().values.any():
+                        chunk = chunk.astype(object).where(chunk.notna(), "")
+                    writer.writerows(
+                        chunk.itertuples(index=False, name=None))
+                    done = min(start + _EXPORT_CHUNK_ROWS, total)
+                    progress(f"⏳ Экспорт: {done} из {total} строк...")
+        return total
+
+    def _on_export_finished(
+        self, output_path: Path, rows: int, columns: int
+    ) -> None:
+        """Сообщить об успешном экспорте."""
+        self._export_worker = None
+        self._update_buttons_state()
+        self.status_label.setText(f"✅ Экспортировано строк: {rows}")
+
+        # Показываем детальную информацию об экспорте
+        success_msg = (
+            f"✅ Файл успешно сохранён:\n{output_path}\n\n"
+            f"📊 Параметры экспорта:\n"
+            f"   • Разделитель: точка с запятой (;)\n"
+            f"   • Кодировка: UTF-8 с BOM\n"
+            f"   • Строк экспортировано: {rows}\n"
+            f"   • Колонок: {columns}\n\n"
+            f"💡 Готово к импорту в Битрикс24!"
+        )
 
-        except Exception as exc:
-            logger.exception("Ошибка при экспорте")
-            QMessageBox.critical(
-                self,
-                "❌ Критическая ошибка",
-                f"Не удалось экспортировать файл:\n{exc}",
-            )
+        QMessageBox.information(
+            self,
+            "✅ Экспорт завершён",
+            success_msg,
+        )
+
+        logger.info(
+            f"Экспорт выполнен: {output_path}, {rows} строк, "
+            f"разделитель=';', кодировка=utf-8-sig"
+        )
+
+    def _on_export_failed(self, exc: Exception) -> None:
+        """Сообщить об ошибке экспорта."""
+        self._export_worker = None
+        self._update_buttons_state()
+        self.status_label.setText("❌ Ошибка при экспорте")
+
+        logger.error("Ошибка при экспорте", exc_info=exc)
+        QMessageBox.critical(
+            self,
+            "❌ Критическая ошибка",
+            f"Не удалось экспортировать файл:\n{exc}",
+        )
 
     def closeEvent(self, event) -> None:
         """Обработать закрытие окна (сохранение состояния и т.п.)."""
@@ -10,6 +10,9 @@ QTableView для предпросмотра первых строк очище
 
 import logging
 from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
 
 import pandas as pd
 from PyQt6.QtCore import QAbstractTableModel, Qt, QModelIndex, QSortFilterProxyModel
@@ -18,6 +21,7 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QTableView,
+    QHeaderView,
     QLineEdit,
     QPushButton,
     QLabel,
@@ -29,44 +33,112 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QAction
 
 from config.settings import settings
+from gui.workers import run_in_background
 
 
 logger = logging.getLogger(__name__)
 
+# Экспорт в Excel: столько строк за раз переводится в значения ячеек
+_EXPORT_CHUNK_ROWS = 10_000
+
+# Высота строки (одинаковая — Qt не измеряет каждую строку)
+_ROW_HEIGHT = 24
+# Ширина колонки считается по заголовку и первым строкам, а не по всем
+_WIDTH_SAMPLE_ROWS = 50
+_COLUMN_PADDING = 24
+_MAX_COLUMN_WIDTH = 400
+
 
 class DataFrameTableModel(QAbstractTableModel):
     """
     Простейшая модель для отображения pandas.DataFrame в QTableView.
 
     Подходит для чтения; редактирование в MVP не требуется.
+
+    Значения хранятся по колонкам в виде готовых строк (массив на колонку),
+    поэтому data() — это одно обращение по индексу без pandas и str().
     """
 
     def __init__(self, df: pd.DataFrame | None = None, parent=None) -> None:
         super().__init__(parent)
-        self._df = df if df is not None else pd.DataFrame()
+        self._cols: List[np.ndarray] = []
+        self._headers: List[str] = []
+        self._row_text: np.ndarray = np.empty(0, dtype=object)
+        self._row_count = 0
+        if df is not None:
+            self._fill(df)
 
     def set_dataframe(self, df: pd.DataFrame) -> None:
         """Задать новый DataFrame и уведомить виджет о смене данных."""
         self.beginResetModel()
-        self._df = df
+        self._fill(df)
         self.endResetModel()
 
+    def set_dataframe_fast(self, df: pd.DataFrame) -> None:
+        """
+        Задать новый DataFrame; если форма и колонки те же, без сброса.
+
+        При той же структуре вид и прокси получают одно dataChanged на всю
+        таблицу (выделение и прокрутка сохраняются), иначе — как
+        set_dataframe.
+        """
+        same_shape = (
+            len(df) == self._row_count
+            and df.columns.astype(str).tolist() == self._headers
+        )
+        if not same_shape:
+            self.set_dataframe(df)
+            return
+
+        self._fill(df)
+        if self._row_count and self._cols:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self._row_count - 1, len(self._cols) - 1),
+                [Qt.ItemDataRole.DisplayRole],
+            )
+
+    def _fill(self, df: pd.DataFrame) -> None:
+        """Один раз перевести колонки df в строки (пустые значения — "")."""
+        self._cols = [self._column_strings(col) for _, col in df.items()]
+        self._headers = df.columns.astype(str).tolist()
+        self._row_count = len(df)
+        # Текст строки для поиска: ячейки через перевод строки (его нельзя
+        # ввести в поле поиска, поэтому совпадение не «склеит» две ячейки)
+        self._row_text = np.array(
+            ["\n".join(cells).lower() for cells in zip(*self._cols)],
+            dtype=object,
+        ) if self._cols else np.full(self._row_count, "", dtype=object)
+
+    def column_values(self, column: int) -> np.ndarray:
+        """Строковые значения колонки column (массив модели — не изменять)."""
+        return self._cols[column]
+
+    def row_text(self) -> np.ndarray:
+        """Текст каждой строки в нижнем регистре (для фильтра поиска)."""
+        return self._row_text
+
+    @staticmethod
+    def _column_strings(col: pd.Series) -> np.ndarray:
+        """Значения колонки строками; пропуски заменяются только если есть."""
+        values = col.astype(object)
+        if col.hasnans:
+            values = values.where(col.notna(), "")
+        return values.astype(str).to_numpy()
+
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
         if parent.isValid():
             return 0
-        return len(self._df)
+        return self._row_count
 
     def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
         if parent.isValid():
             return 0
-        return len(self._df.columns)
+        return len(self._cols)
 
     def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
-        if not index.isValid():
-            return None
-        if role == Qt.ItemDataRole.DisplayRole:
-            value = self._df.iat[index.row(), index.column()]
-            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self._cols[index.column()][index.row()]
         return None
 
     def headerData(self, section: int, orientation: Qt.Orientation,
@@ -75,13 +147,42 @@ class DataFrameTableModel(QAbstractTableModel):
             return None
         if orientation == Qt.Orientation.Horizontal:
             try:
-                return str(self._df.columns[section])
+                return self._headers[section]
             except IndexError:
                 return ""
         else:
             return str(section + 1)
 
 
+class DataFrameFilterProxyModel(QSortFilterProxyModel):
+    """
+    Фильтр строк по подстроке для DataFrameTableModel.
+
+    Вместо обхода всех колонок каждой строки проверяет одно вхождение
+    в заранее собранный текст строки (DataFrameTableModel.row_text).
+    Текст строк уже в нижнем регистре, поэтому сравнение — обычное
+    регистрозависимое «in»: искомую строку приводит к нижнему регистру
+    вызывающий код.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseSensitive)
+        self._needle = ""
+
+    def set_needle(self, needle: str) -> None:
+        """Задать искомую подстроку (в нижнем регистре)."""
+        if needle == self._needle:
+            return
+        self._needle = needle
+        self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not self._needle:
+            return True
+        return self._needle in self.sourceModel().row_text()[source_row]
+
+
 class PreviewTable(QWidget):
     """
     Улучшенная таблица для предпросмотра с поиском и экспортом.
@@ -92,13 +193,13 @@ class PreviewTable(QWidget):
 
         # Модель и прокси для фильтрации
         self._model = DataFrameTableModel()
-        self._proxy_model = QSortFilterProxyModel()
+        self._proxy_model = DataFrameFilterProxyModel()
         self._proxy_model.setSourceModel(self._model)
-        self._proxy_model.setFilterCaseSensitivity(
-            Qt.CaseSensitivity.CaseInsensitive)
 
-        # Полный DataFrame (для экспорта)
+        # Полный DataFrame (ссылка, не копия — для экспорта)
+        # и показываемые колонки
         self._full_df: pd.DataFrame = pd.DataFrame()
+        self._columns: List[str] = []
 
         self._setup_ui()
         logger.info("Улучшенная таблица предпросмотра инициализирована")
@@ -130,6 +231,9 @@ class PreviewTable(QWidget):
         self.table_view.setModel(self._proxy_model)
         self.table_view.setAlternatingRowColors(True)
         self.table_view.setSortingEnabled(True)
+        vertical_header = self.table_view.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(_ROW_HEIGHT)
         self.table_view.setContextMenuPolicy(
             Qt.ContextMenuPolicy.CustomContextMenu)
         self.table_view.customContextMenuRequested.connect(
@@ -160,24 +264,42 @@ class PreviewTable(QWidget):
 
         self.setLayout(layout)
 
-    def show_dataframe(self, df: pd.DataFrame, limit: int = 10) -> None:
+    def show_dataframe(
+        self,
+        df: pd.DataFrame,
+        limit: int = 10,
+        columns: Optional[Sequence[str]] = None,
+    ) -> None:
         """
         Показать первые N строк DataFrame.
 
+        DataFrame не копируется: строки для модели строятся только
+        из первых limit строк выбранных колонок, а для экспорта хранится
+        ссылка на сам df. Таблица не владеет им — вызывающий код не должен
+        менять df на месте, пока он показан (MainWindow при новой обработке
+        присваивает bitrix_df новый объект).
+
         Args:
             df: DataFrame для отображения
             limit: количество строк (по умолчанию 10)
+            columns: показываемые колонки (по умолчанию — все)
         """
-        self._full_df = df.copy()  # Сохраняем полный DataFrame
-        preview_df = df.head(limit)
+        self._full_df = df  # Сохраняем полный DataFrame (без копии)
+        self._columns = list(columns) if columns is not None else list(df.columns)
+        preview_df = df.iloc[:limit][self._columns]
 
-        self._model.set_dataframe(preview_df)
-        self.table_view.resizeColumnsToContents()
+        # Перерисовка один раз — после замены данных и ширин колонок
+        self.table_view.setUpdatesEnabled(False)
+        try:
+            self._model.set_dataframe_fast(preview_df)
+            self._fit_column_widths()
+        finally:
+            self.table_view.setUpdatesEnabled(True)
 
         # Обновляем информацию
         self.info_label.setText(
             f"📊 Показано: {len(preview_df)} из {len(df)} строк | "
-            f"Колонок: {len(df.columns)}"
+            f"Колонок: {len(self._columns)}"
         )
         self.info_label.setStyleSheet("color: #64B5F6; font-weight: bold;")
 
@@ -185,11 +307,27 @@ class PreviewTable(QWidget):
         self.btn_export.setEnabled(len(df) > 0)
         self.btn_copy.setEnabled(len(df) > 0)
 
+    def _fit_column_widths(self) -> None:
+        """
+        Задать ширину колонок по заголовку и первым _WIDTH_SAMPLE_ROWS строкам.
+
+        В отличие от resizeColumnsToContents измеряется одна самая длинная
+        строка колонки, а не каждая ячейка.
+        """
+        metrics = self.table_view.fontMetrics()
+        for column in range(self._model.columnCount()):
+            header = self._model.headerData(column, Qt.Orientation.Horizontal)
+            longest = max(
+                (header, *self._model.column_values(column)[:_WIDTH_SAMPLE_ROWS]),
+                key=len,
+            )
+            width = metrics.horizontalAdvance(longest) + _COLUMN_PADDING
+            self.table_view.setColumnWidth(column, min(width, _MAX_COLUMN_WIDTH))
+
     def _on_search_changed(self, text: str):
         """Обработка изменения текста поиска."""
-        # Фильтруем по всем колонкам
-        self._proxy_model.setFilterKeyColumn(-1)  # -1 = все колонки
-        self._proxy_model.setFilterFixedString(text)
+        # Фильтруем по всем колонкам (по тексту строки целиком)
+        self._proxy_model.set_needle(text.lower())
 
         # Обновляем информацию
         visible_rows = self._proxy_model.rowCount()
@@ -202,7 +340,7 @@ class PreviewTable(QWidget):
         else:
             self.info_label.setText(
                 f"📊 Показано: {total_rows} из {len(self._full_df)} строк | "
-                f"Колонок: {len(self._full_df.columns)}"
+                f"Колонок: {len(self._columns)}"
             )
 
     def _on_clear_search(self):
@@ -237,28 +375,8 @@ class PreviewTable(QWidget):
             )
             return
 
-        # Сортируем по строкам и колонкам
-        selection = sorted(
-            selection, key=lambda idx: (idx.row(), idx.column()))
-
         # Формируем текст для буфера обмена (TSV формат)
-        current_row = selection[0].row()
-        rows_data = []
-        row_data = []
-
-        for idx in selection:
-            if idx.row() != current_row:
-                rows_data.append("\t".join(row_data))
-                row_data = []
-                current_row = idx.row()
-
-            row_data.append(idx.data() or "")
-
-        # Добавляем последнюю строку
-        if row_data:
-            rows_data.append("\t".join(row_data))
-
-        clipboard_text = "\n".join(rows_data)
+        clipboard_text = self._selection_to_tsv(selection)
 
         # Копируем в буфер обмена
         clipboard = QApplication.clipboard()
@@ -275,6 +393,39 @@ class PreviewTable(QWidget):
         QTimer.singleShot(2000, lambda: self.info_label.setStyleSheet(
             "color: #64B5F6; font-weight: bold;"))
 
+    def _selection_to_tsv(self, selection) -> str:
+        """
+        Собрать выделенные ячейки в TSV: строки таблицы — через перевод
+        строки, ячейки строки — через табуляцию (в порядке колонок).
+
+        Значения берутся сразу из колонок модели, без data() на ячейку.
+        """
+        rows = np.fromiter((idx.row() for idx in selection), dtype=np.int64)
+        cols = np.fromiter((idx.column() for idx in selection), dtype=np.int64)
+
+        # Сортируем по строкам и колонкам
+        order = np.lexsort((cols, rows))
+        rows, cols = rows[order], cols[order]
+
+        # Строки прокси (видимый порядок) -> строки модели
+        view_rows, starts = np.unique(rows, return_index=True)
+        source_rows = np.fromiter(
+            (self._proxy_model.mapToSource(
+                self._proxy_model.index(int(row), 0)).row()
+             for row in view_rows),
+            dtype=np.int64,
+            count=len(view_rows),
+        )
+        source_rows = np.repeat(source_rows, np.diff(np.append(starts, len(rows))))
+
+        values = np.empty(len(rows), dtype=object)
+        for col in np.unique(cols):
+            mask = cols == col
+            values[mask] = self._model.column_values(int(col))[source_rows[mask]]
+
+        return "\n".join(
+            "\t".join(row_values) for row_values in np.split(values, starts[1:]))
+
     def _on_export_clicked(self):
         """Экспортировать таблицу в Excel."""
         if self._full_df.empty:
@@ -285,44 +436,87 @@ class PreviewTable(QWidget):
             )
             return
 
-        try:
-            default_name = f"preview_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
-            default_path = str(settings.paths.output_dir / default_name)
+        default_name = f"preview_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+        default_path = str(settings.paths.output_dir / default_name)
 
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Сохранить предпросмотр в Excel",
-                default_path,
-                "Excel Files (*.xlsx);;All Files (*)",
-            )
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Сохранить предпросмотр в Excel",
+            default_path,
+            "Excel Files (*.xlsx);;All Files (*)",
+        )
 
-            if not file_path:
-                return
+        if not file_path:
+            return
 
-            output_path = Path(file_path)
+        output_path = Path(file_path)
+        df = self._full_df
+        columns = self._columns
 
-            # Экспортируем ПОЛНЫЙ DataFrame (не только preview)
-            self._full_df.to_excel(
-                output_path, index=False, sheet_name="Предпросмотр")
+        # Экспортируем ПОЛНЫЙ DataFrame (не только preview) — в фоне
+        self.btn_export.setEnabled(False)
+        run_in_background(
+            self._write_excel,
+            df,
+            columns,
+            output_path,
+            on_finished=lambda rows: self._on_export_finished(
+                output_path, rows, len(columns)),
+            on_error=self._on_export_failed,
+        )
 
-            QMessageBox.information(
-                self,
-                "✅ Экспорт завершён",
-                f"Таблица экспортирована:\n{output_path}\n\n"
-                f"Строк: {len(self._full_df)}\n"
-                f"Колонок: {len(self._full_df.columns)}",
-            )
+    @staticmethod
+    def _write_excel(df: pd.DataFrame, columns: List[str], output_path: Path) -> int:
+        """
+        Записать колонки columns DataFrame в Excel (фоновый поток).
 
-            logger.info(
-                f"Предпросмотр экспортирован: {output_path}, {len(self._full_df)} строк")
+        Книга openpyxl в режиме write_only сбрасывает строки в файл по мере
+        записи; значения готовятся порциями по _EXPORT_CHUNK_ROWS строк,
+        пустые (NaN/None/NaT) становятся пустыми ячейками.
 
-        except Exception as exc:
-            logger.exception("Ошибка экспорта предпросмотра")
-            QMessageBox.critical(
-                self,
-                "❌ Ошибка",
-                f"Не удалось экспортировать таблицу:\n{exc}",
-            )
+        Returns:
+            Количество записанных строк.
+        """
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Предпросмотр")
+        ws.append(columns)
+
+        append = ws.append
+        for start in range(0, len(df), _EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + _EXPORT_CHUNK_ROWS][columns]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                append(row)
+
+        wb.save(output_path)
+        return len(df)
+
+    def _on_export_finished(self, output_path: Path, rows: int, columns: int):
+        """Сообщить об успешном экспорте."""
+        self.btn_export.setEnabled(True)
+
+        QMessageBox.information(
+            self,
+            "✅ Экспорт завершён",
+            f"Таблица экспортирована:\n{output_path}\n\n"
+            f"Строк: {rows}\n"
+            f"Колонок: {columns}",
+        )
+
+        logger.info(f"Предпросмотр экспортирован: {output_path}, {rows} строк")
+
+    def _on_export_failed(self, exc: Exception):
+        """Сообщить об ошибке экспорта."""
+        self.btn_export.setEnabled(True)
+
+        logger.error("Ошибка экспорта предпросмотра", exc_info=exc)
+        QMessageBox.critical(
+            self,
+            "❌ Ошибка",
+            f"Не удалось экспортировать таблицу:\n{exc}",
+        )
 
     def keyPressEvent(self, event):
         """Обработка горячих клавиш."""
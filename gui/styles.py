@@ -4,7 +4,7 @@
 Здесь можно хранить QSS-строки или функции настройки палитры.
 """
 
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QListView
 from PyQt6.QtGui import QPalette, QColor
 
 
@@ -18,3 +18,19 @@ def apply_basic_theme(app: QApplication) -> None:
     palette.setColor(QPalette.ColorRole.Window, QColor("#f5f5f5"))
     palette.setColor(QPalette.ColorRole.WindowText, QColor("#202020"))
     app.setPalette(palette)
+
+
+# Сколько строк списка раскладывается за один проход цикла событий
+LIST_BATCH_SIZE = 64
+
+
+def setup_batched_list(view: QListView) -> None:
+    """
+    Раскладывать строки списка порциями (Batched), с одинаковой высотой.
+
+    Длинный список не блокирует UI на одну полную раскладку, а одинаковая
+    высота строк избавляет от измерения каждого элемента.
+    """
+    view.setLayoutMode(QListView.LayoutMode.Batched)
+    view.setBatchSize(LIST_BATCH_SIZE)
+    view.setUniformItemSizes(True)
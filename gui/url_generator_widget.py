@@ -52,30 +52,6 @@ class URLGeneratorWidget(QWidget):
 
         logger.info("URLGeneratorWidget инициализирован")
 
-    def refresh_cities(self) -> None:
-        """Обновить список городов (вызывается при изменении настроек)."""
-        # Сохраняем текущий выбор
-        selected_cities = [item.text()
-                           for item in self.cities_list.selectedItems()]
-
-        # Очищаем и заново загружаем
-        self.cities_list.clear()
-
-        # Перезагружаем генератор (чтобы подхватить изменения из файла)
-        self.generator = YandexMapsURLGenerator()
-
-        # Заполняем список
-        for city in self.generator.get_popular_cities():
-            self.cities_list.addItem(city)
-
-        # Восстанавливаем выбор
-        for i in range(self.cities_list.count()):
-            item = self.cities_list.item(i)
-            if item.text() in selected_cities:
-                item.setSelected(True)
-
-        logger.info("Список городов обновлён")
-
     def _setup_ui(self) -> None:
         """Построить UI виджета."""
         main_layout = QVBoxLayout(self)
@@ -0,0 +1,84 @@
+"""
+Фоновые задачи для GUI.
+
+Выполняют тяжёлую работу (БД, pandas, запись файлов) в QThreadPool,
+а результат или исключение возвращают в GUI-поток через сигналы.
+"""
+
+import logging
+from typing import Any, Callable, Optional, Set
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+logger = logging.getLogger(__name__)
+
+# Запущенные задачи: держим ссылки, пока не придёт finished/error,
+# иначе Python может собрать объект сигналов раньше времени
+_active_workers: Set["Worker"] = set()
+
+
+class WorkerSignals(QObject):
+    """Сигналы фоновой задачи (QRunnable сам не является QObject)."""
+
+    finished = pyqtSignal(object)   # результат функции
+    error = pyqtSignal(object)      # исключение
+    progress = pyqtSignal(str)      # текст статуса во время работы
+
+
+class Worker(QRunnable):
+    """Задача для QThreadPool: выполняет fn(*args, **kwargs) в фоне."""
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs) -> None:
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self) -> None:
+        """Выполнить функцию (вызывается в потоке пула)."""
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as exc:
+            self.signals.error.emit(exc)
+        else:
+            self.signals.finished.emit(result)
+
+
+def run_in_background(
+    fn: Callable[..., Any],
+    *args,
+    on_finished: Optional[Callable[[Any], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+    on_progress: Optional[Callable[[str], None]] = None,
+    **kwargs,
+) -> Worker:
+    """
+    Запустить fn(*args, **kwargs) в глобальном QThreadPool.
+
+    Обработчики on_finished/on_error/on_progress вызываются в GUI-потоке.
+    Если задан on_progress, fn получает аргумент progress — функцию,
+    которую можно вызывать из фонового потока с текстом статуса.
+
+    Returns:
+        Запущенная задача (для подключения дополнительных сигналов).
+    """
+    worker = Worker(fn, *args, **kwargs)
+
+    def _release(_: Any) -> None:
+        _active_workers.discard(worker)
+
+    if on_finished is not None:
+        worker.signals.finished.connect(on_finished)
+    if on_error is not None:
+        worker.signals.error.connect(on_error)
+    if on_progress is not None:
+        worker.kwargs["progress"] = worker.signals.progress.emit
+        worker.signals.progress.connect(on_progress)
+    worker.signals.finished.connect(_release)
+    worker.signals.error.connect(_release)
+
+    _active_workers.add(worker)
+    QThreadPool.globalInstance().start(worker)
+    return worker
@@ -52,7 +52,8 @@ def main() -> None:
     logger.info(f"Уровень логирования: {settings.log_level}")
     logger.info("=" * 60)
 
-    # 2. Инициализировать БД
+    # 2. Создать директории данных и инициализировать БД
+    settings.paths.ensure_dirs()
     try:
         initialize_database()
     except Exception as exc:
@@ -7,7 +7,7 @@
 import sqlite3
 import logging
 from pathlib import Path
-from typing import Any, List, Optional, Type, TypeVar
+from typing import Any, Iterator, List, Optional, Type, TypeVar
 from contextlib import contextmanager
 
 from config.settings import settings
@@ -107,6 +107,34 @@ class BaseRepository:
         """Выполнить SELECT и вернуть все строки."""
         return self.execute(query, params)
 
+    def iter_all(
+        self,
+        query: str,
+        params: tuple | dict | None = None,
+        size: int = 5000,
+    ) -> Iterator[List[sqlite3.Row]]:
+        """
+        Выполнить SELECT и отдавать строки порциями по size (fetchmany).
+
+        Соединение открыто, пока генератор не исчерпан или не закрыт,
+        в памяти одновременно только одна порция.
+
+        Raises:
+            DatabaseError: при ошибке выполнения.
+        """
+        with self._get_connection() as conn:
+            try:
+                cursor = conn.execute(query, params or ())
+                while chunk := cursor.fetchmany(size):
+                    yield chunk
+
+            except sqlite3.Error as exc:
+                logger.exception(f"Ошибка выполнения запроса: {query}")
+                raise DatabaseError(
+                    "Ошибка выполнения SQL-запроса",
+                    {"query": query, "params": params, "error": str(exc)},
+                ) from exc
+
     def execute_write(
         self,
         query: str,
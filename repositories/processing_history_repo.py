@@ -18,6 +18,25 @@ logger = logging.getLogger(__name__)
 class ProcessingHistoryRepository(BaseRepository):
     """Репозиторий истории обработки."""
 
+    # Счётчик изменений истории (общий для всех экземпляров в процессе).
+    # Позволяет дёшево понять, что кэшированная статистика устарела.
+    _revision: int = 0
+
+    def revision(self) -> int:
+        """Текущая ревизия истории: растёт при каждой записи в таблицу."""
+        return ProcessingHistoryRepository._revision
+
+    def execute_write(
+        self,
+        query: str,
+        params: tuple | dict | None = None,
+    ) -> int:
+        """Выполнить запись и увеличить ревизию истории."""
+        try:
+            return super().execute_write(query, params)
+        finally:
+            ProcessingHistoryRepository._revision += 1
+
     def create_table(self) -> None:
         """Создать таблицу processing_history."""
         query = """
@@ -35,6 +54,16 @@ class ProcessingHistoryRepository(BaseRepository):
         );
         """
         self.execute(query, commit=True)
+
+        # Индекс под сортировку истории (новые сверху) и постраничную
+        # выборку по ключу (started_at, id)
+        self.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_ph_started_desc
+            ON processing_history (started_at DESC, id DESC);
+            """,
+            commit=True,
+        )
         logger.info("Таблица processing_history создана/проверена")
 
     def start_processing(self, file_count: int) -> int:
@@ -100,3 +129,14 @@ class ProcessingHistoryRepository(BaseRepository):
         )
         logger.info(
             f"Обработка завершена, record_id={record_id}, status={status}")
+
+    def clear_history(self) -> None:
+        """
+        Удалить всю историю обработок.
+
+        Один DELETE без WHERE в одной транзакции: на таблице нет триггеров,
+        поэтому SQLite применяет truncate-оптимизацию и освобождает
+        страницы таблицы целиком, а не удаляет записи по одной.
+        """
+        self.execute_write("DELETE FROM processing_history")
+        logger.info("История обработки очищена")
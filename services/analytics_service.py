@@ -7,19 +7,28 @@
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.figure import Figure
 
 from repositories.processing_history_repo import ProcessingHistoryRepository
 from repositories.managers_repo import ManagersRepository
 
+# matplotlib импортируется внутри методов, строящих графики: сервис
+# (и виджет аналитики) можно импортировать без загрузки matplotlib
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+
 
 logger = logging.getLogger(__name__)
 
+# Запас по оси Y над максимумом (чтобы обновления помещались в оси)
+_Y_HEADROOM = 1.2
+
+# gid заливки графика по дням (чтобы найти её при обновлении)
+_DAILY_FILL_GID = "daily_fill"
+
 
 class AnalyticsService:
     """Сервис аналитики и визуализации данных."""
@@ -32,10 +41,6 @@ class AnalyticsService:
         self.history_repo = history_repo
         self.managers_repo = managers_repo
 
-        # Настройка matplotlib для кириллицы
-        plt.rcParams["font.family"] = "DejaVu Sans"
-        plt.rcParams["axes.unicode_minus"] = False
-
     def get_overall_stats(self) -> Dict[str, int]:
         """
         Получить общую статистику по всем обработкам.
@@ -113,11 +118,30 @@ class AnalyticsService:
 
         return df
 
-    def create_daily_chart(self, days: int = 30) -> Figure:
-        """Создать график динамики обработки по дням (темная тема)."""
-        df = self.get_daily_stats(days)
+    def create_daily_chart(
+        self,
+        days: int = 30,
+        fig: "Figure | None" = None,
+        daily_df: pd.DataFrame | None = None,
+        animated: bool = False,
+    ) -> "Figure":
+        """
+        Нарисовать график динамики обработки по дням (темная тема).
+
+        Args:
+            days: количество дней назад.
+            fig: существующая фигура для перерисовки. Если None — создаётся новая.
+            daily_df: заранее полученный результат get_daily_stats(days).
+                Если None — запрашивается из БД.
+            animated: пометить линию и заливку как animated — их рисует
+                вызывающий код поверх сохранённого фона (блиттинг).
+
+        Returns:
+            Фигура с графиком.
+        """
+        df = self.get_daily_stats(days) if daily_df is None else daily_df
 
-        fig, ax = plt.subplots(figsize=(14, 6))
+        fig, ax = self._prepare_figure(fig, figsize=(14, 6))
 
         if df.empty:
             ax.text(
@@ -137,14 +161,12 @@ class AnalyticsService:
             label="Лиды",
             color='#64B5F6',  # Голубой
             markerfacecolor='#42A5F5',
-            markersize=8
-        )
-        ax.fill_between(
-            df["date"],
-            df["leads"],
-            alpha=0.3,
-            color='#64B5F6'
+            markersize=8,
+            animated=animated,
         )
+        self._fill_daily(ax, df, animated)
+        # Запас по высоте: новые лиды за сегодня не выходят за ось
+        ax.set_ylim(0, max(float(df["leads"].max()), 1.0) * _Y_HEADROOM)
 
         ax.set_xlabel("Дата", fontsize=12, color='#e0e0e0')
         ax.set_ylabel("Количество лидов", fontsize=12, color='#e0e0e0')
@@ -160,12 +182,77 @@ class AnalyticsService:
 
         # Форматирование дат
         import matplotlib.dates as mdates
+
         ax.xaxis.set_major_formatter(mdates.DateFormatter("%d.%m"))
         fig.autofmt_xdate()
 
-        plt.tight_layout()
         return fig
 
+    def update_daily_chart(self, ax: "Axes", daily_df: pd.DataFrame) -> bool:
+        """
+        Обновить данные графика по дням без перестроения осей.
+
+        Работает только для графика, построенного create_daily_chart(animated=True):
+        меняются данные линии и заливка.
+
+        Returns:
+            True — данные обновлены на месте; False — новые данные не помещаются
+            в текущие оси, нужен полный create_daily_chart().
+        """
+        line = next((l for l in ax.lines if l.get_animated()), None)
+        if line is None or daily_df.empty:
+            return False
+
+        import matplotlib.dates as mdates
+
+        x = mdates.date2num(daily_df["date"])
+        y = daily_df["leads"].to_numpy(dtype=float)
+        x_min, x_max = ax.get_xlim()
+        y_min, y_max = ax.get_ylim()
+        if x.min() < x_min or x.max() > x_max or y.max() > y_max:
+            return False
+
+        line.set_data(x, y)
+        for collection in ax.collections:
+            if collection.get_gid() == _DAILY_FILL_GID:
+                collection.remove()
+        self._fill_daily(ax, daily_df, animated=True)
+        return True
+
+    @staticmethod
+    def _fill_daily(ax: "Axes", df: pd.DataFrame, animated: bool) -> None:
+        """Заливка под линией графика по дням."""
+        ax.fill_between(
+            df["date"],
+            df["leads"],
+            alpha=0.3,
+            color='#64B5F6',
+            animated=animated,
+            gid=_DAILY_FILL_GID,
+        )
+
+    @staticmethod
+    def _prepare_figure(
+        fig: "Figure | None", figsize: Tuple[float, float]
+    ) -> Tuple["Figure", "Axes"]:
+        """
+        Подготовить фигуру к рисованию.
+
+        Существующая фигура очищается и переиспользуется, чтобы не создавать
+        новый Figure (и не терять кэш рендерера) на каждое обновление.
+        Фигуры создаются без pyplot — менеджер окон matplotlib не нужен;
+        раскладку считает constrained layout во время отрисовки
+        (draw_idle), а не отдельный tight_layout при построении.
+        """
+        if fig is None:
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=figsize, layout="constrained")
+        else:
+            fig.clear()
+        ax = fig.add_subplot(111)
+        return fig, ax
+
     def get_manager_distribution(self, bitrix_df: pd.DataFrame) -> Dict[str, int]:
         """
         Получить распределение лидов по менеджерам.
@@ -185,11 +272,21 @@ class AnalyticsService:
         distribution = bitrix_df["Ответственный"].value_counts().to_dict()
         return distribution
 
-    def create_manager_pie_chart(self, bitrix_df: pd.DataFrame) -> Figure:
-        """Создать круговую диаграмму распределения по менеджерам (темная тема)."""
-        distribution = self.get_manager_distribution(bitrix_df)
+    def create_manager_pie_chart(
+        self,
+        bitrix_df: pd.DataFrame,
+        fig: "Figure | None" = None,
+        distribution: Dict[str, int] | None = None,
+    ) -> "Figure":
+        """
+        Нарисовать круговую диаграмму распределения по менеджерам (темная тема).
+
+        distribution — заранее посчитанный get_manager_distribution(bitrix_df).
+        """
+        if distribution is None:
+            distribution = self.get_manager_distribution(bitrix_df)
 
-        fig, ax = plt.subplots(figsize=(10, 10))
+        fig, ax = self._prepare_figure(fig, figsize=(10, 10))
 
         if not distribution:
             ax.text(
@@ -229,12 +326,40 @@ class AnalyticsService:
             pad=20
         )
 
-        plt.tight_layout()
         return fig
 
-    def create_sources_bar_chart(self, cleaned_df: pd.DataFrame) -> Figure:
-        """Создать столбчатую диаграмму по источникам (темная тема)."""
-        fig, ax = plt.subplots(figsize=(14, 6))
+    def get_sources_distribution(self, cleaned_df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Получить распределение лидов по источникам (файлам).
+
+        Args:
+            cleaned_df: очищенный DataFrame.
+
+        Returns:
+            Словарь {источник: количество}, по убыванию количества.
+        """
+        if cleaned_df is None or cleaned_df.empty:
+            return {}
+
+        if "Источник телефона" not in cleaned_df.columns:
+            return {}
+
+        return cleaned_df["Источник телефона"].value_counts().to_dict()
+
+    def create_sources_bar_chart(
+        self,
+        cleaned_df: pd.DataFrame,
+        fig: "Figure | None" = None,
+        sources: Dict[str, int] | None = None,
+        animated: bool = False,
+    ) -> "Figure":
+        """
+        Нарисовать столбчатую диаграмму по источникам (темная тема).
+
+        sources — заранее посчитанный get_sources_distribution(cleaned_df).
+        animated — пометить столбцы как animated (для блиттинга).
+        """
+        fig, ax = self._prepare_figure(fig, figsize=(14, 6))
 
         if cleaned_df is None or cleaned_df.empty:
             ax.text(
@@ -252,14 +377,16 @@ class AnalyticsService:
             )
             return fig
 
-        sources = cleaned_df["Источник телефона"].value_counts()
+        if sources is None:
+            sources = self.get_sources_distribution(cleaned_df)
 
         bars = ax.bar(
             range(len(sources)),
-            sources.values,
+            list(sources.values()),
             color='#9575CD',  # Фиолетовый
             edgecolor='#7E57C2',
-            linewidth=1.5
+            linewidth=1.5,
+            animated=animated,
         )
 
         # Градиент
@@ -268,7 +395,7 @@ class AnalyticsService:
                           '#CE93D8', '#E1BEE7'][i % 5])
 
         ax.set_xticks(range(len(sources)))
-        ax.set_xticklabels(sources.index, rotation=45, ha="right")
+        ax.set_xticklabels(list(sources.keys()), rotation=45, ha="right")
         ax.set_xlabel("Источник (файл)", fontsize=12, color='#e0e0e0')
         ax.set_ylabel("Количество лидов", fontsize=12, color='#e0e0e0')
         ax.set_title(
@@ -279,10 +406,34 @@ class AnalyticsService:
             pad=20
         )
         ax.grid(axis="y", alpha=0.2, color='#555')
+        if sources:
+            ax.set_ylim(0, max(sources.values()) * _Y_HEADROOM)
 
-        plt.tight_layout()
         return fig
 
+    def update_sources_chart(self, ax: "Axes", sources: Dict[str, int]) -> bool:
+        """
+        Обновить высоты столбцов графика по источникам.
+
+        Работает только для графика, построенного
+        create_sources_bar_chart(animated=True), и только если набор
+        источников не изменился.
+
+        Returns:
+            True — высоты обновлены на месте; False — нужен полный
+            create_sources_bar_chart().
+        """
+        bars = [p for p in ax.patches if p.get_animated()]
+        labels = [t.get_text() for t in ax.get_xticklabels()]
+        if not bars or labels != list(sources.keys()):
+            return False
+        if max(sources.values()) > ax.get_ylim()[1]:
+            return False
+
+        for bar, count in zip(bars, sources.values()):
+            bar.set_height(count)
+        return True
+
     def export_excel_report(self, output_path: Path, stats: Dict) -> None:
         """
         Экспортировать отчёт в Excel.
@@ -6,64 +6,135 @@
 - DEAL (сделки) — стадии, успешные продажи
 """
 
+import importlib.util
 import logging
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from collections import Counter
 
+import numpy as np
 import pandas as pd
 
+from config.settings import settings
+from core.exceptions import FileProcessingError
+
 logger = logging.getLogger(__name__)
 
+# pyarrow — необязательная зависимость для settings.fast_io
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Порция чтения CSV (строк): в памяти держится одна порция
+DEFAULT_CHUNKSIZE = 200_000
+# Сколько строк читать для определения разделителя и кодировки
+_SNIFF_ROWS = 1_000
+
+# Возможные названия колонок в экспортах (поиск без учёта регистра)
+_LEAD_SOURCE_COLUMNS = ["Источник телефона", "Phone Source", "Lead Source File"]
+_DEAL_SOURCE_COLUMNS = ["Источник телефона", "Phone Source", "Deal Source File"]
+_REJECTION_COLUMNS = ["причина отказа", "отказ", "reason", "rejection"]
+_STAGE_COLUMNS = ["стадия", "stage", "status"]
+_MANAGER_COLUMNS = ["ответственный", "responsible", "manager", "assigned"]
+
+# Колонки, которые читаются из экспортов (usecols): остальные колонки
+# парсер пропускает. Новая метрика по другой колонке должна добавить
+# её варианты названий сюда
+LEAD_COLUMNS = tuple(_LEAD_SOURCE_COLUMNS + _REJECTION_COLUMNS)
+DEAL_COLUMNS = tuple(_DEAL_SOURCE_COLUMNS + _STAGE_COLUMNS + _MANAGER_COLUMNS)
+
+# Ключевые слова успешной стадии сделки
+_SUCCESS_KEYWORDS = [
+    "успешно", "реализовано", "выигран",
+    "won", "success", "closed", "завершен",
+]
+
 
 class BitrixAnalyticsService:
     """Сервис анализа экспортов из Битрикс24."""
 
     def __init__(self):
-        self.lead_df: pd.DataFrame = pd.DataFrame()
-        self.deal_df: pd.DataFrame = pd.DataFrame()
         self.metrics: Dict = {}
 
-    def load_bitrix_exports(self, lead_csv_path: Path, deal_csv_path: Path) -> Tuple[bool, str]:
+    def analyze_exports(
+        self,
+        lead_csv_path: Path,
+        deal_csv_path: Path,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        progress: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[int, int, Dict]:
         """
-        Загрузить экспорты из Битрикс24.
+        Загрузить экспорты, отфильтровать "наши" лиды и рассчитать метрики.
+
+        Файлы читаются порциями по chunksize строк: в памяти держится
+        одна порция, а счётчики метрик накапливаются в Counter.
 
         Args:
             lead_csv_path: путь к LEAD.csv
             deal_csv_path: путь к DEAL.csv
+            chunksize: размер порции чтения (строк).
+            progress: вызывается с текстом статуса после каждой порции.
 
         Returns:
-            (success, message)
+            (количество_до_фильтрации, количество_после, метрики)
+
+        Raises:
+            FileProcessingError: если файл не удалось прочитать.
         """
-        # Загрузка LEAD
-        try:
-            self.lead_df = self._load_csv_with_detection(lead_csv_path)
-            logger.info(
-                f"LEAD загружен: {len(self.lead_df)} строк, "
-                f"{len(self.lead_df.columns)} колонок"
-            )
-            logger.debug(f"Колонки LEAD: {list(self.lead_df.columns)}")
-        except Exception as exc:
-            logger.exception(f"Ошибка загрузки LEAD: {exc}")
-            return False, f"Не удалось загрузить LEAD.csv: {exc}"
+        lead = self._scan_leads(lead_csv_path, chunksize, progress)
+        deal = self._scan_deals(deal_csv_path, chunksize, progress)
+
+        self.metrics = self._build_metrics(lead, deal)
+        return (
+            lead["total"] + deal["total"],
+            lead["mine"] + deal["mine"],
+            self.metrics,
+        )
 
-        # Загрузка DEAL
-        try:
-            self.deal_df = self._load_csv_with_detection(deal_csv_path)
-            logger.info(
-                f"DEAL загружен: {len(self.deal_df)} строк, "
-                f"{len(self.deal_df.columns)} колонок"
-            )
-            logger.debug(f"Колонки DEAL: {list(self.deal_df.columns)}")
-        except Exception as exc:
-            logger.exception(f"Ошибка загрузки DEAL: {exc}")
-            return False, f"Не удалось загрузить DEAL.csv: {exc}"
+    def iter_chunks(
+        self,
+        path: Path,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Читать CSV порциями с автоопределением разделителя и кодировки.
+
+        Парсер pyarrow (settings.fast_io) порциями читать не умеет —
+        в этом случае файл отдаётся одной порцией.
 
-        return True, "Файлы загружены успешно"
+        Args:
+            columns: варианты названий нужных колонок (поиск подстроки без
+                учёта регистра, как в _find_column). Если задано, читаются
+                только совпавшие колонки; None — все колонки.
+        """
+        sep, encoding = self._detect_csv_format(path)
+        read_options = self._read_csv_options()
+        if columns is not None:
+            read_options["usecols"] = self._select_columns(
+                path, sep, encoding, columns
+            )
 
-    def _load_csv_with_detection(self, path: Path) -> pd.DataFrame:
+        if read_options.get("engine") == "pyarrow":
+            yield pd.read_csv(
+                path, sep=sep, encoding=encoding, dtype=str, **read_options
+            )
+            return
+
+        with pd.read_csv(
+            path,
+            sep=sep,
+            encoding=encoding,
+            dtype=str,
+            chunksize=chunksize,
+            **read_options,
+        ) as reader:
+            yield from reader
+
+    def _detect_csv_format(self, path: Path) -> Tuple[str, str]:
         """
-        Универсальная загрузка CSV с автоопределением разделителя.
+        Определить разделитель и кодировку по первым строкам файла.
+
+        Returns:
+            (разделитель, кодировка)
         """
         # Пробуем разные разделители и кодировки
         separators = [";", ",", "\t"]
@@ -72,75 +143,206 @@ class BitrixAnalyticsService:
         for sep in separators:
             for encoding in encodings:
                 try:
-                    df = pd.read_csv(
+                    sample = pd.read_csv(
                         path,
                         sep=sep,
                         encoding=encoding,
-                        low_memory=False,
                         dtype=str,
+                        nrows=_SNIFF_ROWS,
                     )
                     # Проверяем, что колонок больше 1 (успешный парсинг)
-                    if len(df.columns) > 1:
-                        return df
+                    if len(sample.columns) > 1:
+                        return sep, encoding
                 except Exception:
                     continue
 
-        # Если ничего не подошло — пробуем с автоопределением
-        return pd.read_csv(path, encoding="utf-8", low_memory=False, dtype=str)
+        # Если ничего не подошло — читаем с настройками по умолчанию
+        return ",", "utf-8"
 
-    def filter_my_leads(self) -> Tuple[int, int]:
+    @staticmethod
+    def _select_columns(
+        path: Path, sep: str, encoding: str, candidates: Sequence[str]
+    ) -> List[str]:
         """
-        Фильтровать только "наши" лиды (с меткой "Источник телефона").
+        Колонки заголовка, совпавшие хотя бы с одним из вариантов названий.
 
-        Returns:
-            (количество_до_фильтрации, количество_после)
+        Если совпадений нет, остаётся первая колонка — иначе парсер
+        вернёт пустую таблицу и потеряется количество строк.
         """
-        # Ищем колонку "Источник телефона"
-        source_col_lead = self._find_column(
-            self.lead_df,
-            ["Источник телефона", "Phone Source", "Lead Source File"]
-        )
-        source_col_deal = self._find_column(
-            self.deal_df,
-            ["Источник телефона", "Phone Source", "Deal Source File"]
-        )
+        header = pd.read_csv(
+            path, sep=sep, encoding=encoding, dtype=str, nrows=0
+        ).columns
+        lowered = [candidate.lower() for candidate in candidates]
+        selected = [
+            col for col in header
+            if any(candidate in str(col).lower() for candidate in lowered)
+        ]
+        return selected or list(header[:1])
+
+    @staticmethod
+    def _read_csv_options() -> Dict[str, Any]:
+        """
+        Параметры парсера для pd.read_csv.
 
-        initial_lead = len(self.lead_df)
-        initial_deal = len(self.deal_df)
+        При settings.fast_io и установленном pyarrow — многопоточный парсер
+        pyarrow и Arrow-колонки (повторяющиеся строки хранятся компактнее).
+        Иначе — стандартный парсер pandas.
+        """
+        if settings.fast_io and _HAS_PYARROW:
+            return {"engine": "pyarrow", "dtype_backend": "pyarrow"}
+        return {"low_memory": False}
+
+    def _read_export(
+        self, path: Path, name: str, chunksize: int, columns: Sequence[str]
+    ) -> Iterator[pd.DataFrame]:
+        """Порции экспорта name (LEAD/DEAL); ошибки чтения — FileProcessingError."""
+        try:
+            yield from self.iter_chunks(path, chunksize, columns)
+        except Exception as exc:
+            logger.exception(f"Ошибка загрузки {name}: {exc}")
+            raise FileProcessingError(
+                f"Не удалось загрузить {name}.csv: {exc}",
+                {"path": str(path)},
+            ) from exc
+
+    def _scan_leads(
+        self,
+        path: Path,
+        chunksize: int,
+        progress: Optional[Callable[[str], None]],
+    ) -> Dict[str, Any]:
+        """Пройти LEAD.csv: размеры до/после фильтрации и причины отказа."""
+        total = mine = 0
+        reasons: Counter = Counter()
+        source_col = rejection_col = None
+
+        chunks = self._read_export(path, "LEAD", chunksize, LEAD_COLUMNS)
+        for index, chunk in enumerate(chunks):
+            if index == 0:
+                logger.debug(f"Колонки LEAD: {list(chunk.columns)}")
+                source_col = self._find_column(chunk, _LEAD_SOURCE_COLUMNS)
+                rejection_col = self._find_column(chunk, _REJECTION_COLUMNS)
+                self._log_source_column("LEAD", chunk, source_col)
+
+            total += len(chunk)
+            chunk = self._filter_my_rows(chunk, source_col)
+            mine += len(chunk)
+
+            if rejection_col:
+                values = chunk[rejection_col].dropna()
+                values = values[values.astype(str).str.strip() != ""]
+                reasons.update(self._count_values(values))
+
+            if progress:
+                progress(f"⏳ LEAD: прочитано {total:,} строк...")
+
+        logger.info(f"LEAD загружен: {total} строк")
+        if source_col:
+            logger.info(f"LEAD: {total} → {mine} (после фильтрации)")
+
+        return {
+            "total": total,
+            "mine": mine,
+            "rejection_col": rejection_col,
+            "reasons": reasons,
+        }
+
+    def _scan_deals(
+        self,
+        path: Path,
+        chunksize: int,
+        progress: Optional[Callable[[str], None]],
+    ) -> Dict[str, Any]:
+        """Пройти DEAL.csv: размеры, стадии, успешные продажи, менеджеры."""
+        total = mine = successful = 0
+        stages: Counter = Counter()
+        managers: Counter = Counter()
+        source_col = stage_col = manager_col = None
+
+        chunks = self._read_export(path, "DEAL", chunksize, DEAL_COLUMNS)
+        for index, chunk in enumerate(chunks):
+            if index == 0:
+                logger.debug(f"Колонки DEAL: {list(chunk.columns)}")
+                source_col = self._find_column(chunk, _DEAL_SOURCE_COLUMNS)
+                stage_col = self._find_column(chunk, _STAGE_COLUMNS)
+                manager_col = self._find_column(chunk, _MANAGER_COLUMNS)
+                self._log_source_column("DEAL", chunk, source_col)
+
+            total += len(chunk)
+            chunk = self._filter_my_rows(chunk, source_col)
+            mine += len(chunk)
+
+            if stage_col:
+                stages.update(self._count_values(chunk[stage_col]))
+
+            if manager_col:
+                managers.update(self._count_values(chunk[manager_col]))
+
+            if progress:
+                progress(f"⏳ DEAL: прочитано {total:,} строк...")
+
+        # Успешные продажи: ключевые слова проверяются по уникальным стадиям
+        # (их обычно единицы), а не по каждой строке; стадия с несколькими
+        # ключевыми словами учитывается по разу на каждое
+        for stage, count in stages.items():
+            stage_text = str(stage).lower()
+            for keyword in _SUCCESS_KEYWORDS:
+                if keyword in stage_text:
+                    successful += count
+                    logger.debug(f"Найдено '{keyword}' в '{stage}': {count} сделок")
+
+        logger.info(f"DEAL загружен: {total} строк")
+        if source_col:
+            logger.info(f"DEAL: {total} → {mine} (после фильтрации)")
+
+        return {
+            "total": total,
+            "mine": mine,
+            "stage_col": stage_col,
+            "manager_col": manager_col,
+            "stages": stages,
+            "successful": successful,
+            "managers": managers,
+        }
+
+    @staticmethod
+    def _count_values(values: pd.Series) -> Dict[Any, int]:
+        """
+        Посчитать количество каждого значения (пропуски не считаются).
 
-        # Фильтрация LEAD
-        if source_col_lead:
-            logger.info(f"Найдена колонка LEAD: '{source_col_lead}'")
+        Значения кодируются целыми (pd.factorize), а счёт идёт через
+        np.bincount — один проход на C без промежуточной Series.
+        """
+        codes, uniques = pd.factorize(values)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return dict(zip(uniques.tolist(), counts.tolist()))
+
+    def _log_source_column(
+        self, name: str, chunk: pd.DataFrame, source_col: str | None
+    ) -> None:
+        """Залогировать найденную колонку источника (по первой порции)."""
+        if source_col:
+            logger.info(f"Найдена колонка {name}: '{source_col}'")
             # Показываем примеры значений
-            sample = self.lead_df[source_col_lead].dropna().unique()[:3]
+            sample = chunk[source_col].dropna().unique()[:3]
             logger.debug(f"Примеры значений: {list(sample)}")
-
-            # Фильтруем: оставляем только где есть ".csv"
-            self.lead_df = self.lead_df[
-                self.lead_df[source_col_lead].astype(str).str.contains(
-                    ".csv", case=False, na=False
-                )
-            ]
-            logger.info(f"LEAD: {initial_lead} → {len(self.lead_df)} (после фильтрации)")
         else:
-            logger.warning("Колонка 'Источник телефона' не найдена в LEAD — анализируем все")
-
-        # Фильтрация DEAL
-        if source_col_deal:
-            logger.info(f"Найдена колонка DEAL: '{source_col_deal}'")
-            sample = self.deal_df[source_col_deal].dropna().unique()[:3]
-            logger.debug(f"Примеры значений: {list(sample)}")
+            logger.warning(
+                f"Колонка 'Источник телефона' не найдена в {name} — анализируем все"
+            )
 
-            self.deal_df = self.deal_df[
-                self.deal_df[source_col_deal].astype(str).str.contains(
-                    ".csv", case=False, na=False
-                )
-            ]
-            logger.info(f"DEAL: {initial_deal} → {len(self.deal_df)} (после фильтрации)")
-        else:
-            logger.warning("Колонка 'Источник телефона' не найдена в DEAL — анализируем все")
+    @staticmethod
+    def _filter_my_rows(chunk: pd.DataFrame, source_col: str | None) -> pd.DataFrame:
+        """
+        Оставить только "наши" строки (с меткой ".csv" в источнике телефона).
 
-        return initial_lead + initial_deal, len(self.lead_df) + len(self.deal_df)
+        Если колонки источника нет — анализируем все строки.
+        """
+        if not source_col:
+            return chunk
+        return chunk[
+            chunk[source_col].astype(str).str.contains(".csv", case=False, na=False)
+        ]
 
     def _find_column(self, df: pd.DataFrame, candidates: List[str]) -> str | None:
         """
@@ -152,101 +354,70 @@ class BitrixAnalyticsService:
                     return col
         return None
 
-    def calculate_metrics(self) -> Dict:
+    def _build_metrics(self, lead: Dict[str, Any], deal: Dict[str, Any]) -> Dict:
         """
-        Рассчитать все метрики.
+        Собрать метрики из накопленных счётчиков.
 
         Returns:
-            Словарь с метриками.
+            Словарь с метриками. Категориальные поля (rejection_reasons,
+            deal_stages, top_managers) — Counter: рейтинг берётся most_common().
         """
+        metrics: Dict = {}
+
         # 1. Общая статистика
-        total_leads = len(self.lead_df) + len(self.deal_df)
-        self.metrics["total_leads"] = total_leads
-        self.metrics["total_lead_records"] = len(self.lead_df)
-        self.metrics["total_deal_records"] = len(self.deal_df)
+        total_leads = lead["mine"] + deal["mine"]
+        metrics["total_leads"] = total_leads
+        metrics["total_lead_records"] = lead["mine"]
+        metrics["total_deal_records"] = deal["mine"]
 
         logger.info(f"Подсчёт метрик: всего записей = {total_leads}")
 
         # 2. Причины отказа (из LEAD)
-        rejection_col = self._find_column(
-            self.lead_df,
-            ["причина отказа", "отказ", "reason", "rejection"]
-        )
-
-        if rejection_col and not self.lead_df.empty:
-            rejection_reasons = self.lead_df[rejection_col].dropna()
-            rejection_reasons = rejection_reasons[rejection_reasons.astype(str).str.strip() != ""]
+        if lead["rejection_col"] and lead["mine"]:
+            metrics["rejection_reasons"] = lead["reasons"]
+            metrics["total_rejections"] = sum(lead["reasons"].values())
 
-            reason_counts = Counter(rejection_reasons)
-            self.metrics["rejection_reasons"] = dict(reason_counts)
-            self.metrics["total_rejections"] = len(rejection_reasons)
-
-            logger.info(f"Причины отказа: {len(rejection_reasons)} записей")
+            logger.info(f"Причины отказа: {metrics['total_rejections']} записей")
         else:
-            self.metrics["rejection_reasons"] = {}
-            self.metrics["total_rejections"] = 0
+            metrics["rejection_reasons"] = Counter()
+            metrics["total_rejections"] = 0
             logger.warning("Колонка 'Причина отказа' не найдена в LEAD")
 
         # 3. Стадии сделок (из DEAL)
-        stage_col = self._find_column(
-            self.deal_df,
-            ["стадия", "stage", "status"]
-        )
-
-        if stage_col and not self.deal_df.empty:
-            stage_counts = self.deal_df[stage_col].value_counts().to_dict()
-            self.metrics["deal_stages"] = stage_counts
+        if deal["stage_col"] and deal["mine"]:
+            metrics["deal_stages"] = deal["stages"]
 
-            logger.info(f"Стадии сделок: {list(stage_counts.keys())[:3]}...")
+            top_stages = [stage for stage, _ in deal["stages"].most_common(3)]
+            logger.info(f"Стадии сделок: {top_stages}...")
         else:
-            self.metrics["deal_stages"] = {}
+            metrics["deal_stages"] = Counter()
             logger.warning("Колонка 'Стадия' не найдена в DEAL")
 
         # 4. Успешные продажи
-        successful_deals = 0
-        if stage_col and not self.deal_df.empty:
-            success_keywords = [
-                "успешно", "реализовано", "выигран",
-                "won", "success", "closed", "завершен"
-            ]
-
-            for keyword in success_keywords:
-                mask = self.deal_df[stage_col].astype(str).str.contains(
-                    keyword, case=False, na=False
-                )
-                count = mask.sum()
-                if count > 0:
-                    successful_deals += count
-                    logger.debug(f"Найдено '{keyword}': {count} сделок")
-
-        self.metrics["successful_deals"] = successful_deals
+        successful_deals = deal["successful"]
+        metrics["successful_deals"] = successful_deals
         logger.info(f"Успешных продаж: {successful_deals}")
 
         # 5. Конверсия
         if total_leads > 0:
-            conversion = ((len(self.deal_df) + successful_deals) / total_leads) * 100
-            self.metrics["conversion"] = round(conversion, 2)
+            conversion = ((deal["mine"] + successful_deals) / total_leads) * 100
+            metrics["conversion"] = round(conversion, 2)
         else:
-            self.metrics["conversion"] = 0.0
+            metrics["conversion"] = 0.0
 
-        logger.info(f"Конверсия: {self.metrics['conversion']}%")
+        logger.info(f"Конверсия: {metrics['conversion']}%")
 
         # 6. Топ-менеджеры (из DEAL)
-        manager_col = self._find_column(
-            self.deal_df,
-            ["ответственный", "responsible", "manager", "assigned"]
-        )
-
-        if manager_col and not self.deal_df.empty:
-            manager_counts = self.deal_df[manager_col].value_counts().head(5).to_dict()
-            self.metrics["top_managers"] = manager_counts
+        if deal["manager_col"] and deal["mine"]:
+            manager_counts = Counter(dict(deal["managers"].most_common(5)))
+            metrics["top_managers"] = manager_counts
 
             logger.info(f"Топ-менеджеры: {list(manager_counts.keys())[:3]}")
         else:
-            self.metrics["top_managers"] = {}
+            metrics["top_managers"] = Counter()
             logger.warning("Колонка 'Ответственный' не найдена в DEAL")
 
-        return self.metrics
+        return metrics
 
     def get_report_summary(self) -> str:
         """
@@ -270,11 +441,11 @@ class BitrixAnalyticsService:
 2. ПРИЧИНЫ ОТКАЗА (ТОП-5)
 """
 
-        rejection_reasons = self.metrics.get("rejection_reasons", {})
+        rejection_reasons = self.metrics.get("rejection_reasons", Counter())
         if rejection_reasons:
             total_rej = self.metrics.get("total_rejections", 1)
             for idx, (reason, count) in enumerate(
-                sorted(rejection_reasons.items(), key=lambda x: x[1], reverse=True)[:5],
+                rejection_reasons.most_common(5),
                 1
             ):
                 percentage = (count / total_rej) * 100
@@ -283,10 +454,10 @@ class BitrixAnalyticsService:
             summary += "   - Нет данных\n"
 
         summary += "\n3. СТАДИИ СДЕЛОК\n"
-        deal_stages = self.metrics.get("deal_stages", {})
+        deal_stages = self.metrics.get("deal_stages", Counter())
         if deal_stages:
             for idx, (stage, count) in enumerate(
-                sorted(deal_stages.items(), key=lambda x: x[1], reverse=True),
+                deal_stages.most_common(),
                 1
             ):
                 summary += f"   {idx}. {stage}: {count}\n"
@@ -294,9 +465,9 @@ class BitrixAnalyticsService:
             summary += "   - Нет данных\n"
 
         summary += "\n4. ТОП-МЕНЕДЖЕРЫ\n"
-        top_managers = self.metrics.get("top_managers", {})
+        top_managers = self.metrics.get("top_managers", Counter())
         if top_managers:
-            for idx, (manager, count) in enumerate(top_managers.items(), 1):
+            for idx, (manager, count) in enumerate(top_managers.most_common(), 1):
                 summary += f"   {idx}. {manager}: {count} сделок\n"
         else:
             summary += "   - Нет данных\n"
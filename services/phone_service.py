@@ -55,7 +55,7 @@ class PhoneService:
             return None
 
         # Должен начинаться с 7 или 8
-        if digits[0] not in VALID_PHONE_PREFIXES:
+        if digits[:1] not in VALID_PHONE_PREFIXES:
             logger.debug(f"Номер с неправильным префиксом: {digits}")
             return None
 
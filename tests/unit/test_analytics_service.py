@@ -0,0 +1,92 @@
+"""
+Unit-тесты для AnalyticsService.
+
+Проверяем агрегации и перерисовку графиков в существующую фигуру.
+"""
+
+import pandas as pd
+import pytest
+from matplotlib.layout_engine import ConstrainedLayoutEngine
+
+from repositories.managers_repo import ManagersRepository
+from repositories.processing_history_repo import ProcessingHistoryRepository
+from services.analytics_service import AnalyticsService
+
+
+@pytest.fixture
+def analytics_service(
+    history_repo: ProcessingHistoryRepository,
+    managers_repo: ManagersRepository,
+) -> AnalyticsService:
+    """Сервис аналитики с тестовой БД."""
+    return AnalyticsService(history_repo, managers_repo)
+
+
+class TestAnalyticsService:
+    """Тесты сервиса аналитики."""
+
+    def test_sources_distribution(self, analytics_service: AnalyticsService) -> None:
+        """Тест: распределение по источникам, по убыванию."""
+        df = pd.DataFrame({"Источник телефона": ["a.csv", "b.csv", "b.csv"]})
+
+        result = analytics_service.get_sources_distribution(df)
+
+        assert list(result.items()) == [("b.csv", 2), ("a.csv", 1)]
+
+    def test_sources_distribution_without_column(
+        self, analytics_service: AnalyticsService
+    ) -> None:
+        """Тест: нет колонки источника — пустое распределение."""
+        df = pd.DataFrame({"Название": ["Компания"]})
+
+        assert analytics_service.get_sources_distribution(df) == {}
+
+    def test_chart_redraws_into_existing_figure(
+        self, analytics_service: AnalyticsService
+    ) -> None:
+        """Тест: повторная отрисовка использует ту же фигуру."""
+        df = pd.DataFrame({"Ответственный": ["М1", "М2", "М1"]})
+
+        fig = analytics_service.create_manager_pie_chart(df)
+        same_fig = analytics_service.create_manager_pie_chart(df, fig=fig)
+
+        assert same_fig is fig
+        assert len(fig.axes) == 1
+
+    def test_daily_chart_with_precomputed_data(
+        self, analytics_service: AnalyticsService
+    ) -> None:
+        """Тест: график динамики по заранее полученным данным."""
+        daily_df = pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "leads": [10, 20],
+            "files": [1, 2],
+        })
+
+        fig = analytics_service.create_daily_chart(days=7, daily_df=daily_df)
+
+        assert len(fig.axes[0].lines) == 1
+
+    def test_new_figure_uses_constrained_layout(
+        self, analytics_service: AnalyticsService
+    ) -> None:
+        """Тест: фигура, созданная сервисом, раскладывается constrained layout."""
+        fig = analytics_service.create_daily_chart()
+
+        assert isinstance(fig.get_layout_engine(), ConstrainedLayoutEngine)
+
+    def test_sources_chart_updates_in_place(
+        self, analytics_service: AnalyticsService
+    ) -> None:
+        """Тест: тот же набор источников — высоты меняются без перестроения."""
+        df = pd.DataFrame({"Источник телефона": ["a.csv", "a.csv", "b.csv"]})
+        fig = analytics_service.create_sources_bar_chart(
+            df, sources={"a.csv": 2, "b.csv": 1}, animated=True
+        )
+        ax = fig.axes[0]
+
+        assert analytics_service.update_sources_chart(ax, {"a.csv": 2, "b.csv": 2})
+        assert [bar.get_height() for bar in ax.patches] == [2, 2]
+
+        # Новый источник не помещается в текущие оси
+        assert not analytics_service.update_sources_chart(ax, {"c.csv": 1})
@@ -0,0 +1,80 @@
+"""
+Unit-тесты для BitrixAnalyticsService.
+
+Проверяем потоковый расчёт метрик по экспортам LEAD/DEAL.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from core.exceptions import FileProcessingError
+from services.bitrix_analytics_service import LEAD_COLUMNS, BitrixAnalyticsService
+
+
+@pytest.fixture
+def bitrix_exports(temp_dir: Path) -> tuple[Path, Path]:
+    """LEAD.csv и DEAL.csv в формате экспорта Битрикс24 (разделитель ';')."""
+    lead_path = temp_dir / "LEAD.csv"
+    deal_path = temp_dir / "DEAL.csv"
+
+    pd.DataFrame({
+        "Название": ["Л1", "Л2", "Л3", "Л4", "Л5"],
+        "Источник телефона": ["a.csv", "b.csv", "", "a.csv", "a.csv"],
+        "Причина отказа": ["Дорого", "Дорого", "Дорого", "", "Не актуально"],
+    }).to_csv(lead_path, sep=";", index=False)
+
+    pd.DataFrame({
+        "Название": ["С1", "С2", "С3", "С4"],
+        "Источник телефона": ["a.csv", "a.csv", "b.csv", "ручной"],
+        "Стадия": ["Успешно", "В работе", "В работе", "В работе"],
+        "Ответственный": ["Иванов", "Петров", "Иванов", "Иванов"],
+    }).to_csv(deal_path, sep=";", index=False)
+
+    return lead_path, deal_path
+
+
+class TestBitrixAnalyticsService:
+    """Тесты сервиса Битрикс-аналитики."""
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 1000])
+    def test_metrics_do_not_depend_on_chunksize(
+        self, bitrix_exports: tuple[Path, Path], chunksize: int
+    ) -> None:
+        """Тест: метрики одинаковы при любом размере порции."""
+        service = BitrixAnalyticsService()
+
+        before, after, metrics = service.analyze_exports(
+            *bitrix_exports, chunksize=chunksize
+        )
+
+        assert (before, after) == (9, 7)
+        assert metrics["total_lead_records"] == 4
+        assert metrics["total_deal_records"] == 3
+        assert metrics["rejection_reasons"] == {"Дорого": 2, "Не актуально": 1}
+        assert metrics["total_rejections"] == 3
+        assert metrics["deal_stages"] == {"В работе": 2, "Успешно": 1}
+        assert metrics["successful_deals"] == 1
+        assert metrics["top_managers"] == {"Иванов": 2, "Петров": 1}
+        assert metrics["deal_stages"].most_common(1) == [("В работе", 2)]
+        assert service.metrics is metrics
+
+    def test_iter_chunks_reads_only_requested_columns(
+        self, bitrix_exports: tuple[Path, Path]
+    ) -> None:
+        """Тест: при columns читаются только совпавшие колонки."""
+        lead_path, _ = bitrix_exports
+        service = BitrixAnalyticsService()
+
+        chunks = list(service.iter_chunks(lead_path, columns=LEAD_COLUMNS))
+
+        assert list(chunks[0].columns) == ["Источник телефона", "Причина отказа"]
+        assert sum(len(chunk) for chunk in chunks) == 5
+
+    def test_missing_file_raises(self, temp_dir: Path) -> None:
+        """Тест: нечитаемый файл — FileProcessingError с именем экспорта."""
+        service = BitrixAnalyticsService()
+
+        with pytest.raises(FileProcessingError, match="LEAD.csv"):
+            service.analyze_exports(temp_dir / "LEAD.csv", temp_dir / "DEAL.csv")
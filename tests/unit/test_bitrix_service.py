@@ -69,7 +69,7 @@ class TestBitrixService:
         result = bitrix_service.map_to_bitrix(df)
 
         assert result.empty
-        assert list(result.columns) == BITRIX_COLUMNS
+        assert list(result.columns) == list(BITRIX_COLUMNS)
 
     def test_url_cleaning(self, bitrix_service: BitrixService) -> None:
         """Тест: очистка URL от UTM-меток."""
@@ -0,0 +1,30 @@
+"""
+Unit-тесты для исключений приложения.
+"""
+
+import pickle
+
+from core.exceptions import LeadGenError, ValidationError
+
+
+class TestExceptions:
+    """Тесты иерархии LeadGenError."""
+
+    def test_attributes(self) -> None:
+        """Тест: message и details доступны, details по умолчанию пустой."""
+        error = ValidationError("Плохой файл")
+
+        assert error.message == "Плохой файл"
+        assert error.details == {}
+        assert str(error) == "Плохой файл"
+        assert isinstance(error, LeadGenError)
+
+    def test_pickle_roundtrip(self) -> None:
+        """Тест: исключение переживает pickle вместе с details."""
+        error = ValidationError("Плохой файл", {"row": 3})
+
+        restored = pickle.loads(pickle.dumps(error))
+
+        assert type(restored) is ValidationError
+        assert restored.message == "Плохой файл"
+        assert restored.details == {"row": 3}
@@ -87,3 +87,79 @@ class TestProcessingHistoryRepository:
         assert row is not None
         assert row["status"] == "success"
         assert row["final_rows"] == 85
+
+    def test_revision_increments_on_write(
+        self, history_repo: ProcessingHistoryRepository
+    ) -> None:
+        """Тест: ревизия истории растёт при каждой записи."""
+        before = history_repo.revision()
+
+        record_id = history_repo.start_processing(file_count=1)
+        assert history_repo.revision() > before
+
+        after_start = history_repo.revision()
+        history_repo.execute_write(
+            "DELETE FROM processing_history WHERE id = ?", (record_id,)
+        )
+        assert history_repo.revision() > after_start
+
+    def test_clear_history(
+        self, history_repo: ProcessingHistoryRepository
+    ) -> None:
+        """Тест: clear_history удаляет все записи и меняет ревизию."""
+        history_repo.start_processing(file_count=1)
+        history_repo.start_processing(file_count=2)
+        before = history_repo.revision()
+
+        history_repo.clear_history()
+
+        row = history_repo.fetch_one("SELECT COUNT(*) FROM processing_history")
+        assert row[0] == 0
+        assert history_repo.revision() > before
+
+    @pytest.mark.parametrize(
+        "query_name, params",
+        [
+            ("_SQL_FIRST_PAGE", (200,)),
+            ("_SQL_NEXT_PAGE", ("2024-01-01T00:00:00", 1, 200)),
+        ],
+    )
+    def test_history_pages_use_started_index(
+        self,
+        history_repo: ProcessingHistoryRepository,
+        query_name: str,
+        params: tuple,
+    ) -> None:
+        """Тест: страницы истории читаются по индексу, без сортировки таблицы."""
+        from gui import history_widget
+
+        query = getattr(history_widget, query_name)
+        plan = " | ".join(
+            row["detail"]
+            for row in history_repo.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)
+        )
+
+        assert "ix_ph_started_desc" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_iter_all_yields_chunks(
+        self, history_repo: ProcessingHistoryRepository
+    ) -> None:
+        """Тест: iter_all отдаёт все строки порциями заданного размера."""
+        for count in range(5):
+            history_repo.start_processing(file_count=count)
+
+        chunks = list(history_repo.iter_all(
+            "SELECT file_count FROM processing_history ORDER BY id", size=2
+        ))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert [row["file_count"] for chunk in chunks for row in chunk] == [
+            0, 1, 2, 3, 4]
+
+    def test_iter_all_invalid_query_raises_error(
+        self, history_repo: ProcessingHistoryRepository
+    ) -> None:
+        """Тест: ошибка SQL в iter_all превращается в DatabaseError."""
+        with pytest.raises(DatabaseError):
+            list(history_repo.iter_all("SELECT * FROM missing_table"))
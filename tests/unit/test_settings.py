@@ -0,0 +1,52 @@
+"""
+Unit-тесты для настроек.
+
+Проверяем, что чтение настроек не трогает файловую систему.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from config.settings import Paths
+
+
+class TestPaths:
+    """Тесты путей к директориям данных."""
+
+    def test_paths_do_not_create_dirs(self, temp_dir: Path) -> None:
+        """Тест: создание Paths не создаёт директорий."""
+        paths = Paths(
+            input_dir=temp_dir / "input",
+            output_dir=temp_dir / "output",
+            reports_dir=temp_dir / "reports",
+        )
+
+        assert not paths.input_dir.exists()
+        assert not paths.output_dir.exists()
+        assert not paths.reports_dir.exists()
+
+    def test_ensure_dirs(self, temp_dir: Path) -> None:
+        """Тест: ensure_dirs создаёт все директории."""
+        paths = Paths(
+            input_dir=temp_dir / "input",
+            output_dir=temp_dir / "nested" / "output",
+            reports_dir=temp_dir / "reports",
+        )
+
+        paths.ensure_dirs()
+
+        assert paths.input_dir.is_dir()
+        assert paths.output_dir.is_dir()
+        assert paths.reports_dir.is_dir()
+
+    def test_ensure_dirs_skipped_by_env(
+        self, temp_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Тест: LEADGEN_SKIP_MKDIR=1 отключает создание директорий."""
+        monkeypatch.setenv("LEADGEN_SKIP_MKDIR", "1")
+        paths = Paths(input_dir=temp_dir / "input")
+
+        paths.ensure_dirs()
+
+        assert not paths.input_dir.exists()
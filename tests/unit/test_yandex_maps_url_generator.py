@@ -0,0 +1,38 @@
+"""
+Unit-тесты для YandexMapsURLGenerator (загрузка и сохранение конфигурации городов).
+"""
+
+import json
+from pathlib import Path
+
+from services.yandex_maps_url_generator import YandexMapsURLGenerator
+
+
+class TestCitiesConfig:
+    """Тесты файла конфигурации городов."""
+
+    def _write_config(self, path: Path, cities: list) -> None:
+        config = {"popular_cities": cities, "districts": {"Москва": ["ЦАО"]}}
+        path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+
+    def test_changed_file_is_reloaded(self, temp_dir: Path) -> None:
+        """Тест: новая загрузка видит изменённый файл конфигурации."""
+        config_path = temp_dir / "cities_config.json"
+        self._write_config(config_path, ["Казань"])
+        YandexMapsURLGenerator(config_path)
+
+        self._write_config(config_path, ["Казань", "Омск", "Пермь"])
+
+        assert YandexMapsURLGenerator(config_path).get_popular_cities() == [
+            "Казань", "Омск", "Пермь"]
+
+    def test_save_persists_changes(self, temp_dir: Path) -> None:
+        """Тест: изменения через генератор видны при следующей загрузке."""
+        config_path = temp_dir / "cities_config.json"
+        self._write_config(config_path, ["Казань"])
+
+        generator = YandexMapsURLGenerator(config_path)
+        generator.add_city("Омск")
+
+        assert YandexMapsURLGenerator(config_path).get_popular_cities() == [
+            "Казань", "Омск"]